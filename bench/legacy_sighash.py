@@ -0,0 +1,103 @@
+"""
+Benchmark: legacy (pre-segwit) signature hashes of every input of the widest P2PKH transactions in the mempool.
+
+Compares the per-input hex serialization scripts/p2pkh.py used before helper.sighash (which also left every
+input's scriptPubKey in place), a straightforward correct rebuild of the blanked transaction per input, and
+helper.sighash.LegacyHasher (shared buffers + SHA256 prefix state). Every variant starts from a fresh
+Transaction, so nothing is cached between rounds.
+
+Run from the repository root:  python bench/legacy_sighash.py [transactions] [rounds]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+os.chdir(ROOT)
+
+import helper.converter as convert
+import helper.serializer as serializer
+import helper.sighash as sighash
+import helper.txn_model as txn_model
+
+def _hex_digests(tx):
+    # scripts/p2pkh.py legacy_txn_data() before helper.sighash, called once per input.
+    digests = []
+    for _ in tx.vin:
+        txn_hash = f"{convert.to_little_endian(tx.version, 4)}"
+        txn_hash += f"{convert.to_compact_size(len(tx.vin))}"
+        for iN in tx.vin:
+            txn_hash += f"{bytes.fromhex(iN.txid)[::-1].hex()}"
+            txn_hash += f"{convert.to_little_endian(iN.vout, 4)}"
+            txn_hash += f"{convert.to_compact_size(len(iN.prevout.scriptpubkey))}"
+            txn_hash += f"{iN.prevout.scriptpubkey.hex()}"
+            txn_hash += f"{convert.to_little_endian(iN.sequence, 4)}"
+        txn_hash += f"{convert.to_compact_size(len(tx.vout))}"
+        for out in tx.vout:
+            txn_hash += f"{convert.to_little_endian(out.value, 8)}"
+            txn_hash += f"{convert.to_compact_size(len(out.scriptpubkey))}"
+            txn_hash += f"{out.scriptpubkey.hex()}"
+        txn_hash += f"{convert.to_little_endian(tx.locktime, 4)}"
+        digests.append(serializer.hash256(bytes.fromhex(txn_hash + "01000000")))
+    return digests
+
+def _rebuild_digests(tx):
+    # Correct, but the whole blanked transaction is serialized again for every input.
+    digests = []
+    for index in range(len(tx.vin)):
+        buf = bytearray(tx.version.to_bytes(4, "little"))
+        buf += serializer.compact_size(len(tx.vin))
+        for i, iN in enumerate(tx.vin):
+            buf += bytes.fromhex(iN.txid)[::-1] + iN.vout.to_bytes(4, "little")
+            script = iN.prevout.scriptpubkey if i == index else b""
+            buf += serializer.compact_size(len(script)) + script
+            buf += iN.sequence.to_bytes(4, "little")
+        buf += serializer.compact_size(len(tx.vout))
+        for out in tx.vout:
+            script = out.scriptpubkey
+            buf += out.value.to_bytes(8, "little") + serializer.compact_size(len(script)) + script
+        buf += tx.locktime.to_bytes(4, "little") + b"\x01\x00\x00\x00"
+        digests.append(serializer.hash256(buf))
+    return digests
+
+def _hasher_digests(tx):
+    hasher = sighash.LegacyHasher(tx)
+    return [hasher.digest(i, iN.prevout.scriptpubkey, sighash.SIGHASH_ALL) for i, iN in enumerate(tx.vin)]
+
+def _time(fn, names, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        txns = [txn_model.load(name) for name in names]
+        start = time.perf_counter()
+        for tx in txns:
+            fn(tx)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(count=10, rounds=3):
+    names = sorted(f[:-5] for f in os.listdir(txn_model.MEMPOOL_DIR) if f.endswith(".json"))
+    p2pkh = []
+    for name in names:
+        tx = txn_model.load(name)
+        if all(iN.prevout.scriptpubkey_type == "p2pkh" for iN in tx.vin):
+            p2pkh.append((len(tx.vin), name))
+    widest = [name for _, name in sorted(p2pkh, reverse=True)[:count]]
+    inputs = sum(len(txn_model.load(name).vin) for name in widest)
+
+    for name in widest:
+        tx = txn_model.load(name)
+        assert _rebuild_digests(tx) == _hasher_digests(tx)
+
+    t_hex = _time(_hex_digests, widest, rounds)
+    t_rebuild = _time(_rebuild_digests, widest, rounds)
+    t_hasher = _time(_hasher_digests, widest, rounds)
+
+    print(f"transactions      : {len(widest)} (widest has {len(txn_model.load(widest[0]).vin)} inputs, {inputs} inputs total)")
+    print(f"hex per input     : {t_hex*1000:8.1f} ms  ({inputs/t_hex:10.0f} inputs/s, wrong preimage)")
+    print(f"rebuild per input : {t_rebuild*1000:8.1f} ms  ({inputs/t_rebuild:10.0f} inputs/s)")
+    print(f"LegacyHasher      : {t_hasher*1000:8.1f} ms  ({inputs/t_hasher:10.0f} inputs/s)")
+    print(f"speed-up          : {t_hex/t_hasher:8.2f}x vs hex, {t_rebuild/t_hasher:.2f}x vs rebuild")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,96 @@
+"""
+Benchmark: loading every mempool file.
+
+Compares the helper.txn_model loader from before the projection (stdlib json.load, every field kept as a string:
+hex scripts, ASM, addresses, flags) with the projection loader (helper.txn_model.load: scripts and witness items
+as bytes, ASM disassembled on access) on stdlib json and, if installed, orjson. Parse time is the best of `rounds` passes;
+peak memory is measured with tracemalloc in a separate pass while every parsed transaction is kept alive.
+
+Run from the repository root:  python bench/loader.py [rounds]
+"""
+import os
+import sys
+import json
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+os.chdir(ROOT)
+
+import helper.txn_model as txn_model
+
+class _TxOut:
+    __slots__ = ("value", "scriptpubkey", "scriptpubkey_asm", "scriptpubkey_type", "scriptpubkey_address")
+
+    def __init__(self, data):
+        self.value = data["value"]
+        self.scriptpubkey = data["scriptpubkey"]
+        self.scriptpubkey_asm = data.get("scriptpubkey_asm", "")
+        self.scriptpubkey_type = data.get("scriptpubkey_type", "")
+        self.scriptpubkey_address = data.get("scriptpubkey_address")
+
+class _TxIn:
+    __slots__ = ("txid", "vout", "prevout", "scriptsig", "scriptsig_asm", "witness", "sequence",
+                 "is_coinbase", "inner_redeemscript_asm", "inner_witnessscript_asm")
+
+    def __init__(self, data):
+        self.txid = data["txid"]
+        self.vout = data["vout"]
+        self.prevout = _TxOut(data["prevout"])
+        self.scriptsig = data["scriptsig"]
+        self.scriptsig_asm = data.get("scriptsig_asm", "")
+        self.witness = data.get("witness") or []
+        self.sequence = data["sequence"]
+        self.is_coinbase = data.get("is_coinbase", False)
+        self.inner_redeemscript_asm = data.get("inner_redeemscript_asm")
+        self.inner_witnessscript_asm = data.get("inner_witnessscript_asm")
+
+def _full(name):
+    # helper.txn_model.load() before the projection.
+    with open(os.path.join(txn_model.MEMPOOL_DIR, f"{name}.json"), "r") as file:
+        data = json.load(file)
+    return (name, data["version"], data["locktime"], [_TxIn(i) for i in data["vin"]], [_TxOut(o) for o in data["vout"]])
+
+def _projected(loads):
+    def load(name):
+        with open(os.path.join(txn_model.MEMPOOL_DIR, f"{name}.json"), "rb") as file:
+            return txn_model.Transaction.from_dict(name, loads(file.read()))
+    return load
+
+def _time(load, names, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        kept = [load(name) for name in names]
+        best = min(best, time.perf_counter() - start)
+        del kept
+    return best
+
+def _peak(load, names):
+    tracemalloc.start()
+    kept = [load(name) for name in names]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return peak
+
+def main(rounds=3):
+    names = sorted(f[:-5] for f in os.listdir(txn_model.MEMPOOL_DIR) if f.endswith(".json"))
+    size = sum(os.path.getsize(os.path.join(txn_model.MEMPOOL_DIR, f"{name}.json")) for name in names)
+    loaders = [("all fields, json", _full), ("projection, json", _projected(json.loads))]
+    if txn_model.orjson is not None:
+        loaders.append(("projection, orjson", _projected(txn_model.orjson.loads)))
+
+    print(f"{'files':22s}: {len(names)} ({size / 1e6:.1f} MB)")
+    base_time = base_peak = None
+    for label, load in loaders:
+        seconds = _time(load, names, rounds)
+        peak = _peak(load, names)
+        if base_time is None:
+            base_time, base_peak = seconds, peak
+        print(f"{label:22s}: {seconds*1000:7.0f} ms ({base_time/seconds:4.2f}x)  peak {peak / 1e6:6.1f} MB"
+              f" ({peak / base_peak:4.0%} of baseline)")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,63 @@
+"""
+Benchmark: Merkle roots of a block-sized list of txids.
+
+Compares the hex-string tree helper.merkle_root used before MerkleTree (rebuilt from scratch on every call) with
+helper.merkle_root.MerkleTree, for one full build and for rolling the coinbase leaf (one new root per extranonce).
+
+Run from the repository root:  python bench/merkle.py [leaves] [rolls]
+"""
+import os
+import sys
+import time
+import hashlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import helper.merkle_root as merkle
+
+def _hex_root(txids):
+    # helper.merkle_root.merkle_root_calculator before MerkleTree.
+    level = [bytes.fromhex(txid)[::-1].hex() for txid in txids]
+    while len(level) > 1:
+        next_level = []
+        for i in range(0, len(level), 2):
+            right = level[i + 1] if i + 1 < len(level) else level[i]
+            next_level.append(hashlib.sha256(hashlib.sha256(bytes.fromhex(level[i] + right)).digest()).digest().hex())
+        level = next_level
+    return level[0]
+
+def _coinbase_txid(extranonce):
+    return hashlib.sha256(extranonce.to_bytes(8, "little")).hexdigest()
+
+def main(leaves=4000, rolls=1000):
+    txids = [hashlib.sha256(i.to_bytes(4, "little")).hexdigest() for i in range(leaves)]
+
+    start = time.perf_counter()
+    root = _hex_root(txids)
+    t_hex_build = time.perf_counter() - start
+    start = time.perf_counter()
+    tree = merkle.MerkleTree.from_txids(txids)
+    t_tree_build = time.perf_counter() - start
+    assert tree.root.hex() == root
+
+    rounds = max(1, rolls // 100) # the hex rebuild is slow: time fewer rolls and scale
+    start = time.perf_counter()
+    for extranonce in range(rounds):
+        hex_root = _hex_root([_coinbase_txid(extranonce)] + txids[1:])
+    t_hex_roll = (time.perf_counter() - start) / rounds
+    start = time.perf_counter()
+    for extranonce in range(rolls):
+        tree.replace(0, merkle.leaf(_coinbase_txid(extranonce)))
+    t_tree_roll = (time.perf_counter() - start) / rolls
+    tree.replace(0, merkle.leaf(_coinbase_txid(rounds - 1)))
+    assert tree.root.hex() == hex_root
+
+    print(f"leaves           : {leaves}")
+    print(f"build  hex       : {t_hex_build*1000:9.3f} ms")
+    print(f"build  MerkleTree: {t_tree_build*1000:9.3f} ms  ({t_hex_build/t_tree_build:.1f}x)")
+    print(f"roll   hex       : {t_hex_roll*1000:9.3f} ms per coinbase")
+    print(f"roll   MerkleTree: {t_tree_roll*1000:9.3f} ms per coinbase  ({t_hex_roll/t_tree_roll:.0f}x)")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
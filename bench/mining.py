@@ -0,0 +1,64 @@
+"""
+Microbenchmark: nonces/sec of the mining inner loop.
+
+Compares the loop blocks.mine_block used to run (full 80-byte header rebuilt and hashed, int target check)
+with miner.scan (SHA256 midstate + in-place nonce + bytes target check) and, when NumPy is installed, the
+batched helper.sha256_np backend. An unreachable target makes both
+loops run the whole range.
+
+Run from the repository root:  python bench/mining.py [nonces]
+"""
+import os
+import sys
+import time
+import hashlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import miner
+import helper.converter as convert
+import helper.sha256_np as sha256_np
+
+HEADER_WO_NONCE = bytes(range(76))
+UNREACHABLE = 0
+
+def _naive_scan(header_wo_nonce, target, start, stop):
+    block_header = header_wo_nonce + bytes.fromhex(convert.to_little_endian(start, 4))
+    nonce = start
+    while nonce < stop:
+        block_hash = hashlib.sha256(hashlib.sha256(block_header).digest()).digest()
+        if int.from_bytes(block_hash[::-1], "big") <= target:
+            return nonce, nonce - start + 1
+        nonce += 1
+        block_header = block_header[:-4] + bytes.fromhex(convert.to_little_endian(nonce, 4))
+    return None, nonce - start
+
+def _rate(fn, nonces, rounds=3):
+    best = float("inf")
+    for _ in range(rounds):
+        began = time.perf_counter()
+        fn(HEADER_WO_NONCE, UNREACHABLE, 0, nonces)
+        best = min(best, time.perf_counter() - began)
+    return nonces / best
+
+def main(nonces=200000):
+    # Both loops must agree on the hash they compare.
+    hasher = miner.HeaderHasher(HEADER_WO_NONCE)
+    for nonce in (0, 1, 0xdeadbeef, miner.NONCE_MAX):
+        header = HEADER_WO_NONCE + nonce.to_bytes(4, "little")
+        assert hasher.hash(nonce) == hashlib.sha256(hashlib.sha256(header).digest()).digest()
+
+    naive = _rate(_naive_scan, nonces)
+    midstate = _rate(miner.scan, nonces)
+    print(f"nonces per run    : {nonces}")
+    print(f"full header loop  : {naive:10.0f} nonces/s")
+    print(f"midstate loop     : {midstate:10.0f} nonces/s")
+    print(f"speed-up          : {midstate/naive:10.2f}x")
+    if sha256_np.AVAILABLE:
+        assert sha256_np.self_test()
+        batched = _rate(sha256_np.scan, nonces)
+        print(f"numpy batch       : {batched:10.0f} nonces/s  ({batched/naive:.2f}x, {sha256_np.BATCH_SIZE} lanes)")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
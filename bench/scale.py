@@ -0,0 +1,172 @@
+"""
+Benchmark: how the pipeline scales with the size of the mempool, checked against stored baselines.
+
+For every size, a synthetic mempool (bench/synth_mempool.py) is generated once into `<data>/<size>-<seed>/` and
+reused while its manifest matches. `src/blocks.py --metrics-out` then runs on it in a child process, and its
+per-stage timings (helper.instrument) are kept together with the wall time, peak RSS, the number of valid
+transactions and the time merkle_root_calculator needs for the txids of the whole mempool. Validation runs on one
+worker by default so stage times are comparable between machines with different CPU counts.
+
+Results are compared with BASELINE_FILE: a stage that got slower than `threshold` times its baseline (and by more
+than MIN_REGRESSION_SECONDS) is reported and the run exits with status 1. Stages bounded by a time budget or by
+luck (NOISY_STAGES) are shown but not checked. `--save` stores the results as the new baselines.
+
+Run from the repository root:
+    python bench/scale.py [--sizes 10000,100000,1000000] [--data DIR] [--workers N] [--threshold 1.25] [--save]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+import synth_mempool
+import helper.merkle_root as merkle
+
+###############
+## CONSTANTS ##
+###############
+SIZES = (10000, 100000, 1000000)
+BASELINE_FILE = os.path.join(ROOT, "bench", "baselines", "scale.json")
+DATA_DIR = os.path.join(tempfile.gettempdir(), "synth-mempool")
+THRESHOLD = 1.25
+MIN_REGRESSION_SECONDS = 0.05
+NOISY_STAGES = {"optimize", "mine", "mine.nonce", "total"} # time budget / nonce luck
+REPORTED_STAGES = ("scan", "parse", "serialize", "hash", "ecdsa", "validate", "graph", "template", "optimize",
+                   "mine.witness_commitment", "mine.merkle", "mine.nonce", "merkle.mempool", "pipeline")
+
+def dataset(size, data_dir, seed=1):
+    """
+    Directory of the synthetic mempool of `size` transactions, generated if missing or made with other arguments.
+
+    @param size    : Number of transactions.
+    @type  size    : int
+    @param data_dir: Directory holding the datasets.
+    @type  data_dir: str
+    @param seed    : Generator seed.
+    @type  seed    : int
+    @rtype         : str
+    """
+    path = os.path.join(data_dir, f"{size}-{seed}")
+    wanted = json.loads(json.dumps({"seed": seed, "transactions": size})) # tuples as stored in the manifest
+    try:
+        with open(os.path.join(path, "manifest.json")) as file:
+            if json.load(file) == wanted:
+                return path
+    except (OSError, ValueError):
+        pass
+    if os.path.isdir(os.path.join(path, "mempool")):
+        for name in os.listdir(os.path.join(path, "mempool")):
+            os.remove(os.path.join(path, "mempool", name))
+    print(f"generating {size} transactions into {path} ...", flush=True)
+    began = time.perf_counter()
+    synth_mempool.generate(size, path, seed=seed)
+    print(f"  done in {time.perf_counter() - began:.1f}s", flush=True)
+    return path
+
+def _merkle_seconds(size, rounds=3):
+    # Root over one txid per mempool transaction (the cost does not depend on their values).
+    rng = random.Random(size)
+    txids = [rng.randbytes(32).hex() for _ in range(size)]
+    best = float("inf")
+    for _ in range(rounds):
+        began = time.perf_counter()
+        merkle.merkle_root_calculator(txids)
+        best = min(best, time.perf_counter() - began)
+    return best
+
+def run(size, data_dir, workers=1):
+    """
+    Run blocks.py on the synthetic mempool of `size` transactions.
+
+    @return: `stages` (name -> seconds), `counters`, `wall_seconds` and `peak_rss_mb`.
+    @rtype : dict
+    """
+    path = dataset(size, data_dir)
+    metrics_file = os.path.join(path, "metrics.json")
+    began = time.perf_counter()
+    child = subprocess.Popen([sys.executable, os.path.join(ROOT, "src", "blocks.py"), "--workers", str(workers),
+                              "--metrics-out", metrics_file], cwd=path, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(child.pid, 0)
+    wall = time.perf_counter() - began
+    child.returncode = os.waitstatus_to_exitcode(status)
+    if child.returncode:
+        raise RuntimeError(f"blocks.py failed on {path} (exit status {child.returncode})")
+    with open(metrics_file) as file:
+        metrics = json.load(file)
+    stages = {name: stage["seconds"] for name, stage in metrics["stages"].items()}
+    stages["pipeline"] = stages["total"] - stages.get("mine.nonce", 0.0) - stages.get("optimize", 0.0)
+    stages["merkle.mempool"] = _merkle_seconds(size)
+    return {"stages": stages, "counters": metrics["counters"], "wall_seconds": wall,
+            "peak_rss_mb": usage.ru_maxrss / 1024}
+
+def compare(results, baselines, threshold=THRESHOLD):
+    """
+    Print every result next to its baseline.
+
+    @return: (size, stage, seconds, baseline seconds) of every regression.
+    @rtype : list
+    """
+    regressions = []
+    for size, result in results.items():
+        base = baselines.get(str(size), {}).get("stages", {})
+        print(f"\n{size} transactions: {result['counters'].get('txns.valid', 0)} valid, wall {result['wall_seconds']:.1f}s,"
+              f" peak RSS {result['peak_rss_mb']:.0f} MB")
+        for stage in REPORTED_STAGES:
+            seconds = result["stages"].get(stage)
+            if seconds is None:
+                continue
+            line = f"  {stage:24s} {seconds:9.3f}s"
+            if stage in base:
+                ratio = seconds / base[stage] if base[stage] else float("inf")
+                line += f"  baseline {base[stage]:9.3f}s  {ratio:5.2f}x"
+                if (stage not in NOISY_STAGES and ratio > threshold
+                        and seconds - base[stage] > MIN_REGRESSION_SECONDS):
+                    line += "  REGRESSION"
+                    regressions.append((size, stage, seconds, base[stage]))
+            print(line)
+    return regressions
+
+def _machine():
+    return {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on synthetic mempools of growing size.")
+    parser.add_argument("--sizes", type=lambda text: [int(n) for n in text.split(",")], default=list(SIZES))
+    parser.add_argument("--data", default=DATA_DIR, help="directory for the generated mempools")
+    parser.add_argument("--workers", type=int, default=1, help="validation processes passed to blocks.py")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="slowdown factor reported as a regression")
+    parser.add_argument("--baselines", default=BASELINE_FILE)
+    parser.add_argument("--save", action="store_true", help="store the results as the new baselines")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.baselines) as file:
+            baselines = json.load(file)
+    except OSError:
+        baselines = {}
+    results = {size: run(size, args.data, args.workers) for size in args.sizes}
+    regressions = compare(results, baselines, args.threshold)
+
+    if args.save:
+        for size, result in results.items():
+            baselines[str(size)] = dict(result, **_machine())
+        os.makedirs(os.path.dirname(args.baselines), exist_ok=True)
+        with open(args.baselines, "w") as file:
+            json.dump(baselines, file, indent=1, sort_keys=True)
+        print(f"\nbaselines saved to {args.baselines}")
+    elif regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold}x")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
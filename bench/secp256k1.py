@@ -0,0 +1,118 @@
+"""
+Benchmark: signature verification throughput of the backends in helper.sigcache.BACKENDS.
+
+Random keys sign random digests: ECDSA (low-S, DER) and BIP340, signed here with helper.secp256k1's own point
+multiplication so the benchmark runs without coincurve. Every backend verifies the same signatures one at a time
+and, for BIP340, in batches of each size given. Also timed: building helper.secp256k1's generator table and loading
+it from disk, and parsing the keys.
+
+Run from the repository root:  python bench/secp256k1.py [signatures] [rounds]
+"""
+import os
+import sys
+import time
+import secrets
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import helper.secp256k1 as secp256k1
+import helper.sigcache as sigcache
+
+BATCH_SIZES = (16, 64, 256)
+
+def _point(scalar):
+    # Affine scalar * G.
+    return secp256k1._to_affine([secp256k1._multiply([], scalar)])[0]
+
+def _der(value):
+    data = value.to_bytes(33, "big").lstrip(b"\x00")
+    if not data or data[0] & 0x80:
+        data = b"\x00" + data
+    return b"\x02" + bytes([len(data)]) + data
+
+def _sign_ecdsa(secret, digest):
+    z = int.from_bytes(digest, "big") % secp256k1.N
+    while True:
+        nonce = secrets.randbelow(secp256k1.N - 1) + 1
+        r = _point(nonce)[0] % secp256k1.N
+        s = pow(nonce, -1, secp256k1.N) * (z + r * secret) % secp256k1.N
+        if r and s:
+            s = min(s, secp256k1.N - s)
+            body = _der(r) + _der(s)
+            return b"\x30" + bytes([len(body)]) + body
+
+def _sign_schnorr(secret, message):
+    x, y = _point(secret)
+    if y & 1:
+        secret = secp256k1.N - secret
+    nonce = secrets.randbelow(secp256k1.N - 1) + 1
+    rx, ry = _point(nonce)
+    if ry & 1:
+        nonce = secp256k1.N - nonce
+    r_bytes = rx.to_bytes(32, "big")
+    e = secp256k1._challenge(r_bytes, secp256k1.PublicKey(x, 0), message)
+    return r_bytes + ((nonce + e * secret) % secp256k1.N).to_bytes(32, "big")
+
+def signatures(count):
+    """
+    @return: (SEC key, DER signature, digest) and (x-only key, BIP340 signature, message) triples, `count` of each.
+    @rtype : tuple[list, list]
+    """
+    ecdsa, schnorr = [], []
+    for _ in range(count):
+        secret = secrets.randbelow(secp256k1.N - 1) + 1
+        x, y = _point(secret)
+        digest = secrets.token_bytes(32)
+        ecdsa.append((bytes([2 | y & 1]) + x.to_bytes(32, "big"), _sign_ecdsa(secret, digest), digest))
+        schnorr.append((x.to_bytes(32, "big"), _sign_schnorr(secret, digest), digest))
+    return ecdsa, schnorr
+
+def _best(fn, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _tables(rounds):
+    path = os.path.join(tempfile.mkdtemp(), "g.table")
+    built = _best(secp256k1.build_table, rounds)
+    secp256k1.save_table(secp256k1.build_table(), path)
+    loaded = _best(lambda: secp256k1.load_table(path), rounds)
+    os.remove(path)
+    print(f"generator table   : build {built*1000:7.1f} ms, load {loaded*1000:7.1f} ms")
+
+def _backend(name, ecdsa, schnorr, rounds):
+    backend = sigcache.BACKENDS[name]
+    ecdsa_keys = [(backend.parse_pubkey(key), sig, msg) for key, sig, msg in ecdsa]
+    schnorr_keys = [(backend.parse_xonly(key), sig, msg) for key, sig, msg in schnorr]
+    assert all(backend.verify_ecdsa(*item) for item in ecdsa_keys)
+    assert all(backend.verify_schnorr(*item) for item in schnorr_keys)
+    parse = _best(lambda: [backend.parse_pubkey(key) for key, _, _ in ecdsa], rounds)
+    t_ecdsa = _best(lambda: [backend.verify_ecdsa(*item) for item in ecdsa_keys], rounds)
+    t_schnorr = _best(lambda: [backend.verify_schnorr(*item) for item in schnorr_keys], rounds)
+    count = len(ecdsa)
+    print(f"{name}")
+    print(f"  parse keys      : {count/parse:10.0f} keys/s")
+    print(f"  ECDSA           : {count/t_ecdsa:10.0f} signatures/s")
+    print(f"  BIP340          : {count/t_schnorr:10.0f} signatures/s")
+    for size in BATCH_SIZES:
+        batches = [schnorr_keys[i:i + size] for i in range(0, count - count % size, size)]
+        if not batches:
+            continue
+        assert all(backend.verify_schnorr_batch(batch) for batch in batches)
+        seconds = _best(lambda: [backend.verify_schnorr_batch(batch) for batch in batches], rounds)
+        print(f"  BIP340 batch {size:<3d}: {len(batches) * size/seconds:10.0f} signatures/s")
+
+def main(count=256, rounds=3):
+    _tables(rounds)
+    secp256k1.generator_table()
+    ecdsa, schnorr = signatures(count)
+    for name in sorted(sigcache.BACKENDS):
+        _backend(name, ecdsa, schnorr, rounds)
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
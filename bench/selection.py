@@ -0,0 +1,42 @@
+"""
+Benchmark: block fees vs. wall time of block_optimizer.optimize on the bundled mempool.
+
+The greedy ancestor-package template is the 0s baseline; the optimizer is then given growing time budgets.
+Smaller weight limits (second argument, in WU) make the knapsack tighter and leave more room for swaps.
+
+Run from the repository root:  python bench/selection.py [max_weight ...]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+os.chdir(ROOT)
+
+import list_valid_txn
+import block_template
+import block_optimizer
+import mempool_graph
+
+BUDGETS = (0.01, 0.05, 0.1, 0.5, 1.0, 2.0)
+
+def main(*max_weights):
+    if not max_weights:
+        max_weights = (block_template.MAX_BLOCK_WEIGHT - block_template.COINBASE_RESERVED_WEIGHT, 1000000, 250000)
+    transactions = list_valid_txn.list_valid_txn(workers=1)
+    graph = mempool_graph.MempoolGraph(list_valid_txn.read_transactions())
+    print(f"valid transactions: {len(transactions)}")
+    for max_weight in max_weights:
+        began = time.perf_counter()
+        greedy, greedy_fee, greedy_weight = block_template.build_template(transactions, max_weight, graph)
+        print(f"\nmax weight {max_weight} WU")
+        print(f"  greedy            : {greedy_fee:>10} sat  {greedy_weight:>8} WU  {time.perf_counter() - began:7.3f}s")
+        for seconds in BUDGETS:
+            began = time.perf_counter()
+            _, fee, weight = block_optimizer.optimize(transactions, seconds, max_weight, start=greedy, graph=graph)
+            elapsed = time.perf_counter() - began
+            print(f"  optimize {seconds:5.2f}s    : {fee:>10} sat  {weight:>8} WU  {elapsed:7.3f}s  (+{fee - greedy_fee} sat)")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
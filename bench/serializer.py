@@ -0,0 +1,83 @@
+"""
+Benchmark: hex-string serializer vs. helper.serializer on the bundled mempool.
+
+Run from the repository root:  python bench/serializer.py
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+os.chdir(ROOT)
+
+import helper.converter as convert
+import helper.serializer as serializer
+import helper.txn_model as txn_model
+
+def _hex_serialize(tx, with_witness):
+    # The f-string `+=` serializer that helper/txn_info.py used before helper.serializer (fields are bytes since
+    # the projection loader, so they are turned back into hex here).
+    txn_hash = f"{convert.to_little_endian(tx.version, 4)}"
+    if with_witness and any(iN.witness for iN in tx.vin):
+        txn_hash += "0001"
+    txn_hash += f"{str(convert.to_compact_size(len(tx.vin)))}"
+    for iN in tx.vin:
+        txn_hash += f"{bytes.fromhex(iN.txid)[::-1].hex()}"
+        txn_hash += f"{convert.to_little_endian(iN.vout, 4)}"
+        txn_hash += f"{convert.to_compact_size(len(iN.scriptsig))}"
+        txn_hash += f"{iN.scriptsig.hex()}"
+        txn_hash += f"{convert.to_little_endian(iN.sequence, 4)}"
+    txn_hash += f"{str(convert.to_compact_size(len(tx.vout)))}"
+    for out in tx.vout:
+        txn_hash += f"{convert.to_little_endian(out.value, 8)}"
+        txn_hash += f"{convert.to_compact_size(len(out.scriptpubkey))}"
+        txn_hash += f"{out.scriptpubkey.hex()}"
+    if with_witness:
+        for iN in tx.vin:
+            if iN.witness:
+                txn_hash += f"{convert.to_compact_size(len(iN.witness))}"
+                for j in iN.witness:
+                    txn_hash += f"{convert.to_compact_size(len(j))}"
+                    txn_hash += f"{j.hex()}"
+    txn_hash += f"{convert.to_little_endian(tx.locktime, 4)}"
+    return txn_hash
+
+def _hex_ids(tx):
+    txid = convert.to_reverse_bytes_string(convert.to_hash256(_hex_serialize(tx, False)))
+    wtxid = convert.to_reverse_bytes_string(convert.to_hash256(_hex_serialize(tx, True)))
+    return txid, wtxid
+
+def _bytes_ids(tx):
+    ser = serializer.serialize(tx)
+    return ser.txid_hash()[::-1].hex(), ser.wtxid_hash()[::-1].hex()
+
+def _time(fn, txns, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for tx in txns:
+            fn(tx)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(rounds=3):
+    names = sorted(f[:-5] for f in os.listdir(txn_model.MEMPOOL_DIR) if f.endswith(".json"))
+    txns = [txn_model.load(name) for name in names]
+
+    txid_mismatch = sum(_hex_ids(tx)[0] != _bytes_ids(tx)[0] for tx in txns)
+    wtxid_mismatch = sum(_hex_ids(tx)[1] != _bytes_ids(tx)[1] for tx in txns)
+
+    t_hex = _time(_hex_ids, txns, rounds)
+    t_bytes = _time(_bytes_ids, txns, rounds)
+
+    print(f"transactions      : {len(txns)}")
+    print(f"hex serializer    : {t_hex*1000:8.1f} ms  ({len(txns)/t_hex:10.0f} tx/s)")
+    print(f"bytes serializer  : {t_bytes*1000:8.1f} ms  ({len(txns)/t_bytes:10.0f} tx/s)")
+    print(f"speed-up          : {t_hex/t_bytes:8.2f}x")
+    print(f"txid mismatches   : {txid_mismatch}")
+    # The hex serializer skips the empty witness stack of non-witness inputs in a segwit txn, so its wtxid is wrong there.
+    print(f"wtxid mismatches  : {wtxid_mismatch}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark: reading every mempool transaction from the directory vs. from a packed snapshot (helper.snapshot).
+
+Loads every transaction and computes its txid: from the `.json` files (helper.txn_model.load, one open and one JSON
+parse per file, the txid needs a re-serialization) and from a raw and a zlib snapshot (one mmap, the record already
+holds the serialization). Snapshots are packed into a temporary directory first. Times are the best of `rounds`
+passes with a warm page cache.
+
+Run from the repository root:  python bench/snapshot.py [rounds]
+"""
+import os
+import sys
+import time
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+os.chdir(ROOT)
+
+import helper.snapshot as snapshot
+import helper.txn_model as txn_model
+
+def _time(load, names, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        kept = [load(name).txid for name in names]
+        best = min(best, time.perf_counter() - start)
+        del kept
+    return best
+
+def main(rounds=3):
+    names = sorted(f[:-5] for f in os.listdir(txn_model.MEMPOOL_DIR) if f.endswith(".json"))
+    size = sum(os.path.getsize(os.path.join(txn_model.MEMPOOL_DIR, f"{name}.json")) for name in names)
+    print(f"{'directory':16s}: {len(names)} files, {size / 1e6:5.1f} MB")
+    base = _time(txn_model.load, names, rounds)
+    print(f"{'  load + txid':16s}: {base*1000:7.0f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, compress in (("raw snapshot", False), ("zlib snapshot", True)):
+            path = os.path.join(tmp, f"{label.split()[0]}.pack")
+            start = time.perf_counter()
+            stats = snapshot.pack(path, compress=compress)
+            packing = time.perf_counter() - start
+            print(f"{label:16s}: 1 file, {os.path.getsize(path) / 1e6:5.1f} MB (packed {stats['records']} records"
+                  f" in {packing:.1f} s)")
+            snap = snapshot.Snapshot(path)
+            seconds = _time(snap.load, names, rounds)
+            print(f"{'  load + txid':16s}: {seconds*1000:7.0f} ms ({base/seconds:4.2f}x)")
+            snap.close()
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,275 @@
+"""
+Synthetic mempool generator: N validly signed transactions in the schema of mempool/*.json.
+
+Every input is signed with coincurve (RFC 6979, low-S) over the digest helper.sighash computes for it: legacy for
+p2pkh, BIP143 for v0_p2wpkh and p2sh (nested p2sh-p2wpkh). Outputs pay to the same three types, so a share of the
+inputs (`chain`) can spend outputs of earlier generated transactions, up to MAX_CHAIN_DEPTH unconfirmed ancestors;
+the other inputs spend made-up confirmed outputs. Keys come from a pool of KEY_POOL_SIZE, so public keys repeat as
+they do in a real mempool. The same arguments and seed give the same files.
+
+Files are written as `<out_dir>/mempool/<sha256(txid)>.json`, the naming validate_txn checks, next to a
+`manifest.json` holding the arguments (see bench/scale.py, which reuses a dataset only if they match).
+
+Run from the repository root:
+    python bench/synth_mempool.py N OUT_DIR [--mix p2pkh=0.15,v0_p2wpkh=0.7,p2sh=0.15] [--inputs 1-3]
+                                            [--outputs 1-3] [--chain 0.2] [--feerate 1-50] [--seed 1]
+"""
+import os
+import sys
+import json
+import random
+import hashlib
+import argparse
+import coincurve
+from Crypto.Hash import RIPEMD160
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import helper.script as script
+import helper.sighash as sighash
+import helper.txn_model as txn_model
+
+###############
+## CONSTANTS ##
+###############
+TYPES = ("p2pkh", "v0_p2wpkh", "p2sh")
+DEFAULT_MIX = {"p2pkh": 0.15, "v0_p2wpkh": 0.7, "p2sh": 0.15}
+KEY_POOL_SIZE = 1024
+MAX_CHAIN_DEPTH = 24 # unconfirmed ancestors of a transaction (Bitcoin Core's default ancestor limit is 25 with itself)
+DUST = 546
+MIN_CHAINED_VALUE = 20000 # smaller generated outputs are not spent again
+FUNDING_VALUES = (20000, 5000000)
+SEQUENCE = 0xfffffffd
+# Size estimates for the fee (vbytes): inputs with a 72-byte signature, outputs, version + counts + locktime
+INPUT_VBYTES = {"p2pkh": 148, "v0_p2wpkh": 68, "p2sh": 91}
+OUTPUT_VBYTES = {"p2pkh": 34, "v0_p2wpkh": 31, "p2sh": 32}
+OVERHEAD_VBYTES = 11
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+BECH32_ALPHABET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+
+##################
+# Address format #
+##################
+def _hash160(data):
+    return RIPEMD160.new(hashlib.sha256(data).digest()).digest()
+
+def _base58check(version, payload):
+    data = bytes([version]) + payload
+    data += hashlib.sha256(hashlib.sha256(data).digest()).digest()[:4]
+    number = int.from_bytes(data, "big")
+    encoded = ""
+    while number:
+        number, digit = divmod(number, 58)
+        encoded = BASE58_ALPHABET[digit] + encoded
+    return "1" * (len(data) - len(data.lstrip(b"\0"))) + encoded
+
+def _bech32_polymod(values):
+    generator = (0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3)
+    checksum = 1
+    for value in values:
+        top = checksum >> 25
+        checksum = (checksum & 0x1ffffff) << 5 ^ value
+        for i in range(5):
+            checksum ^= generator[i] if (top >> i) & 1 else 0
+    return checksum
+
+def _segwit_v0_address(program, hrp="bc"):
+    data, acc, bits = [0], 0, 0 # witness version 0, then the program regrouped in 5-bit words
+    for byte in program:
+        acc, bits = acc << 8 | byte, bits + 8
+        while bits >= 5:
+            bits -= 5
+            data.append(acc >> bits & 31)
+    if bits:
+        data.append(acc << (5 - bits) & 31)
+    expanded = [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+    polymod = _bech32_polymod(expanded + data + [0] * 6) ^ 1
+    checksum = [polymod >> 5 * (5 - i) & 31 for i in range(6)]
+    return hrp + "1" + "".join(BECH32_ALPHABET[d] for d in data + checksum)
+
+class _Key:
+    __slots__ = ("private", "pubkey", "pkh", "scripts")
+
+    def __init__(self, secret):
+        self.private = coincurve.PrivateKey(secret)
+        self.pubkey = self.private.public_key.format(compressed=True)
+        self.pkh = _hash160(self.pubkey)
+        redeem = b"\x00\x14" + self.pkh
+        self.scripts = { # type -> (scriptpubkey, address, p2sh redeem script)
+            "p2pkh": (b"\x76\xa9\x14" + self.pkh + b"\x88\xac", _base58check(0x00, self.pkh), None),
+            "v0_p2wpkh": (redeem, _segwit_v0_address(self.pkh), None),
+            "p2sh": (b"\xa9\x14" + _hash160(redeem) + b"\x87", _base58check(0x05, _hash160(redeem)), redeem),
+        }
+
+    def sign(self, digest):
+        return self.private.sign(digest, hasher=None) + bytes([sighash.SIGHASH_ALL])
+
+def _output(key, spk_type, value):
+    scriptpubkey, address, _ = key.scripts[spk_type]
+    return {"scriptpubkey": scriptpubkey.hex(), "scriptpubkey_asm": script.disassemble(scriptpubkey),
+            "scriptpubkey_type": spk_type, "scriptpubkey_address": address, "value": value}
+
+def _push(data):
+    return bytes([len(data)]) + data # every push here is shorter than OP_PUSHDATA1
+
+class Generator:
+    """
+    Deterministic source of signed transactions (see the module docstring).
+    """
+
+    def __init__(self, mix=None, inputs=(1, 3), outputs=(1, 3), chain=0.2, feerate=(1, 50), seed=1):
+        """
+        @param mix    : Share of every scriptpubkey type (TYPES) among outputs and confirmed prevouts.
+        @type  mix    : dict
+        @param inputs : Inclusive range of the number of inputs per transaction.
+        @type  inputs : tuple[int, int]
+        @param outputs: Inclusive range of the number of outputs per transaction.
+        @type  outputs: tuple[int, int]
+        @param chain  : Probability that an input spends an output of an earlier generated transaction.
+        @type  chain  : float
+        @param feerate: Inclusive range of the fee rate (sat/vB).
+        @type  feerate: tuple[int, int]
+        @param seed   : Random seed.
+        @type  seed   : int
+        """
+        mix = dict(DEFAULT_MIX if mix is None else mix)
+        unknown = set(mix) - set(TYPES)
+        if unknown:
+            raise ValueError(f"unknown scriptpubkey types: {', '.join(sorted(unknown))}")
+        self.types = [t for t in TYPES if mix.get(t, 0) > 0]
+        self.weights = [mix[t] for t in self.types]
+        self.inputs = inputs
+        self.outputs = outputs
+        self.chain = chain
+        self.feerate = feerate
+        self.rng = random.Random(seed)
+        self.keys = [_Key(hashlib.sha256(f"synth-{seed}-{i}".encode()).digest()) for i in range(KEY_POOL_SIZE)]
+        self._unspent = [] # (txid, vout, type, key, value, depth) of generated outputs
+
+    def _funding(self):
+        # A confirmed output: made-up txid, outside the generated mempool.
+        return (self.rng.randbytes(32).hex(), self.rng.randrange(4), self._type(), self.rng.choice(self.keys),
+                self.rng.randint(*FUNDING_VALUES), 0)
+
+    def _type(self):
+        return self.rng.choices(self.types, self.weights)[0]
+
+    def _spend_unconfirmed(self):
+        # Remove a random generated output from the pool (swap with the last one, pop).
+        i = self.rng.randrange(len(self._unspent))
+        self._unspent[i], self._unspent[-1] = self._unspent[-1], self._unspent[i]
+        return self._unspent.pop()
+
+    def transaction(self):
+        """
+        Generate the next transaction.
+
+        @return: (file name, JSON object)
+        @rtype : tuple[str, dict]
+        """
+        rng = self.rng
+        spent = [self._spend_unconfirmed() if self._unspent and rng.random() < self.chain else self._funding()
+                 for _ in range(rng.randint(*self.inputs))]
+        depth = max(coin[5] for coin in spent) + 1
+        total_in = sum(coin[4] for coin in spent)
+
+        out_types = [self._type() for _ in range(rng.randint(*self.outputs))]
+        vbytes = OVERHEAD_VBYTES + sum(INPUT_VBYTES[coin[2]] for coin in spent) + sum(OUTPUT_VBYTES[t] for t in out_types)
+        available = total_in - rng.randint(*self.feerate) * vbytes
+        while len(out_types) > 1 and available < DUST * len(out_types):
+            out_types.pop()
+        if available < DUST: # a fee rate the inputs cannot pay: spend what they have minus a minimal fee
+            available = max(DUST, total_in - vbytes)
+        shares = [rng.random() + 0.1 for _ in out_types]
+        values = [DUST + int((available - DUST * len(out_types)) * share / sum(shares)) for share in shares]
+        out_keys = [rng.choice(self.keys) for _ in out_types]
+        vout = [_output(key, t, value) for key, t, value in zip(out_keys, out_types, values)]
+
+        # Unsigned transaction for the sighashes (neither digest covers scriptsigs or witnesses).
+        prevouts = [txn_model.TxOut(value, key.scripts[t][0], t) for _, _, t, key, value, _ in spent]
+        unsigned = txn_model.Transaction(
+            None, 2, 0,
+            [txn_model.TxIn(coin[0], coin[1], prevout, b"", [], SEQUENCE) for coin, prevout in zip(spent, prevouts)],
+            [txn_model.TxOut(value, key.scripts[t][0]) for key, t, value in zip(out_keys, out_types, values)])
+
+        vin = []
+        for index, (txid, n, spk_type, key, value, _) in enumerate(spent):
+            entry = {"txid": txid, "vout": n, "prevout": _output(key, spk_type, value)}
+            if spk_type == "p2pkh":
+                signature = key.sign(unsigned.legacy.digest(index, prevouts[index].scriptpubkey))
+                scriptsig, witness = _push(signature) + _push(key.pubkey), None
+            else:
+                script_code = sighash.p2wpkh_script_code(key.pkh)
+                signature = key.sign(unsigned.bip143.digest(index, script_code, value))
+                redeem = key.scripts[spk_type][2]
+                scriptsig, witness = (_push(redeem) if redeem else b""), [signature.hex(), key.pubkey.hex()]
+            entry["scriptsig"] = scriptsig.hex()
+            entry["scriptsig_asm"] = script.disassemble(scriptsig)
+            if witness is not None:
+                entry["witness"] = witness
+            entry["is_coinbase"] = False
+            entry["sequence"] = SEQUENCE
+            if spk_type == "p2sh":
+                entry["inner_redeemscript_asm"] = script.disassemble(redeem)
+            vin.append(entry)
+        data = {"version": 2, "locktime": 0, "vin": vin, "vout": vout}
+
+        txid = txn_model.Transaction.from_dict(None, data).txid
+        for n, (key, t, value) in enumerate(zip(out_keys, out_types, values)):
+            if value >= MIN_CHAINED_VALUE and depth < MAX_CHAIN_DEPTH:
+                self._unspent.append((txid, n, t, key, value, depth))
+        return hashlib.sha256(bytes.fromhex(txid)).hexdigest(), data
+
+def _dumps(data):
+    if txn_model.orjson is not None:
+        return txn_model.orjson.dumps(data, option=txn_model.orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode()
+
+def generate(n, out_dir, **options):
+    """
+    Write `n` transactions to `<out_dir>/mempool/` and the arguments to `<out_dir>/manifest.json`.
+
+    @param n      : Number of transactions.
+    @type  n      : int
+    @param out_dir: Dataset directory (created if missing; existing transaction files are left alone).
+    @type  out_dir: str
+    @param options: Generator arguments.
+    @return       : The manifest: `transactions` plus the Generator arguments.
+    @rtype        : dict
+    """
+    mempool_dir = os.path.join(out_dir, txn_model.MEMPOOL_DIR)
+    os.makedirs(mempool_dir, exist_ok=True)
+    generator = Generator(**options)
+    for _ in range(n):
+        name, data = generator.transaction()
+        with open(os.path.join(mempool_dir, f"{name}.json"), "wb") as file:
+            file.write(_dumps(data))
+    manifest = dict(options, transactions=n)
+    with open(os.path.join(out_dir, "manifest.json"), "w") as file:
+        json.dump(manifest, file, indent=1)
+    return manifest
+
+def _range(text):
+    low, _, high = text.partition("-")
+    return (int(low), int(high or low))
+
+def _mix(text):
+    return {name: float(share) for name, share in (item.split("=") for item in text.split(","))}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic mempool of validly signed transactions.")
+    parser.add_argument("n", type=int, help="number of transactions")
+    parser.add_argument("out_dir", help="dataset directory (transactions go to OUT_DIR/mempool)")
+    parser.add_argument("--mix", type=_mix, default=DEFAULT_MIX, help="share of every scriptpubkey type, e.g. p2pkh=0.2,v0_p2wpkh=0.8")
+    parser.add_argument("--inputs", type=_range, default=(1, 3), help="inputs per transaction, LOW-HIGH")
+    parser.add_argument("--outputs", type=_range, default=(1, 3), help="outputs per transaction, LOW-HIGH")
+    parser.add_argument("--chain", type=float, default=0.2, help="probability that an input spends a generated output")
+    parser.add_argument("--feerate", type=_range, default=(1, 50), help="fee rate in sat/vB, LOW-HIGH")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    generate(args.n, args.out_dir, mix=args.mix, inputs=args.inputs, outputs=args.outputs, chain=args.chain,
+             feerate=args.feerate, seed=args.seed)
@@ -1,10 +1,10 @@
 #!/bin/bash
 
-# Install coincurve
-pip install coincurve
+# Install pycryptodome if missing
+python -c "import Crypto" 2>/dev/null || pip install pycryptodome
 
-# Install pycryptodome
-pip install pycryptodome
+# Install coincurve if missing; without it signatures are verified in pure Python (helper/secp256k1.py), only slower
+python -c "import coincurve" 2>/dev/null || pip install coincurve || echo "coincurve unavailable: using the pure-Python verifier"
 
 # Run blocks.py
-python src/blocks.py
\ No newline at end of file
+python src/blocks.py
@@ -0,0 +1,226 @@
+import time
+import bisect
+import block_template
+import mempool_graph
+
+###############
+## CONSTANTS ##
+###############
+OPTIMIZE_SECONDS = 1.0 # default time budget on top of the greedy template
+CHECK_INTERVAL = 64 # moves tried between two looks at the clock
+
+class _Candidates:
+    """
+    Transactions that could join the block right now (every in-mempool parent already selected), sorted by weight,
+    with a running best-fee index so "most fee within a weight budget" is one bisect.
+    """
+    __slots__ = ("names", "weights", "best", "expired")
+
+    def __init__(self, names, fee, weight, rank, deadline):
+        """
+        @param names   : The candidates.
+        @type  names   : iterable of str
+        @param fee     : Fee of every transaction.
+        @type  fee     : dict
+        @param weight  : Weight of every transaction.
+        @type  weight  : dict
+        @param rank    : Position of every transaction in (weight, -fee, name) order, so sorting is one int lookup.
+        @type  rank    : dict
+        @param deadline: time.perf_counter() value at which to stop; `expired` is then set and the index only covers
+                         the lightest candidates (still correct for them).
+        @type  deadline: float
+        """
+        self.names = sorted(names, key=rank.__getitem__)
+        self.weights = []
+        self.best = []
+        self.expired = False
+        top = None
+        for i, name in enumerate(self.names):
+            if i % CHECK_INTERVAL == 0 and time.perf_counter() >= deadline:
+                self.expired = True
+                del self.names[i:]
+                break
+            if top is None or fee[name] > fee[self.names[top]]:
+                top = i
+            self.weights.append(weight[name])
+            self.best.append(top)
+
+    def richest(self, budget, fee, exclude=()):
+        """
+        Highest-fee candidate of weight <= budget that is not in `exclude`, or None.
+        """
+        end = bisect.bisect_right(self.weights, budget)
+        if not end:
+            return None
+        name = self.names[self.best[end - 1]]
+        if name not in exclude:
+            return name
+        found = None
+        for i in range(end):
+            n = self.names[i]
+            if n not in exclude and (found is None or fee[n] > fee[found]):
+                found = n
+        return found
+
+def optimize(txn_files, seconds=OPTIMIZE_SECONDS, max_weight=block_template.MAX_BLOCK_WEIGHT - block_template.COINBASE_RESERVED_WEIGHT, start=None,
+             graph=None):
+    """
+    Anytime improvement of the block template's fees under the weight limit.
+
+    Starts from the ancestor-package greedy result (block_template.build_template) and runs a local search until
+    the deadline or a local optimum, whichever comes first:
+        - fill  : add the richest candidate that fits the free weight,
+        - 1-for-1 / 1-for-2: drop a selected transaction without selected descendants and add one or two candidates
+          that fit the freed weight and pay more in total,
+        - k-for-1: drop the lowest-feerate such transactions until a left-out one fits, if it pays more than them.
+    Candidates are transactions whose in-mempool parents are all selected and that double spend nothing selected,
+    so every intermediate block is valid (parents before children) and the best block seen so far is always what
+    is returned.
+
+    @param txn_files : Valid transaction files to choose from.
+    @type  txn_files : list of str
+    @param seconds   : Time budget, setup included (0 returns the greedy template unchanged); once it is spent the
+                       best block so far is returned, which is `start` if the search did not get to improve it.
+    @type  seconds   : float
+    @param max_weight: Weight available for these transactions (default: block limit minus the coinbase reserve).
+    @type  max_weight: int
+    @param start     : Starting block (selected files in block order); default: build_template's result.
+    @type  start     : list of str
+    @param graph     : Dependency graph of the whole mempool (see block_template.build_template).
+    @type  graph     : mempool_graph.MempoolGraph
+    @return          : (selected files in block order, total fees, total weight)
+    @rtype           : tuple[list of str, int, int]
+    """
+    deadline = time.perf_counter() + seconds
+    if graph is None:
+        graph = mempool_graph.MempoolGraph(txn_files)
+    if start is None:
+        start, _, _ = block_template.build_template(txn_files, max_weight, graph)
+    txns = graph.txns
+    greedy = (list(start), sum(txns[n].fee for n in start), sum(txns[n].weight[1] for n in start))
+    if seconds <= 0 or time.perf_counter() >= deadline:
+        return greedy
+
+    #########
+    # Setup #
+    #########
+    # No need for graph.orphaned(): a transaction with an ancestor outside `txn_files` never has all its parents in
+    # the block, so fits() never lets it in.
+    fee, weight = {}, {}
+    for i, name in enumerate(txn_files):
+        if i % CHECK_INTERVAL == 0 and time.perf_counter() >= deadline:
+            return greedy
+        tx = txns[name]
+        fee[name] = tx.fee
+        weight[name] = tx.weight[1]
+    # (-fee, name) and (weight, -fee, name) orders from stable C-keyed sorts, least significant key first
+    by_fee = sorted(fee)
+    by_fee.sort(key=fee.__getitem__, reverse=True)
+    rank = {name: i for i, name in enumerate(sorted(by_fee, key=weight.__getitem__))}
+    parents, children, conflicts = graph.parents, graph.children, graph.conflicts
+
+    selected = dict.fromkeys(start) # insertion-ordered, O(1) removal
+    in_block = set(selected)
+    _, block_fee, block_weight = greedy
+    if time.perf_counter() >= deadline:
+        return greedy
+
+    def fits(name):
+        return name in fee and name not in in_block and parents[name] <= in_block and not (conflicts[name] & in_block)
+
+    addable = set() # kept up to date by add() and remove()
+    for i, name in enumerate(fee):
+        if i % CHECK_INTERVAL == 0 and time.perf_counter() >= deadline:
+            return greedy
+        if fits(name):
+            addable.add(name)
+
+    def add(name):
+        nonlocal block_weight, block_fee
+        selected[name] = None # its parents are already in, so appending keeps the block order valid
+        in_block.add(name)
+        block_weight += weight[name]
+        block_fee += fee[name]
+        addable.discard(name)
+        addable.difference_update(conflicts[name])
+        addable.update(c for c in children[name] if fits(c))
+
+    def remove(name):
+        nonlocal block_weight, block_fee
+        del selected[name]
+        in_block.discard(name)
+        block_weight -= weight[name]
+        block_fee -= fee[name]
+        addable.difference_update(children[name])
+        addable.update(n for n in conflicts[name] | {name} if fits(n))
+
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        pool = _Candidates(addable, fee, weight, rank, deadline)
+        if pool.expired:
+            break
+
+        ########
+        # Fill #
+        ########
+        name = pool.richest(max_weight - block_weight, fee)
+        if name is not None:
+            add(name)
+            improved = True
+            continue
+
+        #########
+        # Swaps #
+        #########
+        # Cheapest leaves first: they are the most likely to be beaten by something left out.
+        leaves = sorted((n for n in selected if not (children[n] & in_block)), key=lambda n: (fee[n], n))
+        for tried, out in enumerate(leaves):
+            if tried % CHECK_INTERVAL == 0 and time.perf_counter() >= deadline:
+                break
+            budget = max_weight - block_weight + weight[out]
+            exclude = children[out] # can't stay in without `out`
+            first = pool.richest(budget, fee, exclude)
+            if first is None:
+                continue
+            second = pool.richest(budget - weight[first], fee, exclude | conflicts[first] | {first})
+            gain = fee[first] + (fee[second] if second is not None else 0) - fee[out]
+            if gain > 0:
+                remove(out)
+                add(first)
+                if second is not None:
+                    add(second)
+                improved = True
+                break
+        if improved:
+            continue
+
+        #############
+        # Evictions #
+        #############
+        # k-for-1: make room for a left-out transaction by dropping the lowest-feerate leaves, if they pay less.
+        leaves.sort(key=lambda n: (fee[n] / weight[n], n))
+        for tried, into in enumerate(by_fee):
+            if tried % CHECK_INTERVAL == 0 and time.perf_counter() >= deadline:
+                break
+            if into not in addable:
+                continue
+            need = block_weight + weight[into] - max_weight
+            freed = lost = 0
+            evict = []
+            for out in leaves:
+                if freed >= need or lost >= fee[into]:
+                    break
+                if out in parents[into]:
+                    continue
+                evict.append(out)
+                freed += weight[out]
+                lost += fee[out]
+            if freed >= need and lost < fee[into]:
+                for out in evict:
+                    remove(out)
+                add(into)
+                improved = True
+                break
+
+    return list(selected), block_fee, block_weight
@@ -0,0 +1,124 @@
+import json
+import coinbase_data as coinbase
+import helper.serializer as serializer
+import helper.merkle_root as merkle
+
+class WitnessProof:
+    """
+    Proof that a wtxid is committed to by the coinbase's witness commitment (BIP141).
+    """
+    __slots__ = ("proof", "reserved_value", "commitment", "coinbase")
+
+    def __init__(self, proof, reserved_value, commitment, coinbase):
+        """
+        @param proof         : Branch of the wtxid in the wtxid tree (coinbase wtxid all zeroes).
+        @type  proof         : helper.merkle_root.MerkleProof
+        @param reserved_value: Witness reserved value (the coinbase's witness item).
+        @type  reserved_value: bytes
+        @param commitment    : hash256(witness root || witness reserved value).
+        @type  commitment    : bytes
+        @param coinbase      : Branch of the coinbase, which carries the commitment in an output, against the
+                               header's Merkle root.
+        @type  coinbase      : helper.merkle_root.MerkleProof
+        """
+        self.proof = proof
+        self.reserved_value = reserved_value
+        self.commitment = commitment
+        self.coinbase = coinbase
+
+    def verify(self):
+        """
+        @return: True if the wtxid folds into the commitment and the coinbase into the header's Merkle root.
+        @rtype : bool
+        """
+        witness_root = merkle.MerkleTree.root_from_branch(self.proof.leaf, self.proof.branch, self.proof.index)
+        return (witness_root == self.proof.root
+                and serializer.hash256(witness_root + self.reserved_value) == self.commitment
+                and self.coinbase.verify())
+
+    def to_dict(self):
+        """
+        @return: The wtxid proof plus `reserved_value`, `commitment` and the `coinbase` txid proof (hashes as hex).
+        @rtype : dict
+        """
+        return dict(self.proof.to_dict(), reserved_value=self.reserved_value.hex(), commitment=self.commitment.hex(),
+                    coinbase=self.coinbase.to_dict())
+
+class BlockProofs:
+    """
+    Inclusion proofs for every transaction of a mined block, read from its txid and wtxid Merkle trees.
+    """
+    __slots__ = ("txid_tree", "witness_tree", "reserved_value", "commitment")
+
+    def __init__(self, txid_tree, witness_tree, reserved_value=bytes.fromhex(coinbase.WITNESS_RESERVED_VALUE_HEX)):
+        """
+        @param txid_tree     : Txids of the block, coinbase first (its root is the header's Merkle root).
+        @type  txid_tree     : helper.merkle_root.MerkleTree
+        @param witness_tree  : Wtxids of the block, all-zero coinbase wtxid first (coinbase_data.witness_tree).
+        @type  witness_tree  : helper.merkle_root.MerkleTree
+        @param reserved_value: Witness reserved value (the coinbase's witness item).
+        @type  reserved_value: bytes
+        """
+        self.txid_tree = txid_tree
+        self.witness_tree = witness_tree
+        self.reserved_value = reserved_value
+        self.commitment = serializer.hash256(witness_tree.root + reserved_value)
+
+    @property
+    def merkle_root(self):
+        """The header's Merkle root (internal byte order)."""
+        return self.txid_tree.root
+
+    def txid_proof(self, txid):
+        """
+        Merkle branch of a transaction against the header's Merkle root: log2(n) reads from the tree's stored levels
+        plus a dict lookup.
+
+        @param txid: Transaction ID (hex, as displayed).
+        @type  txid: str
+        @rtype     : helper.merkle_root.MerkleProof
+        @raise KeyError: If the transaction is not in the block.
+        """
+        return self.txid_tree.proof(self.txid_tree.index_of(merkle.leaf(txid)))
+
+    def wtxid_proof(self, wtxid):
+        """
+        Merkle branch of a transaction's wtxid against the witness commitment.
+
+        @param wtxid: Witness transaction ID (hex, as displayed); the coinbase's is not provable (it is all zeroes).
+        @type  wtxid: str
+        @rtype      : WitnessProof
+        @raise KeyError: If the transaction is not in the block.
+        """
+        index = self.witness_tree.index_of(merkle.leaf(wtxid))
+        if index == 0:
+            raise KeyError(wtxid)
+        return WitnessProof(self.witness_tree.proof(index), self.reserved_value, self.commitment, self.txid_tree.proof(0))
+
+    def to_dict(self):
+        """
+        Every proof of the block, keyed by txid and wtxid (hex, as displayed); O(n log n) for the whole block.
+
+        @return: `merkle_root`, `witness_commitment`, `txids` and `wtxids`.
+        @rtype : dict
+        """
+        coinbase_proof = self.txid_tree.proof(0).to_dict()
+        txids = {}
+        for index, node in enumerate(self.txid_tree.leaves):
+            txids[node[::-1].hex()] = self.txid_tree.proof(index).to_dict()
+        wtxids = {}
+        for index, node in enumerate(self.witness_tree.leaves[1:], 1):
+            wtxids[node[::-1].hex()] = self.witness_tree.proof(index).to_dict()
+        return {"merkle_root": self.merkle_root.hex(), "witness_commitment": self.commitment.hex(),
+                "witness_reserved_value": self.reserved_value.hex(), "coinbase": coinbase_proof,
+                "txids": txids, "wtxids": wtxids}
+
+    def save(self, path):
+        """
+        Write `to_dict()` as JSON.
+
+        @param path: Output file.
+        @type  path: str
+        """
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file)
@@ -0,0 +1,111 @@
+import heapq
+import mempool_graph
+
+###############
+## CONSTANTS ##
+###############
+MAX_BLOCK_WEIGHT = 4000000
+COINBASE_RESERVED_WEIGHT = 4000 # header, tx count and coinbase (same reserve as Bitcoin Core)
+
+def _ancestors(txn, parents, memo):
+    """
+    All in-mempool ancestors of `txn` (transitive closure of `parents`), memoised.
+    """
+    if txn not in memo:
+        memo[txn] = set() # guards against a (malformed) cycle
+        found = set()
+        stack = list(parents[txn])
+        while stack:
+            parent = stack.pop()
+            if parent in found:
+                continue
+            found.add(parent)
+            if parent in memo:
+                found |= memo[parent]
+            else:
+                stack.extend(parents[parent])
+        memo[txn] = found
+    return memo[txn]
+
+def build_template(txn_files, max_weight=MAX_BLOCK_WEIGHT - COINBASE_RESERVED_WEIGHT, graph=None):
+    """
+    Select transactions for a block by ancestor-package feerate (CPFP aware).
+
+    Every transaction is scored by the fee and weight of itself plus its not-yet-selected in-mempool ancestors.
+    The best package off a heap is added (ancestors first), then the scores of the selected transactions'
+    descendants are reduced incrementally and pushed back; stale heap entries are skipped when popped.
+    A child is never placed before its parent, a transaction whose in-mempool parent is not in `txn_files` (e.g. it
+    failed validation) is left out, and of two transactions spending the same outpoint only one gets in (a package
+    whose own members double spend each other is skipped).
+
+    @param txn_files : Valid transaction files to choose from.
+    @type  txn_files : list of str
+    @param max_weight: Weight available for these transactions (default: block limit minus the coinbase reserve).
+    @type  max_weight: int
+    @param graph     : Dependency graph of the whole mempool (default: built from `txn_files` alone, so parents that
+                       are not in `txn_files` go unnoticed).
+    @type  graph     : mempool_graph.MempoolGraph
+    @return          : (selected files in block order, total fees, total weight)
+    @rtype           : tuple[list of str, int, int]
+    """
+    if graph is None:
+        graph = mempool_graph.MempoolGraph(txn_files)
+    orphans = graph.orphaned(txn_files)
+    txns = {name: graph.txns[name] for name in txn_files if name not in orphans}
+
+    ########################
+    # In-mempool relatives #
+    ########################
+    memo = {}
+    ancestors = {name: _ancestors(name, graph.parents, memo) for name in txns}
+    descendants = {name: set() for name in txns}
+    for name, anc in ancestors.items():
+        for a in anc:
+            descendants[a].add(name)
+
+    ##################
+    # Package scores #
+    ##################
+    fee = {name: tx.fee for name, tx in txns.items()}
+    weight = {name: tx.weight[1] for name, tx in txns.items()}
+    pkg_fee = {name: fee[name] + sum(fee[a] for a in ancestors[name]) for name in txns}
+    pkg_weight = {name: weight[name] + sum(weight[a] for a in ancestors[name]) for name in txns}
+
+    def entry(name):
+        # Highest feerate first; the txid breaks ties so the template is reproducible.
+        return (-pkg_fee[name] / pkg_weight[name], txns[name].txid, pkg_fee[name], pkg_weight[name], name)
+
+    heap = [entry(name) for name in txns]
+    heapq.heapify(heap)
+
+    #############
+    # Selection #
+    #############
+    selected = []
+    in_block = set()
+    block_weight = 0
+    block_fee = 0
+    while heap:
+        _, _, p_fee, p_weight, name = heapq.heappop(heap)
+        if name in in_block or p_fee != pkg_fee[name] or p_weight != pkg_weight[name]:
+            continue # already taken, or a stale score
+        if block_weight + p_weight > max_weight:
+            continue # doesn't fit; it comes back if some of its ancestors get selected on their own
+
+        package = sorted(a for a in ancestors[name] if a not in in_block) + [name] # sorted: sets iterate in hash order
+        members = set(package)
+        if any(c in in_block or c in members for txn in package for c in graph.conflicts[txn]):
+            continue # double spends something already in the block, or its own ancestors double spend
+        for txn in graph.topological(package):
+            selected.append(txn)
+            in_block.add(txn)
+            block_weight += weight[txn]
+            block_fee += fee[txn]
+            for d in descendants[txn]:
+                if d not in in_block:
+                    pkg_fee[d] -= fee[txn]
+                    pkg_weight[d] -= weight[txn]
+        for d in {d for txn in package for d in descendants[txn]} - in_block:
+            heapq.heappush(heap, entry(d))
+
+    return selected, block_fee, block_weight
@@ -1,123 +1,354 @@
 import time
-import hashlib
+import argparse
+import miner
 import list_valid_txn
+import block_template
+import block_optimizer
+import mempool_graph
+import mempool_watcher
+import block_proofs
 import coinbase_data as coinbase
 import helper.converter as convert
 import helper.txn_info as txinfo
 import helper.merkle_root as merkle 
 import helper.txn_metrics as metrics
+import helper.sigcache as sigcache
+import helper.validation_cache as validation_cache
+import helper.snapshot as snapshot
+import helper.instrument as instrument
+import helper.txn_model as txn_model
+import validate_txn
 
 ###############
 ## CONSTANTS ##
 ###############
-NONCE_MIN = 0x0
-NONCE_MAX = 0xFFFFFFFF
+NONCE_MIN = miner.NONCE_MIN
+NONCE_MAX = miner.NONCE_MAX
 BLOCK_VERSION = 4
 MEMPOOL_DIR = "mempool"
 OUTPUT_FILE = "output.txt"
 DIFFICULTY = "0000ffff00000000000000000000000000000000000000000000000000000000"
 PREV_BLOCK_HASH = "0000000000000000000000000000000000000000000000000000000000000000"
 
-def _block_header_wo_nonce(merkle_root):
+def _block_header_wo_nonce(merkle_root, version=BLOCK_VERSION, timestamp=None):
     """
     Constructs a block header without the nonce.
 
     @param merkle_root: The Merkle root of the block.
     @type  merkle_root: str
+    @param version    : Block version (default: BLOCK_VERSION).
+    @type  version    : int
+    @param timestamp  : Block time (default: now).
+    @type  timestamp  : int
     @return           : The block header without the nonce.
     @rtype            : bytes
     """
-    block_version_bytes = bytes.fromhex(convert.to_little_endian(BLOCK_VERSION, 4))
+    if timestamp is None:
+        timestamp = int(time.time())
+    block_version_bytes = bytes.fromhex(convert.to_little_endian(version, 4))
     prev_block_hash_bytes = bytes.fromhex(PREV_BLOCK_HASH)
     merkle_root_bytes = bytes.fromhex(merkle_root)
-    timestamp_bytes = bytes.fromhex(convert.to_little_endian(int(time.time()), 4))
+    timestamp_bytes = bytes.fromhex(convert.to_little_endian(timestamp, 4))
     bits_bytes = bytes.fromhex(convert.to_little_endian(int("1F00FFFF", 16), 4)) # related to difficulty
     return block_version_bytes+prev_block_hash_bytes+merkle_root_bytes+timestamp_bytes+bits_bytes
 
-def mine_block(transaction_files):
+def mine_block(transaction_files, workers=None, backend=miner.DEFAULT_BACKEND):
     """
     Mine a block with the given transactions.
 
     @param transaction_files: List of transaction files to include in the block.
     @type  transaction_files: list
-    @return                 : Tuple containing block header hex, transaction IDs, nonce, coinbase hex, and coinbase transaction ID.
-    @rtype                  : tuple
+    @param workers          : Number of mining processes (default: miner.MINING_WORKERS).
+    @type  workers          : int
+    @param backend          : Hashing backend for the nonce search (see miner.BACKENDS).
+    @type  backend          : str
+    @return                 : Tuple containing block header hex, coinbase hex, coinbase transaction ID, transaction IDs, nonce, and the
+                              block's Merkle trees for inclusion proofs.
+    @rtype                  : tuple[str, str, str, list, int, block_proofs.BlockProofs]
     """
 
-    nonce = 0 # initial guess
-    txids = [txinfo.txid(tx) for tx in transaction_files] # get proper txid
+    with instrument.timer("mine.txids"):
+        txids = [txinfo.txid(tx) for tx in transaction_files] # get proper txid
 
     ######################
     # Witness Commitment #
     ######################
-    witness_commitment = coinbase.calculate_witness_commitment(transaction_files)
+    with instrument.timer("mine.witness_commitment"):
+        witness_tree = coinbase.witness_tree(transaction_files)
+        witness_commitment = coinbase.calculate_witness_commitment(transaction_files, witness_tree)
     print("witneness commitment:", witness_commitment)
 
-    fees = sum([metrics.fees(tx) for tx in transaction_files])
-    wt = sum([metrics.txn_weight(tx)[1] for tx in transaction_files])
+    with instrument.timer("mine.fees"):
+        fees = sum([metrics.fees(tx) for tx in transaction_files])
+        wt = sum([metrics.txn_weight(tx)[1] for tx in transaction_files])
     print(f"fees collected::> {fees}")
     print(f"weight of block::> {wt}")
-    coinbase_hex, coinbase_txid = coinbase.create_coinbase_transaction(witness_commitment=witness_commitment, fees= fees)
 
-    # Merkle root calculation of [coinbase + other] transactions || Coinbase is 1st transaction
-    merkle_root = merkle.merkle_root_calculator([coinbase_txid]+txids)
+    # Everything in the Merkle tree but the coinbase is fixed: the tree is built once, and each extranonce
+    # only replaces the coinbase leaf and rehashes its path to the root.
+    with instrument.timer("mine.merkle"):
+        txid_tree = merkle.MerkleTree.from_txids([coinbase.WTXID_COINBASE]+txids) # any placeholder works for leaf 0
+    jobs = {}
 
-    ################
-    # BLOCK HEADER #
-    ################
-    nonce_bytes = bytes.fromhex(convert.to_little_endian(nonce, 4))
-    block_header = _block_header_wo_nonce(merkle_root) + nonce_bytes
-    # print(f"BH::> {block_header}")
+    def make_header(extranonce, version, timestamp):
+        if extranonce not in jobs:
+            jobs.clear()
+            with instrument.timer("mine.coinbase"):
+                coinbase_hex, coinbase_txid = coinbase.create_coinbase_transaction(witness_commitment=witness_commitment, fees=fees, extranonce=extranonce)
+                # Merkle root calculation of [coinbase + other] transactions || Coinbase is 1st transaction
+                txid_tree.replace(0, merkle.leaf(coinbase_txid))
+            jobs[extranonce] = (coinbase_hex, coinbase_txid, txid_tree.root.hex())
+        return _block_header_wo_nonce(jobs[extranonce][2], version, timestamp)
 
     #################
     # CORRECT NONCE #
     #################
     target = int(DIFFICULTY, 16) # Hexadecimal(16) -> integer
-    # print("target:", target)
-
-    # nonce calculation
-    while True:
-        block_hash = hashlib.sha256(hashlib.sha256(block_header).digest()).digest()
-        rev_hash = block_hash[::-1]
-        if int.from_bytes(rev_hash, "big") <= target:
-            break
-        nonce += 1
-        nonce_bytes = bytes.fromhex(convert.to_little_endian(nonce, 4))
-        block_header = block_header[:-4] + nonce_bytes  # Update the nonce (LAST 4 bytes) in the header....
-        # Nonce Range Validation
-        if nonce < NONCE_MIN or nonce > NONCE_MAX:
-            raise ValueError("Nonce is Invalid")
-
-    print(f"nonce::> {nonce}")
-    block_header_hex = block_header.hex() # Final Hash
-
-    return block_header_hex, coinbase_hex, coinbase_txid, txids, nonce
-
-def main():
+
+    # nonce calculation (split across `workers` processes); version bits, time and extranonce roll when a nonce range runs dry.
+    # Rolled headers carry the BIP9 top bits, i.e. version 0x20000000 | BLOCK_VERSION (see miner.roll_version).
+    with instrument.timer("mine.nonce"):
+        work, stats = miner.mine_rolling(make_header, target, BLOCK_VERSION, int(time.time()), workers=workers, backend=backend,
+                                         start=NONCE_MIN, stop=NONCE_MAX + 1)
+    for s in stats:
+        print(f"miner[{s['worker']}]::> {s['hashes']} hashes in {s['seconds']:.3f}s ({s['hashes_per_sec']:.0f} H/s)")
+        instrument.count("mine.hashes", s["hashes"])
+    # Nonce Range Validation
+    if work is None:
+        raise ValueError("Nonce is Invalid")
+
+    nonce = work["nonce"]
+    coinbase_hex, coinbase_txid, _ = jobs[work["extranonce"]]
+    print(f"nonce::> {nonce} (extranonce: {work['extranonce']}, version: {work['version']:#010x}, time: {work['timestamp']})")
+    block_header_hex = (work["header_wo_nonce"] + bytes.fromhex(convert.to_little_endian(nonce, 4))).hex() # Final Hash
+    txid_tree.replace(0, merkle.leaf(coinbase_txid)) # the tree may hold a later extranonce's coinbase
+
+    return block_header_hex, coinbase_hex, coinbase_txid, txids, nonce, block_proofs.BlockProofs(txid_tree, witness_tree)
+
+def main(workers=None, mining_workers=None, mining_backend=miner.DEFAULT_BACKEND, optimize_seconds=block_optimizer.OPTIMIZE_SECONDS,
+         sigcache_file=None, cache_file=None, proofs_file=None, snapshot_file=None, metrics_file=None, prometheus_file=None,
+         batch_schnorr=False, verify_backend=sigcache.DEFAULT_BACKEND):
+    """
+    Validate the mempool, mine a block and write it to OUTPUT_FILE.
+
+    @param workers         : Number of validation processes (default: list_valid_txn.VALIDATION_WORKERS, 1 = serial).
+    @type  workers         : int
+    @param mining_workers  : Number of nonce-search processes (default: miner.MINING_WORKERS).
+    @type  mining_workers  : int
+    @param mining_backend  : Hashing backend for the nonce search (see miner.BACKENDS).
+    @type  mining_backend  : str
+    @param optimize_seconds: Time the fee optimizer may spend improving the greedy template (0 = greedy only).
+    @type  optimize_seconds: float
+    @param sigcache_file   : Signature cache file kept between runs (default: none).
+    @type  sigcache_file   : str
+    @param cache_file      : Validation result cache kept between runs; only new or changed files are validated (default: none).
+    @type  cache_file      : str
+    @param proofs_file     : Write the Merkle inclusion proofs of the block to this JSON file (default: none).
+    @type  proofs_file     : str
+    @param snapshot_file   : Read the transactions from this packed snapshot (see pack.py) instead of MEMPOOL_DIR.
+    @type  snapshot_file   : str
+    @param metrics_file    : Write per-stage timings and counters (helper.instrument) to this JSON file (default: none).
+    @type  metrics_file    : str
+    @param prometheus_file : Write them to this Prometheus textfile as well (default: none).
+    @type  prometheus_file : str
+    @param batch_schnorr   : Verify all taproot key-path signatures of the mempool in one batch after the scripts ran
+                             (only with a backend that batches, i.e. "python"; ignored otherwise).
+    @type  batch_schnorr   : bool
+    @param verify_backend  : Signature verification backend (see helper.sigcache.BACKENDS).
+    @type  verify_backend  : str
+    """
+    instrument.enable(bool(metrics_file or prometheus_file))
+    sigcache.use_backend(verify_backend)
+    with instrument.timer("total"):
+        _run(workers, mining_workers, mining_backend, optimize_seconds, sigcache_file, cache_file, proofs_file, snapshot_file,
+             batch_schnorr)
+    save_metrics(metrics_file, prometheus_file)
+
+def _run(workers, mining_workers, mining_backend, optimize_seconds, sigcache_file, cache_file, proofs_file, snapshot_file,
+         batch_schnorr=False):
+    # main() without the instrumentation set-up.
+    if snapshot_file:
+        txn_model.use_snapshot(snapshot.Snapshot(snapshot_file))
+
     # Get valid transactions
-    transactions = list_valid_txn.list_valid_txn()
+    result_cache = validation_cache.ValidationCache(cache_file, validate_txn.VALIDATOR_VERSION) if cache_file else None
+    transactions = list_valid_txn.list_valid_txn(workers=workers, sigcache_file=sigcache_file, result_cache=result_cache,
+                                                 batch_schnorr=batch_schnorr)
+    if result_cache is not None:
+        cached = result_cache.stats()
+        print(f"validation cache::> {cached['stat_hits'] + cached['hash_hits']} hits ({cached['hash_hits']} rehashed), {cached['misses']} misses")
+    cache = sigcache.SIGNATURE_CACHE.stats()
+    print(f"signature cache::> {cache['hits']} hits, {cache['misses']} misses, {cache['entries']} entries")
 
     if not any(transactions):
         raise ValueError("No transcations are there... Please add transactions")
 
-    # Only include transactions till (wt < 4000000)
     print(f"Transactions Validated: {len(transactions)}")
-    n = 0
-    wt = 0
-    while wt < 4000000:
-        wt += metrics.txn_weight(transactions[n])[1]
-        n += 1
-    
-    print(f"Total transactions: {len(transactions[:n-1])}") # -1 for safety parameter.
 
+    # Spending relations across the whole mempool, so children of invalid transactions are kept out; built from
+    # what validation primed (txn_model.summary), so nothing is parsed again here
+    with instrument.timer("graph"):
+        graph = mempool_graph.MempoolGraph(list_valid_txn.read_transactions())
+
+    # Fill the block by ancestor-package feerate up to MAX_BLOCK_WEIGHT (minus the coinbase reserve)
+    with instrument.timer("template"):
+        block_txns, block_fees, block_weight = block_template.build_template(transactions, graph=graph)
+    if optimize_seconds > 0:
+        # ...then spend what is left of the time budget swapping transactions for more fees
+        with instrument.timer("optimize"):
+            block_txns, block_fees, block_weight = block_optimizer.optimize(transactions, optimize_seconds, start=block_txns, graph=graph)
+    instrument.gauge("block.txns", len(block_txns))
+    instrument.gauge("block.fees", block_fees)
+    instrument.gauge("block.weight", block_weight)
+    print(f"Total transactions: {len(block_txns)}")
+    write_block(block_txns, mining_workers, mining_backend, proofs_file)
+
+def write_block(block_txns, mining_workers=None, mining_backend=miner.DEFAULT_BACKEND, proofs_file=None):
+    """
+    Mine a block of `block_txns` and write it to OUTPUT_FILE.
+
+    @param block_txns    : Transaction files of the block, in block order.
+    @type  block_txns    : list
+    @param mining_workers: Number of nonce-search processes (default: miner.MINING_WORKERS).
+    @type  mining_workers: int
+    @param mining_backend: Hashing backend for the nonce search (see miner.BACKENDS).
+    @type  mining_backend: str
+    @param proofs_file   : Also write the Merkle inclusion proof of every txid and wtxid to this JSON file (default: none).
+    @type  proofs_file   : str
+    """
     # Block Mining
-    block_header, coinbase_tx_hex, coinbase_txid, txids, _ = mine_block(transactions[: n-1])
+    with instrument.timer("mine"):
+        block_header, coinbase_tx_hex, coinbase_txid, txids, _, proofs = mine_block(block_txns, workers=mining_workers, backend=mining_backend)
+    if proofs_file:
+        with instrument.timer("proofs"):
+            proofs.save(proofs_file)
 
     # Generate OUTPUT File 
-    with open(OUTPUT_FILE, "w") as file:
+    with instrument.timer("write"), open(OUTPUT_FILE, "w") as file:
         file.write(f"{block_header}\n{coinbase_tx_hex}\n{coinbase_txid}\n")
         file.writelines(f"{txid}\n" for txid in txids)
 
+def save_metrics(metrics_file=None, prometheus_file=None):
+    """
+    Write what helper.instrument recorded so far.
+
+    @param metrics_file   : JSON report (default: none).
+    @type  metrics_file   : str
+    @param prometheus_file: Prometheus textfile (default: none).
+    @type  prometheus_file: str
+    """
+    if metrics_file:
+        instrument.save_json(metrics_file)
+    if prometheus_file:
+        instrument.save_prometheus(prometheus_file)
+
+def watch(workers=None, mining_workers=None, mining_backend=miner.DEFAULT_BACKEND, poll_interval=mempool_watcher.POLL_INTERVAL,
+          use_inotify=True, sigcache_file=None, cache_file=None, proofs_file=None, metrics_file=None, prometheus_file=None,
+          batch_schnorr=False, verify_backend=sigcache.DEFAULT_BACKEND):
+    """
+    Keep OUTPUT_FILE up to date with the mempool: validate only files that appear or change, update the template
+    incrementally (mempool_watcher.MempoolWatcher) and mine a new block after every change.
+
+    @param workers       : Number of validation processes (default: list_valid_txn.VALIDATION_WORKERS, 1 = serial).
+    @type  workers       : int
+    @param mining_workers: Number of nonce-search processes (default: miner.MINING_WORKERS).
+    @type  mining_workers: int
+    @param mining_backend: Hashing backend for the nonce search (see miner.BACKENDS).
+    @type  mining_backend: str
+    @param poll_interval : Seconds between directory scans when polling (and between idle checks with inotify).
+    @type  poll_interval : float
+    @param use_inotify   : Wait for inotify events where available instead of polling.
+    @type  use_inotify   : bool
+    @param sigcache_file : Signature cache file, loaded at start and saved after every change (default: none).
+    @type  sigcache_file : str
+    @param cache_file    : Validation result cache kept between runs (default: none).
+    @type  cache_file    : str
+    @param proofs_file   : Rewrite the Merkle inclusion proofs of every new block to this JSON file (default: none).
+    @type  proofs_file   : str
+    @param metrics_file  : Rewrite the timings and counters accumulated since start to this JSON file after every block (default: none).
+    @type  metrics_file  : str
+    @param prometheus_file: Same, as a Prometheus textfile (default: none).
+    @type  prometheus_file: str
+    @param batch_schnorr : Verify the taproot key-path signatures of every change in one batch (only with a backend
+                           that batches, i.e. "python"; ignored otherwise).
+    @type  batch_schnorr : bool
+    @param verify_backend: Signature verification backend (see helper.sigcache.BACKENDS).
+    @type  verify_backend: str
+    """
+    instrument.enable(bool(metrics_file or prometheus_file))
+    sigcache.use_backend(verify_backend)
+    result_cache = validation_cache.ValidationCache(cache_file, validate_txn.VALIDATOR_VERSION) if cache_file else None
+    if sigcache_file:
+        sigcache.SIGNATURE_CACHE.load(sigcache_file)
+    source = mempool_watcher.open_source(MEMPOOL_DIR, poll_interval, use_inotify)
+    watcher = mempool_watcher.MempoolWatcher(MEMPOOL_DIR, workers, result_cache, source=source, batch_schnorr=batch_schnorr)
+
+    def on_update(watcher, added, removed):
+        block_txns, block_fees, block_weight = watcher.template
+        print(f"mempool update::> {len(added)} new/changed, {len(removed)} removed, {len(watcher.valid)} valid, "
+              f"{len(block_txns)} in block (fees {block_fees}, weight {block_weight})")
+        if sigcache_file:
+            sigcache.SIGNATURE_CACHE.save(sigcache_file)
+        if block_txns:
+            write_block(block_txns, mining_workers, mining_backend, proofs_file)
+        instrument.count("watch.updates")
+        save_metrics(metrics_file, prometheus_file)
+
+    print(f"watching {MEMPOOL_DIR} ({type(source).__name__})")
+    try:
+        watcher.watch(on_update)
+    except KeyboardInterrupt:
+        pass
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Validate the mempool and mine a block.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="validation processes (default: number of CPUs, 1 = serial)")
+    parser.add_argument("--mining-workers", type=int, default=None,
+                        help="nonce-search processes (default: number of CPUs)")
+    parser.add_argument("--mining-backend", choices=sorted(miner.BACKENDS), default=miner.DEFAULT_BACKEND,
+                        help="hashing backend for the nonce search")
+    parser.add_argument("--optimize-seconds", type=float, default=block_optimizer.OPTIMIZE_SECONDS,
+                        help="time budget for improving the block's fees after the greedy pass (0 = greedy only)")
+    parser.add_argument("--sigcache", default=None, metavar="FILE",
+                        help="keep verified signatures in FILE between runs")
+    parser.add_argument("--cache", default=None, metavar="FILE",
+                        help="keep validation results in FILE between runs and only validate new or changed files")
+    parser.add_argument("--proofs", default=None, metavar="FILE",
+                        help="write the Merkle inclusion proof of every txid and wtxid of the block to FILE (JSON)")
+    parser.add_argument("--snapshot", default=None, metavar="FILE",
+                        help="read the mempool from a snapshot written by pack.py instead of the mempool directory")
+    parser.add_argument("--metrics-out", default=None, metavar="FILE",
+                        help="write per-stage timings and counters to FILE (JSON)")
+    parser.add_argument("--metrics-prom", default=None, metavar="FILE",
+                        help="write per-stage timings and counters to FILE in the Prometheus text format (for node_exporter's textfile collector)")
+    parser.add_argument("--batch-schnorr", action="store_true",
+                        help="verify all taproot key-path signatures together after the scripts ran instead of one at a "
+                             "time; only --verify-backend python batch-verifies, with coincurve the flag is ignored")
+    parser.add_argument("--verify-backend", choices=sorted(sigcache.BACKENDS), default=sigcache.DEFAULT_BACKEND,
+                        help="signature verification backend (python: pure-Python fallback, no coincurve needed)")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running: validate only new or changed mempool files and mine a new block after every change")
+    parser.add_argument("--poll-interval", type=float, default=mempool_watcher.POLL_INTERVAL,
+                        help="seconds between mempool scans in --watch mode")
+    parser.add_argument("--no-inotify", action="store_true",
+                        help="poll the mempool directory in --watch mode even where inotify is available")
+    args = parser.parse_args(argv)
+    if args.snapshot and (args.watch or args.cache):
+        parser.error("--snapshot reads a fixed mempool: it does not combine with --watch or --cache")
+    return args
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.watch:
+        watch(workers=args.workers, mining_workers=args.mining_workers, mining_backend=args.mining_backend,
+              poll_interval=args.poll_interval, use_inotify=not args.no_inotify, sigcache_file=args.sigcache,
+              cache_file=args.cache, proofs_file=args.proofs, metrics_file=args.metrics_out, prometheus_file=args.metrics_prom,
+              batch_schnorr=args.batch_schnorr, verify_backend=args.verify_backend)
+    else:
+        main(workers=args.workers, mining_workers=args.mining_workers, mining_backend=args.mining_backend,
+             optimize_seconds=args.optimize_seconds, sigcache_file=args.sigcache,
+             cache_file=args.cache, proofs_file=args.proofs, snapshot_file=args.snapshot,
+             metrics_file=args.metrics_out, prometheus_file=args.metrics_prom, batch_schnorr=args.batch_schnorr,
+             verify_backend=args.verify_backend)
\ No newline at end of file
@@ -7,16 +7,16 @@ import helper.merkle_root as merkle
 ###############
 WTXID_COINBASE = bytes(32).hex()
 WITNESS_RESERVED_VALUE_HEX = '0000000000000000000000000000000000000000000000000000000000000000'
+COINBASE_SCRIPTSIG = "03233708184d696e656420627920416e74506f6f6c373946205b8160a4256c0000946e0100"
+EXTRANONCE_SIZE = 8 # bytes pushed after COINBASE_SCRIPTSIG when an extranonce is used
 
-def calculate_witness_commitment(txn_files):
+def witness_tree(txn_files):
     """
-    Calculate the witness commitment of the transactions in the block.
+    Merkle tree of the wtxids of the block, the coinbase (all-zero wtxid) first.
 
-    @param txn_files: A list of transaction files to include in the calculation.
+    @param txn_files: Transaction files of the block, in block order.
     @type  txn_files: list
-
-    @return         : The witness commitment calculated for the given transactions.
-    @rtype          : str
+    @rtype          : helper.merkle_root.MerkleTree
     """
     wtxids = [WTXID_COINBASE] # must begin with wtxid of Coinbase txn
 
@@ -24,9 +24,25 @@ def calculate_witness_commitment(txn_files):
     for tx in txn_files:
         w_txid = txinfo.wtxid(tx)
         wtxids.append(w_txid)
+    return merkle.MerkleTree.from_txids(wtxids)
+
+def calculate_witness_commitment(txn_files, tree=None):
+    """
+    Calculate the witness commitment of the transactions in the block.
+
+    @param txn_files: A list of transaction files to include in the calculation.
+    @type  txn_files: list
+    @param tree     : witness_tree(txn_files), if already built.
+    @type  tree     : helper.merkle_root.MerkleTree
+
+    @return         : The witness commitment calculated for the given transactions.
+    @rtype          : str
+    """
+    if tree is None:
+        tree = witness_tree(txn_files)
 
     # Get merkle root of wtxids
-    witness_root = merkle.merkle_root_calculator(wtxids)
+    witness_root = tree.root.hex()
     print(f"witness root::> {witness_root}")
 
     # Append witness reserved value at the end.
@@ -37,12 +53,26 @@ def calculate_witness_commitment(txn_files):
     witness_commitment = convert.to_hash256(combined_data)
     return witness_commitment
 
-def create_coinbase_transaction(witness_commitment, fees = 0):
+def coinbase_scriptsig(extranonce=None):
+    """
+    Coinbase scriptsig, optionally followed by a push of the extranonce.
+
+    @param int extranonce: Extra search space for the miner (EXTRANONCE_SIZE bytes, little-endian); None leaves it out.
+
+    @return              : The scriptsig.
+    @rtype               : str
+    """
+    if extranonce is None:
+        return COINBASE_SCRIPTSIG
+    return COINBASE_SCRIPTSIG + f"{EXTRANONCE_SIZE:02x}" + convert.to_little_endian(extranonce, EXTRANONCE_SIZE)
+
+def create_coinbase_transaction(witness_commitment, fees = 0, extranonce = None):
     """
     Creates a coinbase transaction with the given witness commitment and fees.
 
     @param str witness_commitment: The witness commitment to include in the transaction.
     @param int fees              : The transaction fees (default is 0).
+    @param int extranonce        : Extranonce pushed at the end of the scriptsig (default: none).
 
     @return                      : A tuple containing the serialized transaction data and the reversed bytes string of the transaction ID.
     @rtype                       : tuple[str, str]
@@ -50,6 +80,7 @@ def create_coinbase_transaction(witness_commitment, fees = 0):
 
     # f595814a00000000 -> fees
     fees_le = convert.to_little_endian(fees, 8)
+    scriptsig = coinbase_scriptsig(extranonce)
 
     #########################
     # Coinbase txn template #
@@ -63,8 +94,8 @@ def create_coinbase_transaction(witness_commitment, fees = 0):
             {
                 "txid": "0000000000000000000000000000000000000000000000000000000000000000",
                 "vout": int("ffffffff", 16),
-                "scriptsigsize": 37,
-                "scriptsig": "03233708184d696e656420627920416e74506f6f6c373946205b8160a4256c0000946e0100",
+                "scriptsigsize": len(scriptsig) // 2,
+                "scriptsig": scriptsig,
                 "sequence": int("ffffffff", 16),
             }
         ],
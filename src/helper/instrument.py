@@ -0,0 +1,245 @@
+import os
+import json
+import time
+import threading
+
+###############
+## CONSTANTS ##
+###############
+METRIC_PREFIX = "block_pipeline"
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRY.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+class Registry:
+    """
+    Thread-safe accumulator of timings (calls, total and longest duration per stage), counters and gauges (last value).
+
+    Timers may nest; each one counts its full duration. Stage names are dotted (`validate.inputs`, `mine.nonce`, ...).
+    Validation workers are forked with the parent's state and ship their numbers back with `take_delta()` /
+    `merge()` (as helper.sigcache does), so times of parallel stages add up across processes (CPU seconds, not wall
+    time).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.timers = {}   # name -> [calls, seconds, max seconds]
+            self.counters = {} # name -> int
+            self.gauges = {}   # name -> number
+            self.started = time.time()
+
+    def add_time(self, name, seconds, calls=1, longest=None):
+        with self._lock:
+            entry = self.timers.get(name)
+            if entry is None:
+                self.timers[name] = [calls, seconds, seconds if longest is None else longest]
+            else:
+                entry[0] += calls
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds if longest is None else longest)
+
+    def add_count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    ######################
+    ## WORKER HAND-OFFS ##
+    ######################
+    def take_delta(self):
+        """
+        Timings and counters recorded since the last call; resets both.
+
+        @return: (timers, counters)
+        @rtype : tuple[dict, dict]
+        """
+        with self._lock:
+            delta = (self.timers, self.counters)
+            self.timers, self.counters = {}, {}
+        return delta
+
+    def merge(self, delta):
+        """
+        Fold another process's `take_delta()` into this registry.
+
+        @param delta: (timers, counters)
+        @type  delta: tuple
+        """
+        timers, counters = delta
+        for name, (calls, seconds, longest) in timers.items():
+            self.add_time(name, seconds, calls, longest)
+        for name, value in counters.items():
+            self.add_count(name, value)
+
+REGISTRY = Registry()
+_NULL_TIMER = _NullTimer()
+_enabled = False
+
+def enable(on=True):
+    """
+    Switch recording on (or off) for this process; what was recorded so far is kept. Recording is off by default:
+    `timer()` then hands back one shared no-op context manager and `count()` returns at once, so the calls left in
+    the pipeline cost a global lookup and a function call each.
+
+    @param on: Record timings and counters.
+    @type  on: bool
+    """
+    global _enabled
+    _enabled = bool(on)
+
+def enabled():
+    return _enabled
+
+def timer(name):
+    """
+    Context manager timing one run of stage `name`.
+
+    @param name: Stage name.
+    @type  name: str
+    @rtype     : context manager
+    """
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(name)
+
+def count(name, value=1):
+    """
+    Add `value` to counter `name`.
+
+    @param name : Counter name.
+    @type  name : str
+    @param value: Amount to add.
+    @type  value: int
+    """
+    if _enabled:
+        REGISTRY.add_count(name, value)
+
+def gauge(name, value):
+    """
+    Set gauge `name` to `value` (e.g. the fees of the block last built).
+
+    @param name : Gauge name.
+    @type  name : str
+    @param value: The value.
+    @type  value: int | float
+    """
+    if _enabled:
+        REGISTRY.set_gauge(name, value)
+
+def take_delta():
+    """See Registry.take_delta; empty while disabled."""
+    if not _enabled:
+        return None
+    return REGISTRY.take_delta()
+
+def merge(delta):
+    """See Registry.merge; `None` (a disabled worker's delta) is ignored."""
+    if delta is not None:
+        REGISTRY.merge(delta)
+
+############
+## EXPORT ##
+############
+def report():
+    """
+    Everything recorded so far, for `save_json`; `prometheus_text` renders the same data for node_exporter's textfile
+    collector.
+
+    @return: `started` (UNIX time), `stages` (name -> `calls`, `seconds`, `max_seconds`), `counters` (name -> int) and
+             `gauges` (name -> number), sorted by name.
+    @rtype : dict
+    """
+    with REGISTRY._lock:
+        stages = {name: {"calls": calls, "seconds": seconds, "max_seconds": longest}
+                  for name, (calls, seconds, longest) in sorted(REGISTRY.timers.items())}
+        counters = dict(sorted(REGISTRY.counters.items()))
+        gauges = dict(sorted(REGISTRY.gauges.items()))
+    return {"started": REGISTRY.started, "stages": stages, "counters": counters, "gauges": gauges}
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def prometheus_text(data=None, prefix=METRIC_PREFIX):
+    """
+    A report in the Prometheus text exposition format.
+
+    @param data  : Output of `report()` (default: the current one).
+    @type  data  : dict
+    @param prefix: Metric name prefix.
+    @type  prefix: str
+    @rtype       : str
+    """
+    if data is None:
+        data = report()
+    families = [
+        ("stage_seconds_total", "counter", "Time spent in a pipeline stage (summed over processes).", "stage",
+         {name: stage["seconds"] for name, stage in data["stages"].items()}),
+        ("stage_calls_total", "counter", "Runs of a pipeline stage.", "stage",
+         {name: stage["calls"] for name, stage in data["stages"].items()}),
+        ("stage_max_seconds", "gauge", "Longest single run of a pipeline stage.", "stage",
+         {name: stage["max_seconds"] for name, stage in data["stages"].items()}),
+        ("events_total", "counter", "Pipeline event counters.", "event", data["counters"]),
+        ("value", "gauge", "Pipeline gauges (last value).", "name", data["gauges"]),
+    ]
+    lines = []
+    for family, kind, help_text, label, samples in families:
+        metric = f"{prefix}_{family}"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        lines.extend(f"{metric}{{{label}=\"{_escape(name)}\"}} {value!r}" for name, value in samples.items())
+    lines.append(f"# HELP {prefix}_started_seconds UNIX time the recording started.")
+    lines.append(f"# TYPE {prefix}_started_seconds gauge")
+    lines.append(f"{prefix}_started_seconds {data['started']!r}")
+    return "\n".join(lines) + "\n"
+
+def _write(path, text):
+    # The textfile collector may read at any moment: write a temporary file and rename it over `path`.
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as file:
+        file.write(text)
+    os.replace(tmp, path)
+
+def save_json(path):
+    """
+    Write `report()` to `path` as JSON.
+
+    @param path: Output file.
+    @type  path: str
+    """
+    _write(path, json.dumps(report(), indent=1) + "\n")
+
+def save_prometheus(path):
+    """
+    Write `prometheus_text()` to `path` (use a `.prom` file in the textfile collector's directory).
+
+    @param path: Output file.
+    @type  path: str
+    """
+    _write(path, prometheus_text())
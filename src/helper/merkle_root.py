@@ -1,4 +1,210 @@
-import helper.converter as convert
+import hashlib
+
+def _hash_pair(left, right):
+    return hashlib.sha256(hashlib.sha256(left + right).digest()).digest()
+
+def leaf(txid):
+    """
+    Merkle leaf of a transaction ID: its bytes in internal (reversed) order.
+
+    @param txid: Transaction ID (hex, as displayed).
+    @type  txid: str
+    @rtype     : bytes
+    """
+    return bytes.fromhex(txid)[::-1]
+
+class MerkleTree:
+    """
+    Bitcoin Merkle tree over 32-byte leaves (internal byte order) with every level kept.
+
+    levels[0] are the leaves and levels[-1] holds the root; a level with an odd number of nodes pairs its last
+    node with itself. Because the levels are stored, changing one leaf only rehashes its path to the root:
+        - replace(i, leaf): O(log n), e.g. the coinbase leaf when the extranonce rolls,
+        - append(leaf)    : O(log n),
+        - remove(i)       : O(log n) for the last leaf; every leaf after i moves one position left, so their
+                            paths (about 2 * (n - i) nodes in total) are rehashed.
+    """
+    __slots__ = ("levels", "_positions")
+
+    def __init__(self, leaves=()):
+        self.levels = [list(leaves)]
+        self._positions = None # leaf -> index, built on the first index_of()
+        level = self.levels[0]
+        while len(level) > 1:
+            level = [_hash_pair(level[i], level[i + 1] if i + 1 < len(level) else level[i]) for i in range(0, len(level), 2)]
+            self.levels.append(level)
+
+    @classmethod
+    def from_txids(cls, txids):
+        """
+        Tree of transaction IDs given as displayed hex.
+
+        @param txids: The list of transaction IDs.
+        @type  txids: list of str
+        @rtype      : MerkleTree
+        """
+        return cls(leaf(txid) for txid in txids)
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    @property
+    def leaves(self):
+        return self.levels[0]
+
+    @property
+    def root(self):
+        """The Merkle root (internal byte order), or None for an empty tree."""
+        return self.levels[-1][0] if self.levels[0] else None
+
+    def _update(self, index, shifted):
+        # Rehash the nodes above leaf `index`. If leaves moved (`shifted`), every pair from `index` on changed;
+        # otherwise only the pair holding `index` did. Levels are added or dropped so the top is one node again.
+        self._positions = None
+        depth = 0
+        while len(self.levels[depth]) > 1:
+            level = self.levels[depth]
+            if depth + 1 == len(self.levels):
+                self.levels.append([])
+            parents = self.levels[depth + 1]
+            del parents[(len(level) + 1) // 2:]
+            start = index - index % 2
+            stop = len(level) if shifted else start + 2
+            for i in range(start, min(stop, len(level)), 2):
+                node = _hash_pair(level[i], level[i + 1] if i + 1 < len(level) else level[i])
+                if i // 2 < len(parents):
+                    parents[i // 2] = node
+                else:
+                    parents.append(node)
+            index //= 2
+            depth += 1
+        del self.levels[depth + 1:]
+
+    def replace(self, index, new_leaf):
+        """
+        Replace leaf `index` and rehash its path to the root.
+
+        @param index   : Position of the leaf.
+        @type  index   : int
+        @param new_leaf: 32-byte leaf (internal byte order).
+        @type  new_leaf: bytes
+        """
+        self.levels[0][index] = new_leaf
+        self._update(index, shifted=False)
+
+    def append(self, new_leaf):
+        """
+        Add a leaf at the end and rehash its path to the root.
+
+        @param new_leaf: 32-byte leaf (internal byte order).
+        @type  new_leaf: bytes
+        """
+        self.levels[0].append(new_leaf)
+        self._update(len(self.levels[0]) - 1, shifted=False)
+
+    def remove(self, index):
+        """
+        Remove leaf `index`; the leaves after it move one position left.
+
+        @param index: Position of the leaf.
+        @type  index: int
+        @return     : The removed leaf.
+        @rtype      : bytes
+        """
+        removed = self.levels[0].pop(index)
+        self._update(min(index, len(self.levels[0])), shifted=True)
+        return removed
+
+    def branch(self, index):
+        """
+        Sibling hashes on the path from leaf `index` to the root, read from the stored levels.
+
+        @param index: Position of the leaf.
+        @type  index: int
+        @return     : Sibling hashes, bottom level first (internal byte order).
+        @rtype      : list of bytes
+        """
+        branch = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            branch.append(level[sibling] if sibling < len(level) else level[index])
+            index //= 2
+        return branch
+
+    def index_of(self, leaf):
+        """
+        Position of a leaf (the first one, if it occurs twice).
+
+        @param leaf: 32-byte leaf (internal byte order).
+        @type  leaf: bytes
+        @return    : Its index.
+        @rtype     : int
+        @raise KeyError: If the leaf is not in the tree.
+        """
+        if self._positions is None:
+            self._positions = {}
+            for index, node in enumerate(self.levels[0]):
+                self._positions.setdefault(node, index)
+        return self._positions[leaf]
+
+    def proof(self, index):
+        """
+        Inclusion proof of leaf `index` against the current root.
+
+        @param index: Position of the leaf.
+        @type  index: int
+        @rtype      : MerkleProof
+        """
+        return MerkleProof(self.levels[0][index], index, self.branch(index), self.root)
+
+    @staticmethod
+    def root_from_branch(node, branch, index):
+        """
+        Merkle root from one leaf and its branch (see `branch`).
+
+        @param node  : The leaf (internal byte order).
+        @type  node  : bytes
+        @param branch: Sibling hashes, bottom level first (internal byte order).
+        @type  branch: list of bytes
+        @param index : Position of the leaf.
+        @type  index : int
+        @return      : The Merkle root (internal byte order).
+        @rtype       : bytes
+        """
+        for sibling in branch:
+            node = _hash_pair(sibling, node) if index & 1 else _hash_pair(node, sibling)
+            index //= 2
+        return node
+
+class MerkleProof:
+    """
+    SPV-style proof that `leaf` is at position `index` of the tree committed to by `root`.
+
+    All hashes are 32 bytes in internal byte order; `to_dict()` gives them as hex in the same order, like
+    merkle_branch().
+    """
+    __slots__ = ("leaf", "index", "branch", "root")
+
+    def __init__(self, leaf, index, branch, root):
+        self.leaf = leaf
+        self.index = index
+        self.branch = branch
+        self.root = root
+
+    def verify(self):
+        """
+        @return: True if folding `branch` into `leaf` gives `root`.
+        @rtype : bool
+        """
+        return MerkleTree.root_from_branch(self.leaf, self.branch, self.index) == self.root
+
+    def to_dict(self):
+        """
+        @return: `leaf`, `index`, `branch` and `root` (hashes as hex).
+        @rtype : dict
+        """
+        return {"leaf": self.leaf.hex(), "index": self.index, "branch": [node.hex() for node in self.branch],
+                "root": self.root.hex()}
 
 def merkle_root_calculator(txids):
     """
@@ -11,18 +217,35 @@ def merkle_root_calculator(txids):
     """
     if len(txids) == 0:
         return None
+    return MerkleTree.from_txids(txids).root.hex()
+
+def merkle_branch(txids, index=0):
+    """
+    Sibling hashes on the path from leaf `index` to the Merkle root.
 
-    # Reverse the txids
-    level = [bytes.fromhex(txid)[::-1].hex() for txid in txids]
-
-    while len(level) > 1:
-        next_level = []
-        for i in range(0, len(level), 2):
-            if i + 1 == len(level):
-                # Duplicate the last one, in case of an odd number of elements
-                pair_hash = convert.to_hash256(level[i] + level[i])
-            else:
-                pair_hash = convert.to_hash256(level[i] + level[i + 1])
-            next_level.append(pair_hash)
-        level = next_level
-    return level[0]
\ No newline at end of file
+    For the coinbase (index 0) none of the siblings depend on the coinbase itself, so the branch can be computed
+    once and reused whenever only the coinbase changes (e.g. extranonce rolling).
+
+    @param txids: The list of transaction IDs.
+    @type  txids: list of str
+    @param index: Position of the leaf.
+    @type  index: int
+    @return     : Sibling hashes, bottom level first (internal byte order, hex).
+    @rtype      : list of str
+    """
+    return [node.hex() for node in MerkleTree.from_txids(txids).branch(index)]
+
+def merkle_root_from_branch(txid, branch, index=0):
+    """
+    Merkle root from one leaf and its branch (see merkle_branch).
+
+    @param txid  : Transaction ID of the leaf.
+    @type  txid  : str
+    @param branch: Sibling hashes, bottom level first (internal byte order, hex).
+    @type  branch: list of str
+    @param index : Position of the leaf.
+    @type  index : int
+    @return      : The Merkle root.
+    @rtype       : str
+    """
+    return MerkleTree.root_from_branch(leaf(txid), [bytes.fromhex(node) for node in branch], index).hex()
@@ -0,0 +1,500 @@
+import os
+import hashlib
+import secrets
+
+###############
+## CONSTANTS ##
+###############
+P = 0xfffffffffffffffffffffffffffffffffffffffffffffffffffffffefffffc2f
+N = 0xfffffffffffffffffffffffffffffffebaaedce6af48a03bbfd25e8cd0364141
+GX = 0x79be667ef9dcbbac55a06295ce870b07029bfcdb2dce28d959f2815b16f81798
+GY = 0x483ada7726a3c4655da4fbfc0e1108a8fd17b448a68554199c47d08ffb10d4b8
+HALF_N = N // 2
+# GLV endomorphism: lambda * (x, y) = (beta * x, y); a scalar k splits into k1 + k2 * lambda with |k1|, |k2| < 2^128.
+LAMBDA = 0x5363ad4cc05c30e0a5261c028812645a122e22ea20816678df02967c1b23bd72
+BETA = 0x7ae96a2b657c07106e64479eac3434e99cf0497512f58995c1396c28719501ee
+_A1, _B1 = 0x3086d221a7d46bcde86c90e49284eb15, -0xe4437ed6010e88286f547fa90abfe4c3
+_A2, _B2 = 0x114ca50f7a8e2f3f657c1108d9d44cfd8, 0x3086d221a7d46bcde86c90e49284eb15
+WNAF_WINDOW = 5
+TABLE_WINDOW = 8 # bits of the scalar per comb row
+TABLE_FILE = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                          "secp256k1-g8.table")
+_TABLE_MAGIC = b"SECPG8\x01\x00"
+_INFINITY = (1, 1, 0)
+_CHALLENGE_TAG = hashlib.sha256(b"BIP0340/challenge").digest() * 2
+
+######################
+## POINT ARITHMETIC ##
+######################
+def _double(X, Y, Z):
+    # dbl-2009-l (a = 0)
+    if not Z or not Y:
+        return _INFINITY
+    A = X * X % P
+    B = Y * Y % P
+    C = B * B % P
+    D = 2 * ((X + B) * (X + B) - A - C) % P
+    E = 3 * A
+    F = E * E % P
+    X3 = (F - 2 * D) % P
+    return X3, (E * (D - X3) - 8 * C) % P, 2 * Y * Z % P
+
+def _add_affine(X1, Y1, Z1, x2, y2):
+    # Jacobian + affine (mixed addition)
+    if not Z1:
+        return x2, y2, 1
+    Z1Z1 = Z1 * Z1 % P
+    H = (x2 * Z1Z1 - X1) % P
+    r = (y2 * Z1 * Z1Z1 - Y1) % P
+    if not H:
+        return _double(X1, Y1, Z1) if not r else _INFINITY
+    HH = H * H % P
+    HHH = H * HH % P
+    V = X1 * HH % P
+    X3 = (r * r - HHH - 2 * V) % P
+    return X3, (r * (V - X3) - Y1 * HHH) % P, Z1 * H % P
+
+def _add(X1, Y1, Z1, X2, Y2, Z2):
+    # Jacobian + Jacobian
+    if not Z1:
+        return X2, Y2, Z2
+    if not Z2:
+        return X1, Y1, Z1
+    Z1Z1 = Z1 * Z1 % P
+    Z2Z2 = Z2 * Z2 % P
+    U1 = X1 * Z2Z2 % P
+    S1 = Y1 * Z2 * Z2Z2 % P
+    H = (X2 * Z1Z1 - U1) % P
+    r = (Y2 * Z1 * Z1Z1 - S1) % P
+    if not H:
+        return _double(X1, Y1, Z1) if not r else _INFINITY
+    HH = H * H % P
+    HHH = H * HH % P
+    V = U1 * HH % P
+    X3 = (r * r - HHH - 2 * V) % P
+    return X3, (r * (V - X3) - S1 * HHH) % P, Z1 * Z2 * H % P
+
+def _to_affine(points):
+    """
+    Affine coordinates of finite Jacobian points with a single field inversion (Montgomery's trick).
+
+    @param points: (X, Y, Z) with Z != 0.
+    @type  points: list of tuple
+    @rtype       : list of (x, y)
+    """
+    prefix = []
+    acc = 1
+    for _, _, Z in points:
+        prefix.append(acc)
+        acc = acc * Z % P
+    inverse = pow(acc, -1, P)
+    affine = [None] * len(points)
+    for i in range(len(points) - 1, -1, -1):
+        X, Y, Z = points[i]
+        z_inv = inverse * prefix[i] % P
+        inverse = inverse * Z % P
+        z_inv2 = z_inv * z_inv % P
+        affine[i] = (X * z_inv2 % P, Y * z_inv2 * z_inv % P)
+    return affine
+
+def is_on_curve(x, y):
+    return 0 <= x < P and 0 <= y < P and (y * y - x * x * x - 7) % P == 0
+
+def lift_x(x):
+    """
+    The point with x coordinate `x` and an even y (BIP340), or None if there is none.
+
+    @param x: Field element.
+    @type  x: int
+    @rtype  : tuple[int, int] | None
+    """
+    if not 0 <= x < P:
+        return None
+    y_sq = (x * x * x + 7) % P
+    y = pow(y_sq, (P + 1) // 4, P)
+    if y * y % P != y_sq:
+        return None
+    return x, (y if not y & 1 else P - y)
+
+def _odd_multiples(points):
+    # [Q, 3Q, 5Q, ..., (2^(w-1) - 1)Q] of every affine Q, all converted with one inversion.
+    size = 1 << (WNAF_WINDOW - 2)
+    jacobian = []
+    for x, y in points:
+        twice = _double(x, y, 1)
+        current = (x, y, 1)
+        jacobian.append(current)
+        for _ in range(size - 1):
+            current = _add(*current, *twice)
+            jacobian.append(current)
+    affine = _to_affine(jacobian)
+    return [affine[i:i + size] for i in range(0, len(affine), size)]
+
+def _split(k):
+    # GLV decomposition: (k1, k2) with k = k1 + k2 * LAMBDA (mod N), both of at most ~128 bits (either sign).
+    c1 = (_B2 * k + N // 2) // N
+    c2 = (-_B1 * k + N // 2) // N
+    return k - c1 * _A1 - c2 * _A2, -c1 * _B1 - c2 * _B2
+
+def _wnaf(k):
+    # Width-WNAF_WINDOW non-adjacent form of k, least significant digit first; digits are odd or 0.
+    digits = []
+    full = 1 << WNAF_WINDOW
+    half = full >> 1
+    while k:
+        if k & 1:
+            digit = k & (full - 1)
+            if digit >= half:
+                digit -= full
+            k -= digit
+        else:
+            digit = 0
+        digits.append(digit)
+        k >>= 1
+    return digits
+
+#####################
+## GENERATOR TABLE ##
+#####################
+_g_table = None # flat: row i, byte j -> j * 256^i * G at [i * 256 + j] (j = 0 unused)
+
+def build_table():
+    """
+    Comb table of G: every multiple j * 256^i * G (i < 32, 0 < j < 256), so u*G costs one mixed addition per non-zero
+    byte of u and no doubling. Building it takes about 0.1 s; `generator_table` caches it in TABLE_FILE.
+
+    @return: The table, as a flat list of affine points.
+    @rtype : list
+    """
+    rows = 256 // TABLE_WINDOW
+    width = 1 << TABLE_WINDOW
+    table = []
+    base = (GX, GY)
+    for _ in range(rows):
+        jacobian = [(base[0], base[1], 1)]
+        for _ in range(width - 2):
+            jacobian.append(_add_affine(*jacobian[-1], *base))
+        jacobian.append(_add_affine(*jacobian[-1], *base)) # width * base: the next row's base
+        affine = _to_affine(jacobian)
+        table.append(None)
+        table.extend(affine[:-1])
+        base = affine[-1]
+    return table
+
+def save_table(table, path=TABLE_FILE):
+    """
+    Write a table from `build_table` to `path` (32-byte big-endian x and y per point, behind a header and a SHA256
+    of the points; written to a temporary file and renamed).
+
+    @param table: The comb table.
+    @type  table: list
+    @param path : Output file.
+    @type  path : str
+    """
+    payload = b"".join(point[0].to_bytes(32, "big") + point[1].to_bytes(32, "big")
+                       for point in table if point is not None)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as file:
+        file.write(_TABLE_MAGIC + hashlib.sha256(payload).digest() + payload)
+    os.replace(tmp, path)
+
+def load_table(path=TABLE_FILE):
+    """
+    Read a table written by `save_table`.
+
+    @param path: Table file.
+    @type  path: str
+    @return    : The comb table, or None if the file is missing, truncated, corrupt or has points off the curve.
+    @rtype     : list | None
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return None
+    head = len(_TABLE_MAGIC) + 32
+    rows, width = 256 // TABLE_WINDOW, 1 << TABLE_WINDOW
+    if (data[:len(_TABLE_MAGIC)] != _TABLE_MAGIC or len(data) != head + rows * (width - 1) * 64
+            or hashlib.sha256(data[head:]).digest() != data[len(_TABLE_MAGIC):head]):
+        return None
+    table = []
+    for offset in range(head, len(data), 64):
+        if (offset - head) // 64 % (width - 1) == 0:
+            table.append(None)
+        table.append((int.from_bytes(data[offset:offset + 32], "big"), int.from_bytes(data[offset + 32:offset + 64], "big")))
+    if table[1] != (GX, GY) or not all(point is None or is_on_curve(*point) for point in table):
+        return None
+    return table
+
+def generator_table(path=TABLE_FILE):
+    """
+    The comb table of G: loaded from `path`, or built and saved there (best effort) on first use; a file that is
+    corrupt or of another layout is rebuilt.
+
+    @param path: Table file.
+    @type  path: str
+    @rtype     : list
+    """
+    global _g_table
+    if _g_table is None:
+        table = load_table(path)
+        if table is None:
+            table = build_table()
+            try:
+                save_table(table, path)
+            except OSError: # read-only home: keep it in memory
+                pass
+        _g_table = table
+    return _g_table
+
+##########
+## KEYS ##
+##########
+class PublicKey:
+    """A parsed public key (affine point) with its wNAF odd multiples, computed on first use."""
+    __slots__ = ("x", "y", "_multiples")
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self._multiples = None
+
+    @property
+    def multiples(self):
+        if self._multiples is None:
+            self._multiples = _odd_multiples([(self.x, self.y)])[0]
+        return self._multiples
+
+def parse_pubkey(data):
+    """
+    @param data: SEC encoded key: 02/03 + x (compressed), 04 + x + y (uncompressed) or 06/07 + x + y (hybrid).
+    @type  data: bytes
+    @rtype     : PublicKey
+    @raise ValueError: If `data` is not a valid encoding of a point on the curve.
+    """
+    if len(data) == 33 and data[0] in (2, 3):
+        point = lift_x(int.from_bytes(data[1:], "big"))
+        if point is None:
+            raise ValueError("The public key could not be parsed or is invalid.")
+        x, y = point
+        return PublicKey(x, y if data[0] == 2 else P - y)
+    if len(data) == 65 and data[0] in (4, 6, 7):
+        x, y = int.from_bytes(data[1:33], "big"), int.from_bytes(data[33:], "big")
+        if is_on_curve(x, y) and (data[0] == 4 or data[0] & 1 == y & 1):
+            return PublicKey(x, y)
+    raise ValueError("The public key could not be parsed or is invalid.")
+
+def parse_xonly(data):
+    """
+    @param data: 32-byte x-only key (BIP340); the point has an even y.
+    @type  data: bytes
+    @rtype     : PublicKey
+    @raise ValueError: If `data` is not the x coordinate of a point on the curve.
+    """
+    point = lift_x(int.from_bytes(data, "big")) if len(data) == 32 else None
+    if point is None:
+        raise ValueError("The public key could not be parsed or is invalid.")
+    return PublicKey(*point)
+
+###########################
+## SCALAR MULTIPLICATION ##
+###########################
+def _multiply(terms, g_scalar):
+    """
+    sum k_i Q_i + g_scalar * G in Jacobian coordinates (Strauss: the doublings are shared by all terms).
+
+    Points are kept as (X, Y, Z) for x = X/Z^2, y = Y/Z^3, so additions and doublings need no field inversion; tables
+    are converted to affine coordinates with one inversion for all their points (`_to_affine`), so additions of table
+    points use the cheaper mixed formula. A k_i above 128 bits is split into two halves with the GLV endomorphism
+    (k = k1 + k2 * lambda, and lambda*Q costs one field multiplication per point), and the width-5 NAF of every half
+    runs over the odd multiples Q, 3Q, ..., 15Q of its key (computed once per parsed key): 128 doublings and about 43
+    additions per key. g_scalar * G walks the comb table (`build_table`).
+
+    @param terms   : (k_i, odd multiples of Q_i) pairs, k_i in [0, N); k_i above 128 bits are split with GLV.
+    @type  terms   : list of tuple
+    @param g_scalar: Multiple of G, in [0, N).
+    @type  g_scalar: int
+    @rtype         : tuple
+    """
+    halves = []
+    for scalar, multiples in terms:
+        if scalar >> 129:
+            k1, k2 = _split(scalar)
+            halves.append((k1, multiples))
+            halves.append((k2, [(BETA * x % P, y) for x, y in multiples]))
+        else:
+            halves.append((scalar, multiples))
+    # Every non-zero wNAF digit is one table point (negated for a negative digit), grouped by bit position.
+    columns = {}
+    for scalar, multiples in halves:
+        sign = 1 if scalar >= 0 else -1
+        for position, digit in enumerate(_wnaf(abs(scalar))):
+            if digit:
+                x, y = multiples[abs(digit) >> 1]
+                columns.setdefault(position, []).append((x, y if digit * sign > 0 else P - y))
+    X, Y, Z = _INFINITY
+    for position in range(max(columns, default=-1), -1, -1):
+        if Z:
+            X, Y, Z = _double(X, Y, Z)
+        for x, y in columns.get(position, ()):
+            X, Y, Z = _add_affine(X, Y, Z, x, y)
+    if g_scalar:
+        table = generator_table()
+        for row, byte in enumerate(g_scalar.to_bytes(32, "little")):
+            if byte:
+                x, y = table[(row << TABLE_WINDOW) | byte]
+                X, Y, Z = _add_affine(X, Y, Z, x, y)
+    return X, Y, Z
+
+###########
+## ECDSA ##
+###########
+def _der_length(data, pos):
+    # Length field at `pos` (strict DER, as libsecp256k1): (length, position after it).
+    if pos >= len(data):
+        raise ValueError
+    first = data[pos]
+    pos += 1
+    if first < 0x80:
+        return first, pos
+    size = first & 0x7f
+    if first == 0xff or not size or size > len(data) - pos or data[pos] == 0:
+        raise ValueError
+    length = int.from_bytes(data[pos:pos + size], "big")
+    if length < 0x80:
+        raise ValueError # should have used the short form
+    return length, pos + size
+
+def _der_integer(data, pos, end):
+    if pos >= end or data[pos] != 0x02:
+        raise ValueError
+    length, pos = _der_length(data, pos + 1)
+    if not length or length > end - pos:
+        raise ValueError
+    value = data[pos:pos + length]
+    if length > 1 and ((value[0] == 0 and value[1] < 0x80) or (value[0] == 0xff and value[1] >= 0x80)):
+        raise ValueError # excess padding
+    if value[0] & 0x80:
+        return N, pos + length # negative: overflows, so the signature fails to verify
+    return int.from_bytes(value, "big"), pos + length
+
+def parse_der(signature):
+    """
+    (r, s) of a DER signature; values out of range are returned as they are (they fail `verify_ecdsa`).
+
+    @param signature: DER signature (without the sighash type byte).
+    @type  signature: bytes
+    @rtype          : tuple[int, int]
+    @raise ValueError: If `signature` is not strict DER.
+    """
+    try:
+        if not signature or signature[0] != 0x30:
+            raise ValueError
+        length, pos = _der_length(signature, 1)
+        if length != len(signature) - pos:
+            raise ValueError
+        r, pos = _der_integer(signature, pos, len(signature))
+        s, pos = _der_integer(signature, pos, len(signature))
+        if pos != len(signature):
+            raise ValueError
+    except (ValueError, IndexError):
+        raise ValueError("The DER-encoded signature could not be parsed.") from None
+    return r, s
+
+def verify_ecdsa(pubkey, signature, message):
+    """
+    ECDSA verification, the fallback for environments without coincurve (see helper.sigcache.BACKENDS). It accepts
+    exactly what libsecp256k1 (and so coincurve) accepts: strict DER, low-S signatures, SEC keys in compressed,
+    uncompressed and hybrid form. About 550 verifications per second on one core (bench/secp256k1.py, CPython 3.11);
+    coincurve does 14000.
+
+    @param pubkey   : Parsed key (`parse_pubkey`).
+    @type  pubkey   : PublicKey
+    @param signature: DER signature (without the sighash type byte); only low-S signatures verify.
+    @type  signature: bytes
+    @param message  : The 32-byte digest that was signed.
+    @type  message  : bytes
+    @return         : True if the signature is valid.
+    @rtype          : bool
+    @raise ValueError: If `signature` is not strict DER.
+    """
+    r, s = parse_der(signature)
+    if not (0 < r < N and 0 < s <= HALF_N):
+        return False
+    z = int.from_bytes(message, "big") % N
+    w = pow(s, -1, N)
+    X, _, Z = _multiply([(r * w % N, pubkey.multiples)], z * w % N)
+    if not Z:
+        return False
+    # x(R) mod N == r, compared in Jacobian coordinates: X == x * Z^2 for x = r or r + N.
+    zz = Z * Z % P
+    return X == r * zz % P or (r + N < P and X == (r + N) * zz % P)
+
+#############
+## SCHNORR ##
+#############
+def _challenge(r_bytes, pubkey, message):
+    data = _CHALLENGE_TAG + r_bytes + pubkey.x.to_bytes(32, "big") + message
+    return int.from_bytes(hashlib.sha256(data).digest(), "big") % N
+
+def verify_schnorr(pubkey, signature, message):
+    """
+    BIP340 verification.
+
+    @param pubkey   : Parsed x-only key (`parse_xonly`).
+    @type  pubkey   : PublicKey
+    @param signature: 64-byte signature.
+    @type  signature: bytes
+    @param message  : The signed message (32 bytes for taproot).
+    @type  message  : bytes
+    @return         : True if the signature is valid.
+    @rtype          : bool
+    @raise ValueError: If `signature` is not 64 bytes long.
+    """
+    if len(signature) != 64:
+        raise ValueError("Signature must be 64 bytes long.")
+    r, s = int.from_bytes(signature[:32], "big"), int.from_bytes(signature[32:], "big")
+    if r >= P or s >= N:
+        return False
+    e = _challenge(signature[:32], pubkey, message)
+    X, Y, Z = _multiply([((N - e) % N, pubkey.multiples)], s) # s*G - e*P
+    if not Z:
+        return False
+    x, y = _to_affine([(X, Y, Z)])[0]
+    return x == r and not y & 1
+
+def verify_schnorr_batch(items):
+    """
+    BIP340 batch verification: True if (with overwhelming probability) every signature is valid.
+
+    Checks (sum a_i s_i) G = sum a_i R_i + sum a_i e_i P_i for random 128-bit a_i with one multi-scalar
+    multiplication, so a signature costs about 90 mixed additions instead of the ~220 point operations of a single
+    verification: some 900 per second in batches of 16 to 256, against 550 one at a time.
+
+    @param items: (pubkey, signature, message) triples, keys from `parse_xonly`.
+    @type  items: list of tuple
+    @rtype      : bool
+    """
+    if len(items) == 1:
+        pubkey, signature, message = items[0]
+        return len(signature) == 64 and verify_schnorr(pubkey, signature, message)
+    terms = []
+    nonces = []
+    s_sum = 0
+    for i, (pubkey, signature, message) in enumerate(items):
+        if len(signature) != 64:
+            return False
+        r, s = int.from_bytes(signature[:32], "big"), int.from_bytes(signature[32:], "big")
+        nonce = lift_x(r) # R, the point with even y
+        if nonce is None or s >= N:
+            return False
+        a = 1 if i == 0 else secrets.randbits(128) or 1
+        s_sum += a * s
+        nonces.append((a, nonce))
+        terms.append((a * _challenge(signature[:32], pubkey, message) % N, pubkey.multiples))
+    for (a, _), multiples in zip(nonces, _odd_multiples([nonce for _, nonce in nonces])):
+        terms.append((a, multiples))
+    # sum a_i R_i + sum a_i e_i P_i - (sum a_i s_i) G must be the point at infinity.
+    _, _, Z = _multiply(terms, (N - s_sum % N) % N)
+    return not Z
@@ -0,0 +1,236 @@
+import struct
+import hashlib
+
+###############
+## CONSTANTS ##
+###############
+# Single-byte compact-size encodings (0x00 - 0xfc) are precomputed; larger values fall through to struct.
+_COMPACT_SIZE = [bytes([n]) for n in range(0xfd)]
+_MARKER_FLAG = b"\x00\x01"
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_OUTPOINT = struct.Struct("<32sI") # prev txid (internal byte order) + vout
+
+def compact_size(value):
+    """
+    Encode an integer as a Bitcoin compact-size (varint).
+
+    @param value: The integer value to be encoded.
+    @type  value: int
+    @return     : The compact-size encoding.
+    @rtype      : bytes
+    """
+    if value < 0xfd:
+        return _COMPACT_SIZE[value]
+    elif value <= 0xffff:
+        return b"\xfd" + _U16.pack(value)
+    elif value <= 0xffffffff:
+        return b"\xfe" + _U32.pack(value)
+    else:
+        return b"\xff" + _U64.pack(value)
+
+def hash256(data):
+    """
+    Double SHA256 of `data`.
+
+    @param data: Bytes-like object to hash.
+    @type  data: bytes | bytearray | memoryview
+    @return    : The 32-byte digest (internal byte order).
+    @rtype     : bytes
+    """
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+class SerializedTxn:
+    """
+    One BIP144 serialization of a transaction held in a single bytearray.
+
+    Layout: version | [marker flag] | inputs + outputs | [witness] | locktime.
+    The non-witness serialization is the `base` segments (version, inputs + outputs, locktime), exposed as memoryviews
+    into the same buffer, so txid and wtxid are both hashed from one pass without copying.
+    """
+    __slots__ = ("buffer", "full", "base", "base_size", "is_segwit")
+
+    def __init__(self, buffer, body_start, body_end, is_segwit):
+        self.buffer = buffer
+        self.full = memoryview(buffer)
+        self.is_segwit = is_segwit
+        if is_segwit:
+            self.base = (self.full[:4], self.full[body_start:body_end], self.full[-4:])
+        else:
+            self.base = (self.full,)
+        self.base_size = sum(len(seg) for seg in self.base)
+
+    @property
+    def total_size(self):
+        """Size of the witness serialization in bytes."""
+        return len(self.buffer)
+
+    @property
+    def weight(self):
+        """BIP141 weight: base size * 3 + total size."""
+        return self.base_size*3 + len(self.buffer)
+
+    def base_bytes(self):
+        """
+        The non-witness serialization as one bytes object.
+
+        @return: version | inputs + outputs | locktime
+        @rtype : bytes
+        """
+        if not self.is_segwit:
+            return bytes(self.buffer)
+        return b"".join(self.base)
+
+    def txid_hash(self):
+        """
+        hash256 of the non-witness serialization (internal byte order).
+
+        @rtype: bytes
+        """
+        sha = hashlib.sha256()
+        for seg in self.base:
+            sha.update(seg)
+        return hashlib.sha256(sha.digest()).digest()
+
+    def wtxid_hash(self):
+        """
+        hash256 of the witness serialization (internal byte order).
+
+        @rtype: bytes
+        """
+        if not self.is_segwit:
+            return self.txid_hash()
+        return hash256(self.full)
+
+def serialize(tx):
+    """
+    Serialize a transaction (see helper.txn_model.Transaction) into a SerializedTxn.
+
+    Fixed-width fields go through precompiled structs and everything is appended to one bytearray;
+    the buffer is never converted to or from hex.
+
+    @param tx: The transaction to serialize.
+    @type  tx: Transaction
+    @return  : The serialization.
+    @rtype   : SerializedTxn
+    """
+    vin = tx.vin
+    vout = tx.vout
+    is_segwit = any(iN.witness for iN in vin)
+
+    buf = bytearray(_U32.pack(tx.version))
+    if is_segwit:
+        buf += _MARKER_FLAG
+    body_start = len(buf)
+
+    # Inputs
+    buf += compact_size(len(vin))
+    for iN in vin:
+        buf += _OUTPOINT.pack(bytes.fromhex(iN.txid)[::-1], iN.vout)
+        script = iN.scriptsig
+        buf += compact_size(len(script))
+        buf += script
+        buf += _U32.pack(iN.sequence)
+
+    # Outputs
+    buf += compact_size(len(vout))
+    for out in vout:
+        buf += _U64.pack(out.value)
+        script = out.scriptpubkey
+        buf += compact_size(len(script))
+        buf += script
+    body_end = len(buf)
+
+    # Witness (an input without witness data still gets an empty stack)
+    if is_segwit:
+        for iN in vin:
+            buf += compact_size(len(iN.witness))
+            for item in iN.witness:
+                buf += compact_size(len(item))
+                buf += item
+
+    # Locktime
+    buf += _U32.pack(tx.locktime)
+
+    return SerializedTxn(buf, body_start, body_end, is_segwit)
+
+def read_compact_size(view, pos):
+    """
+    Decode a compact-size (varint) at `pos`.
+
+    @param view: Buffer holding the encoding.
+    @type  view: bytes | memoryview
+    @param pos : Offset of its first byte.
+    @type  pos : int
+    @return    : (value, offset just past the encoding)
+    @rtype     : tuple[int, int]
+    """
+    first = view[pos]
+    if first < 0xfd:
+        return first, pos + 1
+    if first == 0xfd:
+        return _U16.unpack_from(view, pos + 1)[0], pos + 3
+    if first == 0xfe:
+        return _U32.unpack_from(view, pos + 1)[0], pos + 5
+    return _U64.unpack_from(view, pos + 1)[0], pos + 9
+
+def _read_bytes(view, pos):
+    size, pos = read_compact_size(view, pos)
+    if pos + size > len(view):
+        raise ValueError("serialization ends inside a field")
+    return bytes(view[pos:pos + size]), pos + size
+
+def deserialize(buffer):
+    """
+    Split a BIP144 serialization (as written by `serialize`) into its fields.
+
+    Fixed-width fields are read in place with struct.unpack_from; only scripts, witness items and txids are copied
+    out. The returned SerializedTxn wraps `buffer` itself, so the txid and wtxid are later hashed from it directly.
+
+    @param buffer: The serialization.
+    @type  buffer: bytes | memoryview
+    @return      : (version, inputs, outputs, locktime, serialized), where every input is
+                   (prev txid (hex, RPC byte order), vout, scriptsig, sequence, witness items) and every output is
+                   (value, scriptpubkey).
+    @rtype       : tuple
+    @raise ValueError: If `buffer` is not a complete serialization.
+    """
+    view = memoryview(buffer)
+    try:
+        version = _U32.unpack_from(view, 0)[0]
+        pos = 4
+        is_segwit = view[4] == 0 and view[5] == 1
+        if is_segwit:
+            pos += 2
+        body_start = pos
+
+        n_in, pos = read_compact_size(view, pos)
+        inputs = []
+        for _ in range(n_in):
+            prev_txid, vout = _OUTPOINT.unpack_from(view, pos)
+            scriptsig, pos = _read_bytes(view, pos + _OUTPOINT.size)
+            inputs.append([prev_txid[::-1].hex(), vout, scriptsig, _U32.unpack_from(view, pos)[0], []])
+            pos += 4
+
+        n_out, pos = read_compact_size(view, pos)
+        outputs = []
+        for _ in range(n_out):
+            value = _U64.unpack_from(view, pos)[0]
+            scriptpubkey, pos = _read_bytes(view, pos + 8)
+            outputs.append((value, scriptpubkey))
+        body_end = pos
+
+        if is_segwit:
+            for iN in inputs:
+                n_items, pos = read_compact_size(view, pos)
+                for _ in range(n_items):
+                    item, pos = _read_bytes(view, pos)
+                    iN[4].append(item)
+
+        locktime = _U32.unpack_from(view, pos)[0]
+    except (IndexError, struct.error) as e:
+        raise ValueError(f"truncated serialization: {e}") from None
+    if pos + 4 != len(view):
+        raise ValueError("trailing bytes after the locktime")
+    return version, inputs, outputs, locktime, SerializedTxn(view, body_start, body_end, is_segwit)
@@ -0,0 +1,179 @@
+import struct
+import hashlib
+
+try:
+    import numpy as np
+except ImportError: # optional dependency
+    np = None
+
+AVAILABLE = np is not None # the "numpy" mining backend needs it
+
+###############
+## CONSTANTS ##
+###############
+_K = (
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2,
+)
+_H0 = (0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19)
+_BE_WORDS = struct.Struct(">16I")
+BATCH_SIZE = 1 << 14 # nonces per call; bigger batches fall out of cache
+
+if AVAILABLE:
+    _K_NP = [np.uint32(k) for k in _K]
+    _H0_NP = [np.uint32(h) for h in _H0]
+    _PAD_80 = [np.uint32(0x80000000)] + [np.uint32(0)] * 10 + [np.uint32(80 * 8)] # after 16 header bytes
+    _PAD_32 = [np.uint32(0x80000000)] + [np.uint32(0)] * 6 + [np.uint32(32 * 8)]  # after 32 digest bytes
+
+def _rotr(x, n):
+    return (x >> np.uint32(n)) | (x << np.uint32(32 - n))
+
+def _compress(state, w):
+    """
+    One SHA256 compression over uint32 lanes.
+
+    @param state: 8 chaining words (arrays or uint32 scalars, broadcast together).
+    @type  state: list
+    @param w    : 16 message words (arrays or uint32 scalars).
+    @type  w    : list
+    @return     : The 8 new chaining words.
+    @rtype      : list
+    """
+    with np.errstate(over="ignore"): # uint32 arithmetic is meant to wrap
+        return _compress_rounds(state, list(w))
+
+def _compress_rounds(state, w):
+    for t in range(16, 64):
+        w15, w2 = w[t - 15], w[t - 2]
+        s0 = _rotr(w15, 7) ^ _rotr(w15, 18) ^ (w15 >> np.uint32(3))
+        s1 = _rotr(w2, 17) ^ _rotr(w2, 19) ^ (w2 >> np.uint32(10))
+        w.append(w[t - 16] + s0 + w[t - 7] + s1)
+
+    a, b, c, d, e, f, g, h = state
+    for t in range(64):
+        s1 = _rotr(e, 6) ^ _rotr(e, 11) ^ _rotr(e, 25)
+        ch = (e & f) ^ (~e & g)
+        t1 = h + s1 + ch + _K_NP[t] + w[t]
+        s0 = _rotr(a, 2) ^ _rotr(a, 13) ^ _rotr(a, 22)
+        maj = (a & b) ^ (a & c) ^ (b & c)
+        t2 = s0 + maj
+        h, g, f, e, d, c, b, a = g, f, e, d + t1, c, b, a, t1 + t2
+    return [x + y for x, y in zip(state, (a, b, c, d, e, f, g, h))]
+
+def _bswap(x):
+    return ((x & np.uint32(0xff)) << np.uint32(24)) | ((x & np.uint32(0xff00)) << np.uint32(8)) \
+        | ((x >> np.uint32(8)) & np.uint32(0xff00)) | (x >> np.uint32(24))
+
+def midstate(header_wo_nonce):
+    """
+    SHA256 chaining state after the first 64 header bytes.
+
+    @param header_wo_nonce: First 76 bytes of the block header.
+    @type  header_wo_nonce: bytes
+    @return               : 8 uint32 words.
+    @rtype                : list
+    """
+    return _compress(_H0_NP, [np.uint32(x) for x in _BE_WORDS.unpack(header_wo_nonce[:64])])
+
+def hash_words(header_wo_nonce, nonces, state=None):
+    """
+    hash256 of the header for every nonce, as 8 arrays of big-endian digest words.
+
+    @param header_wo_nonce: First 76 bytes of the block header.
+    @type  header_wo_nonce: bytes
+    @param nonces         : Nonces to hash.
+    @type  nonces         : numpy.ndarray (uint32)
+    @param state          : midstate(header_wo_nonce), if already known.
+    @type  state          : list
+    @return               : Digest words w0..w7 (digest = w0 || ... || w7, each big-endian).
+    @rtype                : list of numpy.ndarray
+    """
+    if state is None:
+        state = midstate(header_wo_nonce)
+    tail = [np.uint32(x) for x in struct.unpack(">3I", header_wo_nonce[64:76])]
+    first = _compress(state, tail + [_bswap(nonces)] + _PAD_80)
+    return _compress(_H0_NP, first + _PAD_32)
+
+def hash_headers(header_wo_nonce, nonces):
+    """
+    hash256 of the header for every nonce, as bytes (internal byte order, like hashlib).
+
+    @param header_wo_nonce: First 76 bytes of the block header.
+    @type  header_wo_nonce: bytes
+    @param nonces         : Nonces to hash.
+    @type  nonces         : sequence of int
+    @return               : One 32-byte digest per nonce.
+    @rtype                : list of bytes
+    """
+    nonces = np.asarray(nonces, dtype=np.uint32)
+    words = np.stack([np.broadcast_to(w, nonces.shape) for w in hash_words(header_wo_nonce, nonces)], axis=1)
+    raw = words.astype(">u4").tobytes()
+    return [raw[i:i + 32] for i in range(0, len(raw), 32)]
+
+def self_test(samples=257):
+    """
+    Check the vectorised hash bit-for-bit against hashlib.
+
+    @param samples: Number of nonces to compare (spread over the whole 32-bit range, plus both ends).
+    @type  samples: int
+    @return       : True if every digest matches.
+    @rtype        : bool
+    """
+    header_wo_nonce = hashlib.sha256(b"sha256_np").digest() * 2 + bytes(range(12))
+    nonces = [0, 0xFFFFFFFF] + [(i * 0x9E3779B1) & 0xFFFFFFFF for i in range(samples - 2)]
+    for nonce, digest in zip(nonces, hash_headers(header_wo_nonce, nonces)):
+        header = header_wo_nonce + nonce.to_bytes(4, "little")
+        if digest != hashlib.sha256(hashlib.sha256(header).digest()).digest():
+            return False
+    return True
+
+def scan(header_wo_nonce, target, start, stop, cancel=None, batch_size=BATCH_SIZE):
+    """
+    Search [start, stop) for the first nonce whose header hash is <= target, `batch_size` nonces per NumPy call.
+
+    This is the optional NumPy backend of the nonce search: each call runs the SHA256 compression function as
+    vectorised uint32 operations, one lane per nonce.
+
+    Lanes are filtered on the most significant 32 bits of the hash; the few survivors are confirmed with hashlib
+    in nonce order, so the result is exactly what the hashlib loop would return.
+
+    @param header_wo_nonce: First 76 bytes of the block header.
+    @type  header_wo_nonce: bytes
+    @param target         : Difficulty target.
+    @type  target         : int
+    @param start          : First nonce (inclusive).
+    @type  start          : int
+    @param stop           : Last nonce (exclusive).
+    @type  stop           : int
+    @param cancel         : Checked after every batch; the scan gives up once it is set.
+    @type  cancel         : multiprocessing.Event
+    @param batch_size     : Nonces hashed per call.
+    @type  batch_size     : int
+    @return               : (nonce or None, number of hashes computed: every nonce of the batches run, including
+                            those after the one found)
+    @rtype                : tuple
+    """
+    state = midstate(header_wo_nonce)
+    top = np.uint32(target >> 224)
+    limit = target.to_bytes(32, "big")
+    nonce = start
+    while nonce < stop:
+        batch_end = min(nonce + batch_size, stop)
+        nonces = np.arange(nonce, batch_end, dtype=np.uint32)
+        words = hash_words(header_wo_nonce, nonces, state)
+        # Most significant word of the (little-endian) hash is the byte-swapped last digest word.
+        for i in np.flatnonzero(_bswap(words[7]) <= top):
+            candidate = nonce + int(i)
+            header = header_wo_nonce + candidate.to_bytes(4, "little")
+            if hashlib.sha256(hashlib.sha256(header).digest()).digest()[::-1] <= limit:
+                return candidate, batch_end - start
+        nonce = batch_end
+        if cancel is not None and cancel.is_set():
+            break
+    return None, nonce - start
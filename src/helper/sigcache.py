@@ -0,0 +1,447 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict, deque
+import helper.secp256k1 as secp256k1
+import helper.instrument as instrument
+try:
+    import coincurve
+except ImportError: # optional dependency
+    coincurve = None
+
+###############
+## CONSTANTS ##
+###############
+SIGCACHE_SIZE = 1 << 17 # entries (~15 MB)
+PUBKEY_POOL_SIZE = 1 << 14
+KEY_SIZE = 32
+_SCHNORR_KEY_PREFIX = hashlib.sha256(b"sigcache/schnorr").digest() * 2 # keeps Schnorr keys apart from ECDSA keys
+
+def cache_key(message_hash, pubkey, signature):
+    """
+    Cache key of one verification.
+
+    @param message_hash: The 32-byte digest that was signed.
+    @type  message_hash: bytes
+    @param pubkey      : SEC encoded public key.
+    @type  pubkey      : bytes
+    @param signature   : DER signature (without the sighash type byte).
+    @type  signature   : bytes
+    @rtype             : bytes
+    """
+    return hashlib.sha256(message_hash + pubkey + signature).digest()
+
+def schnorr_cache_key(message, pubkey, signature):
+    """
+    Cache key of one BIP340 verification: a tagged hash, so no ECDSA key can collide with it.
+
+    @param message  : The 32-byte signature hash.
+    @type  message  : bytes
+    @param pubkey   : 32-byte x-only public key.
+    @type  pubkey   : bytes
+    @param signature: 64-byte signature (without the sighash type byte).
+    @type  signature: bytes
+    @rtype          : bytes
+    """
+    return hashlib.sha256(_SCHNORR_KEY_PREFIX + message + pubkey + signature).digest()
+
+class SignatureCache:
+    """
+    Bounded, thread-safe LRU set of verified (sighash, pubkey, signature) keys with hit/miss counters.
+
+    A signature that verified once verifies forever, so re-validating a mempool only has to run ECDSA for signatures
+    it has not seen. Like Bitcoin Core's signature cache, only successful verifications are stored, so invalid
+    signatures cannot push good ones out. BIP340 signatures share the cache under keys of their own
+    (`schnorr_cache_key`).
+
+    Keys added since the last `take_delta()` are remembered, so worker processes can ship what they learned
+    back to the parent (see `merge`).
+    """
+
+    def __init__(self, maxsize=SIGCACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._new = deque(maxlen=maxsize)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        # Membership without counting a hit or miss, or refreshing the entry.
+        with self._lock:
+            return key in self._entries
+
+    def lookup(self, key):
+        """
+        True if `key` verified before; counts a hit or a miss and refreshes the entry.
+
+        @param key: See `cache_key`.
+        @type  key: bytes
+        @rtype    : bool
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def add(self, key):
+        """
+        Remember a successful verification, evicting the least recently used entry if full.
+
+        @param key: See `cache_key`.
+        @type  key: bytes
+        """
+        with self._lock:
+            self._insert(key)
+            self._new.append(key)
+
+    def _insert(self, key):
+        self._entries[key] = None
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._new.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """
+        @return: `entries`, `hits`, `misses` and `hit_rate`.
+        @rtype : dict
+        """
+        lookups = self.hits + self.misses
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    ######################
+    ## WORKER HAND-OFFS ##
+    ######################
+    def take_delta(self):
+        """
+        Keys added and counters accumulated since the last call; resets both.
+
+        @return: (new keys, hits, misses)
+        @rtype : tuple[list of bytes, int, int]
+        """
+        with self._lock:
+            delta = (list(self._new), self.hits, self.misses)
+            self._new.clear()
+            self.hits = self.misses = 0
+        return delta
+
+    def merge(self, delta):
+        """
+        Fold another process's `take_delta()` into this cache.
+
+        @param delta: (new keys, hits, misses)
+        @type  delta: tuple
+        """
+        keys, hits, misses = delta
+        with self._lock:
+            for key in keys:
+                self._insert(key)
+            self.hits += hits
+            self.misses += misses
+
+    #################
+    ## PERSISTENCE ##
+    #################
+    def load(self, path):
+        """
+        Add the keys stored in `path` (oldest first); a missing file is an empty cache.
+
+        @param path: Cache file written by `save`.
+        @type  path: str
+        @return    : Number of keys read.
+        @rtype     : int
+        """
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as file:
+            data = file.read()
+        with self._lock:
+            for i in range(0, len(data) - len(data) % KEY_SIZE, KEY_SIZE):
+                self._insert(data[i:i + KEY_SIZE])
+        return len(data) // KEY_SIZE
+
+    def save(self, path):
+        """
+        Write every key to `path`, least recently used first (written to a temporary file and renamed).
+
+        @param path: Cache file.
+        @type  path: str
+        """
+        with self._lock:
+            data = b"".join(self._entries)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as file:
+            file.write(data)
+        os.replace(tmp, path)
+
+##############
+## BACKENDS ##
+##############
+class CoincurveBackend:
+    """Verification with coincurve (libsecp256k1); its public API has no batch verification."""
+    name = "coincurve"
+    batches = False # verify_schnorr_batch is a loop: deferring signatures to it gains nothing
+
+    @staticmethod
+    def parse_pubkey(data):
+        return coincurve.PublicKey(data)
+
+    @staticmethod
+    def parse_xonly(data):
+        return coincurve.PublicKeyXOnly(data)
+
+    @staticmethod
+    def verify_ecdsa(key, signature, message_hash):
+        return key.verify(signature, message_hash, hasher=None)
+
+    @staticmethod
+    def verify_schnorr(key, signature, message):
+        return key.verify(signature, message)
+
+    @staticmethod
+    def verify_schnorr_batch(items):
+        return all(key.verify(signature, message) for key, signature, message in items)
+
+class PythonBackend:
+    """
+    Verification with helper.secp256k1 (loads or builds its generator table on first use): some 25 times slower than
+    coincurve, but with a real BIP340 batch verification.
+    """
+    name = "python"
+    batches = True
+
+    parse_pubkey = staticmethod(secp256k1.parse_pubkey)
+    parse_xonly = staticmethod(secp256k1.parse_xonly)
+    verify_ecdsa = staticmethod(secp256k1.verify_ecdsa)
+    verify_schnorr = staticmethod(secp256k1.verify_schnorr)
+    verify_schnorr_batch = staticmethod(secp256k1.verify_schnorr_batch)
+
+BACKENDS = {"python": PythonBackend}
+if coincurve is not None:
+    BACKENDS["coincurve"] = CoincurveBackend
+DEFAULT_BACKEND = "coincurve" if coincurve is not None else "python"
+_backend = BACKENDS[DEFAULT_BACKEND]
+
+def use_backend(name):
+    """
+    Verify signatures with another backend from now on (in this process, and in workers forked later). The key pools
+    are emptied, as they hold the keys the previous backend parsed. The default is coincurve when it is installed,
+    else python.
+
+    @param name: Key of BACKENDS.
+    @type  name: str
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown verification backend {name!r} (available: {', '.join(BACKENDS)})")
+    _backend = BACKENDS[name]
+    PUBKEY_POOL.clear()
+    XONLY_POOL.clear()
+    if name == "python":
+        secp256k1.generator_table() # before forking workers, so they share it
+
+def backend_name():
+    return _backend.name
+
+def backend_batches():
+    """
+    @return: True if the current backend verifies a Schnorr batch faster than one signature at a time.
+    @rtype : bool
+    """
+    return _backend.batches
+
+def _parse_pubkey(data):
+    return _backend.parse_pubkey(data)
+
+def _parse_xonly(data):
+    return _backend.parse_xonly(data)
+
+class PublicKeyPool:
+    """
+    Bounded, thread-safe LRU map of encoded public keys to keys parsed by the current backend (`_parse_pubkey` for SEC
+    keys, `_parse_xonly` for x-only ones), so a key used by many inputs is decompressed and validated once.
+    """
+
+    def __init__(self, maxsize=PUBKEY_POOL_SIZE, parse=_parse_pubkey):
+        self.maxsize = maxsize
+        self.parse = parse
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, pubkey):
+        """
+        @param pubkey: Encoded public key.
+        @type  pubkey: bytes
+        @return      : The parsed key.
+        @rtype       : object
+        @raise ValueError: If `pubkey` is not a valid point.
+        """
+        with self._lock:
+            key = self._keys.get(pubkey)
+            if key is not None:
+                self._keys.move_to_end(pubkey)
+                return key
+        key = self.parse(pubkey) # parse outside the lock
+        with self._lock:
+            self._keys[pubkey] = key
+            while len(self._keys) > self.maxsize:
+                self._keys.popitem(last=False)
+        return key
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+SIGNATURE_CACHE = SignatureCache()
+PUBKEY_POOL = PublicKeyPool()
+XONLY_POOL = PublicKeyPool(parse=_parse_xonly)
+_deferred = None # queued (signature, message, pubkey) while defer_schnorr() is on
+
+def verify(signature, message_hash, pubkey, cache=SIGNATURE_CACHE, pool=PUBKEY_POOL):
+    """
+    ECDSA verification through the signature cache and public key pool.
+
+    @param signature   : DER signature (without the sighash type byte).
+    @type  signature   : bytes
+    @param message_hash: The 32-byte digest that was signed.
+    @type  message_hash: bytes
+    @param pubkey      : SEC encoded public key.
+    @type  pubkey      : bytes
+    @return            : True if the signature is valid, False otherwise (including malformed inputs).
+    @rtype             : bool
+    """
+    key = cache_key(message_hash, pubkey, signature)
+    if cache.lookup(key):
+        instrument.count("sigcache.hits")
+        return True
+    instrument.count("ecdsa.verifications")
+    try:
+        with instrument.timer("ecdsa"):
+            valid = _backend.verify_ecdsa(pool.get(pubkey), signature, message_hash)
+    except ValueError: # malformed DER signature or public key
+        instrument.count("ecdsa.malformed")
+        return False
+    if valid:
+        cache.add(key)
+    else:
+        instrument.count("ecdsa.failures")
+    return valid
+
+#############
+## SCHNORR ##
+#############
+def defer_schnorr(on=True):
+    """
+    Queue BIP340 verifications the cache misses instead of running them (see `verify_schnorr`), or stop queueing;
+    either way the queue starts empty. The caller settles the queue later with `verify_schnorr_batch`, e.g. once for
+    a whole mempool.
+
+    @param on: Defer verifications.
+    @type  on: bool
+    """
+    global _deferred
+    _deferred = [] if on else None
+
+def take_deferred():
+    """
+    Verifications queued since the last call; empties the queue.
+
+    @return: (signature, message, pubkey) triples, for `verify_schnorr_batch`; empty while not deferring.
+    @rtype : list of tuple
+    """
+    global _deferred
+    if not _deferred:
+        return []
+    queued, _deferred = _deferred, []
+    return queued
+
+def _schnorr(signature, message, pubkey, pool):
+    instrument.count("schnorr.verifications")
+    try:
+        with instrument.timer("schnorr"):
+            valid = _backend.verify_schnorr(pool.get(pubkey), signature, message)
+    except ValueError: # not a point on the curve, or not 64 bytes
+        instrument.count("schnorr.malformed")
+        return False
+    if not valid:
+        instrument.count("schnorr.failures")
+    return valid
+
+def verify_schnorr(signature, message, pubkey, cache=SIGNATURE_CACHE, pool=XONLY_POOL):
+    """
+    BIP340 verification through the signature cache and x-only key pool.
+
+    While deferring (`defer_schnorr`), a signature the cache does not know is queued and reported valid: the verdict
+    that depended on it holds only once `verify_schnorr_batch` accepted the queue.
+
+    @param signature: 64-byte signature (without the sighash type byte).
+    @type  signature: bytes
+    @param message  : The 32-byte signature hash.
+    @type  message  : bytes
+    @param pubkey   : 32-byte x-only public key.
+    @type  pubkey   : bytes
+    @return         : True if the signature is valid (or queued), False otherwise (including malformed inputs).
+    @rtype          : bool
+    """
+    key = schnorr_cache_key(message, pubkey, signature)
+    if cache.lookup(key):
+        instrument.count("sigcache.hits")
+        return True
+    if _deferred is not None:
+        instrument.count("schnorr.deferred")
+        _deferred.append((signature, message, pubkey))
+        return True
+    valid = _schnorr(signature, message, pubkey, pool)
+    if valid:
+        cache.add(key)
+    return valid
+
+def verify_schnorr_batch(items, cache=SIGNATURE_CACHE, pool=XONLY_POOL):
+    """
+    Verify queued BIP340 signatures together.
+
+    Signatures already cached and repeats within `items` are checked once, the rest with the backend's batch
+    verification (coincurve verifies them one after another). They are all cached if the batch holds; a failed
+    batch caches nothing, and the caller narrows it down by checking smaller batches again.
+
+    @param items: (signature, message, pubkey) triples, e.g. from `take_deferred`.
+    @type  items: iterable of tuple
+    @return     : True if every signature is valid.
+    @rtype      : bool
+    """
+    pending = {}
+    for signature, message, pubkey in items:
+        key = schnorr_cache_key(message, pubkey, signature)
+        if key not in pending and key not in cache:
+            pending[key] = (signature, message, pubkey)
+    if not pending:
+        return True
+    instrument.count("schnorr.batched", len(pending))
+    try:
+        batch = [(pool.get(pubkey), signature, message) for signature, message, pubkey in pending.values()]
+        if any(len(signature) != 64 for _, signature, _ in batch):
+            raise ValueError
+    except ValueError: # not a point on the curve, or not 64 bytes
+        instrument.count("schnorr.malformed")
+        return False
+    with instrument.timer("schnorr.batch"):
+        valid = _backend.verify_schnorr_batch(batch)
+    if not valid:
+        instrument.count("schnorr.failures")
+        return False
+    for key in pending:
+        cache.add(key)
+    return True
@@ -0,0 +1,371 @@
+import struct
+import hashlib
+import helper.serializer as serializer
+
+###############
+## CONSTANTS ##
+###############
+SIGHASH_ALL = 0x01
+SIGHASH_NONE = 0x02
+SIGHASH_SINGLE = 0x03
+SIGHASH_ANYONECANPAY = 0x80
+SIGHASH_DEFAULT = 0x00 # taproot only: ALL, signed by a 64-byte signature
+TAPROOT_SIGHASH_TYPES = frozenset((0x00, 0x01, 0x02, 0x03, 0x81, 0x82, 0x83))
+_ZERO_HASH = bytes(32)
+_ONE_HASH = b"\x01" + bytes(31) # legacy SIGHASH_SINGLE without a matching output signs uint256(1)
+_EMPTY_SCRIPT = b"\x00"
+_BLANK_OUTPUT = b"\xff" * 8 + _EMPTY_SCRIPT # value -1, empty script
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_OUTPOINT = struct.Struct("<32sI") # prev txid (internal byte order) + vout
+_TAPSIGHASH_TAG = hashlib.sha256(b"TapSighash").digest() * 2 # BIP340 tagged hash prefix
+
+def tagged_hash(tag, data):
+    """
+    BIP340 tagged hash: sha256(sha256(tag) || sha256(tag) || data).
+
+    @param tag : The tag, e.g. b"TapSighash".
+    @type  tag : bytes
+    @param data: The message.
+    @type  data: bytes
+    @rtype     : bytes
+    """
+    prefix = _TAPSIGHASH_TAG if tag == b"TapSighash" else hashlib.sha256(tag).digest() * 2
+    return hashlib.sha256(prefix + data).digest()
+
+def p2wpkh_script_code(pubkey_hash):
+    """
+    BIP143 scriptCode of a P2WPKH input: the P2PKH script of the same key hash.
+
+    @param pubkey_hash: 20-byte HASH160 of the public key.
+    @type  pubkey_hash: bytes
+    @return           : OP_DUP OP_HASH160 <pubkey_hash> OP_EQUALVERIFY OP_CHECKSIG
+    @rtype            : bytes
+    """
+    return b"\x76\xa9\x14" + pubkey_hash + b"\x88\xac"
+
+class Bip143Hasher:
+    """
+    BIP143 (segwit v0) signature hashes for every input of one transaction.
+
+    The parts shared by all inputs (hashPrevouts, hashSequence, hashOutputs) are computed once, on first use,
+    so the digest of each further input only hashes its own ~160-byte preimage. One instance is memoized on
+    every helper.txn_model.Transaction (see `Transaction.bip143`).
+    """
+    __slots__ = ("_version", "_locktime", "_outpoints", "_sequences", "_outputs",
+                 "_hash_prevouts", "_hash_sequence", "_hash_outputs", "_hash_single")
+
+    def __init__(self, tx):
+        self._version = _U32.pack(tx.version)
+        self._locktime = _U32.pack(tx.locktime)
+        self._outpoints = [_OUTPOINT.pack(bytes.fromhex(iN.txid)[::-1], iN.vout) for iN in tx.vin]
+        self._sequences = [_U32.pack(iN.sequence) for iN in tx.vin]
+        self._outputs = []
+        for out in tx.vout:
+            script = out.scriptpubkey
+            self._outputs.append(_U64.pack(out.value) + serializer.compact_size(len(script)) + script)
+        self._hash_prevouts = None
+        self._hash_sequence = None
+        self._hash_outputs = None
+        self._hash_single = {}
+
+    ###################
+    ## SHARED HASHES ##
+    ###################
+    @property
+    def hash_prevouts(self):
+        """hash256 of every input's outpoint."""
+        if self._hash_prevouts is None:
+            self._hash_prevouts = serializer.hash256(b"".join(self._outpoints))
+        return self._hash_prevouts
+
+    @property
+    def hash_sequence(self):
+        """hash256 of every input's nSequence."""
+        if self._hash_sequence is None:
+            self._hash_sequence = serializer.hash256(b"".join(self._sequences))
+        return self._hash_sequence
+
+    @property
+    def hash_outputs(self):
+        """hash256 of every serialized output."""
+        if self._hash_outputs is None:
+            self._hash_outputs = serializer.hash256(b"".join(self._outputs))
+        return self._hash_outputs
+
+    def _single_output(self, index):
+        if index not in self._hash_single:
+            self._hash_single[index] = serializer.hash256(self._outputs[index])
+        return self._hash_single[index]
+
+    ############
+    ## DIGEST ##
+    ############
+    def preimage(self, index, script_code, amount, sighash_type=SIGHASH_ALL):
+        """
+        BIP143 preimage for one input.
+
+        @param index       : Index of the input being signed.
+        @type  index       : int
+        @param script_code : scriptCode of the input (without its length prefix).
+        @type  script_code : bytes
+        @param amount      : Value of the output spent by the input (sats).
+        @type  amount      : int
+        @param sighash_type: Sighash type byte (ALL, NONE or SINGLE, optionally | ANYONECANPAY).
+        @type  sighash_type: int
+        @return            : The serialized preimage (its hash256 is the signature hash).
+        @rtype             : bytes
+        """
+        base_type = sighash_type & 0x1f
+        anyone_can_pay = sighash_type & SIGHASH_ANYONECANPAY
+
+        hash_prevouts = _ZERO_HASH if anyone_can_pay else self.hash_prevouts
+        if anyone_can_pay or base_type in (SIGHASH_NONE, SIGHASH_SINGLE):
+            hash_sequence = _ZERO_HASH
+        else:
+            hash_sequence = self.hash_sequence
+        if base_type not in (SIGHASH_NONE, SIGHASH_SINGLE):
+            hash_outputs = self.hash_outputs
+        elif base_type == SIGHASH_SINGLE and index < len(self._outputs):
+            hash_outputs = self._single_output(index)
+        else:
+            hash_outputs = _ZERO_HASH
+
+        return b"".join((
+            self._version, hash_prevouts, hash_sequence,
+            self._outpoints[index], serializer.compact_size(len(script_code)), script_code,
+            _U64.pack(amount), self._sequences[index],
+            hash_outputs, self._locktime, _U32.pack(sighash_type),
+        ))
+
+    def digest(self, index, script_code, amount, sighash_type=SIGHASH_ALL):
+        """
+        BIP143 signature hash for one input: hash256 of `preimage(...)`.
+
+        @return: 32-byte message an ECDSA signature of the input commits to.
+        @rtype : bytes
+        """
+        return serializer.hash256(self.preimage(index, script_code, amount, sighash_type))
+
+class LegacyHasher:
+    """
+    Pre-segwit signature hashes for every input of one transaction.
+
+    The legacy preimage of input i is the whole transaction with every other input's script emptied and input i's
+    script replaced by its scriptCode, so n inputs hash O(n^2) bytes. The serialization is never rebuilt: the
+    blanked inputs and the outputs are serialized once into flat buffers and each preimage is streamed from slices
+    of them. The SHA256 state after version + blanked inputs 0..i-1 is extended one input at a time and copied,
+    so only the bytes from input i onwards are hashed again. One instance is memoized on every
+    helper.txn_model.Transaction (see `Transaction.legacy`).
+    """
+    __slots__ = ("_version", "_locktime", "_outpoints", "_sequences", "_outputs", "_n_inputs",
+                 "_blank", "_offsets", "_outputs_locktime", "_prefix")
+
+    def __init__(self, tx):
+        self._version = _U32.pack(tx.version)
+        self._locktime = _U32.pack(tx.locktime)
+        self._outpoints = [_OUTPOINT.pack(bytes.fromhex(iN.txid)[::-1], iN.vout) for iN in tx.vin]
+        self._sequences = [_U32.pack(iN.sequence) for iN in tx.vin]
+        self._outputs = []
+        for out in tx.vout:
+            script = out.scriptpubkey
+            self._outputs.append(_U64.pack(out.value) + serializer.compact_size(len(script)) + script)
+        self._n_inputs = serializer.compact_size(len(tx.vin))
+
+        # Every input with an empty script, back to back; input i is _blank[_offsets[i]:_offsets[i + 1]].
+        blank = bytearray()
+        self._offsets = [0]
+        for outpoint, sequence in zip(self._outpoints, self._sequences):
+            blank += outpoint + _EMPTY_SCRIPT + sequence
+            self._offsets.append(len(blank))
+        self._blank = memoryview(bytes(blank))
+        self._outputs_locktime = serializer.compact_size(len(self._outputs)) + b"".join(self._outputs) + self._locktime
+        self._prefix = [hashlib.sha256(self._version + self._n_inputs)] # state before input i, grown on demand
+
+    def _prefix_state(self, index):
+        while len(self._prefix) <= index:
+            i = len(self._prefix) - 1
+            state = self._prefix[i].copy()
+            state.update(self._blank[self._offsets[i]:self._offsets[i + 1]])
+            self._prefix.append(state)
+        return self._prefix[index].copy()
+
+    def preimage(self, index, script_code, sighash_type=SIGHASH_ALL):
+        """
+        Legacy preimage for one input (SIGHASH_SINGLE without a matching output has none; see `digest`).
+
+        @param index       : Index of the input being signed.
+        @type  index       : int
+        @param script_code : scriptCode of the input (the spent scriptPubKey, or the redeem script for P2SH).
+        @type  script_code : bytes
+        @param sighash_type: Sighash type byte (ALL, NONE or SINGLE, optionally | ANYONECANPAY).
+        @type  sighash_type: int
+        @return            : The serialized preimage (its hash256 is the signature hash).
+        @rtype             : bytes
+        """
+        base_type = sighash_type & 0x1f
+        script = serializer.compact_size(len(script_code)) + script_code
+        signed = self._outpoints[index] + script + self._sequences[index]
+
+        if sighash_type & SIGHASH_ANYONECANPAY:
+            inputs = [b"\x01", signed]
+        else:
+            inputs = [self._n_inputs]
+            for i, (outpoint, sequence) in enumerate(zip(self._outpoints, self._sequences)):
+                if i == index:
+                    inputs.append(signed)
+                elif base_type in (SIGHASH_NONE, SIGHASH_SINGLE):
+                    inputs.append(outpoint + _EMPTY_SCRIPT + bytes(4)) # others may replace their inputs
+                else:
+                    inputs.append(outpoint + _EMPTY_SCRIPT + sequence)
+
+        if base_type == SIGHASH_NONE:
+            outputs = b"\x00" + self._locktime
+        elif base_type == SIGHASH_SINGLE:
+            outputs = serializer.compact_size(index + 1) + _BLANK_OUTPUT * index + self._outputs[index] + self._locktime
+        else:
+            outputs = self._outputs_locktime
+        return b"".join([self._version] + inputs + [outputs, _U32.pack(sighash_type)])
+
+    def digest(self, index, script_code, sighash_type=SIGHASH_ALL):
+        """
+        Legacy signature hash for one input.
+
+        SIGHASH_ALL (the common case) is streamed from the cached prefix state and buffers; other types build
+        `preimage(...)`.
+
+        @return: 32-byte message an ECDSA signature of the input commits to.
+        @rtype : bytes
+        """
+        if sighash_type & 0x1f == SIGHASH_SINGLE and index >= len(self._outputs):
+            return _ONE_HASH
+        if sighash_type & 0x1f not in (SIGHASH_NONE, SIGHASH_SINGLE) and not sighash_type & SIGHASH_ANYONECANPAY:
+            state = self._prefix_state(index)
+            state.update(self._outpoints[index])
+            state.update(serializer.compact_size(len(script_code)))
+            state.update(script_code)
+            state.update(self._sequences[index])
+            state.update(self._blank[self._offsets[index + 1]:])
+            state.update(self._outputs_locktime)
+            state.update(_U32.pack(sighash_type))
+            return hashlib.sha256(state.digest()).digest()
+        return serializer.hash256(self.preimage(index, script_code, sighash_type))
+
+class TaprootHasher:
+    """
+    BIP341 (taproot) signature hashes for every input of one transaction.
+
+    A taproot signature commits to every spent output, so the single-SHA256 hashes of all outpoints, amounts,
+    scriptPubKeys and sequences and of all outputs (sha_prevouts, sha_amounts, sha_scriptpubkeys, sha_sequences,
+    sha_outputs) are computed once, on first use, and shared by the inputs; the digest of each input then hashes a
+    ~200-byte message. Only key-path spends (ext_flag 0) are hashed. One instance is memoized on every
+    helper.txn_model.Transaction (see `Transaction.taproot`).
+    """
+    __slots__ = ("_version", "_locktime", "_outpoints", "_amounts", "_scriptpubkeys", "_sequences", "_outputs",
+                 "_sha_prevouts", "_sha_amounts", "_sha_scriptpubkeys", "_sha_sequences", "_sha_outputs")
+
+    def __init__(self, tx):
+        self._version = _U32.pack(tx.version)
+        self._locktime = _U32.pack(tx.locktime)
+        self._outpoints = [_OUTPOINT.pack(bytes.fromhex(iN.txid)[::-1], iN.vout) for iN in tx.vin]
+        self._amounts = [_U64.pack(iN.prevout.value) for iN in tx.vin]
+        self._scriptpubkeys = [serializer.compact_size(len(iN.prevout.scriptpubkey)) + iN.prevout.scriptpubkey
+                               for iN in tx.vin]
+        self._sequences = [_U32.pack(iN.sequence) for iN in tx.vin]
+        self._outputs = []
+        for out in tx.vout:
+            script = out.scriptpubkey
+            self._outputs.append(_U64.pack(out.value) + serializer.compact_size(len(script)) + script)
+        self._sha_prevouts = None
+        self._sha_amounts = None
+        self._sha_scriptpubkeys = None
+        self._sha_sequences = None
+        self._sha_outputs = None
+
+    ###################
+    ## SHARED HASHES ##
+    ###################
+    @property
+    def sha_prevouts(self):
+        """sha256 of every input's outpoint."""
+        if self._sha_prevouts is None:
+            self._sha_prevouts = hashlib.sha256(b"".join(self._outpoints)).digest()
+        return self._sha_prevouts
+
+    @property
+    def sha_amounts(self):
+        """sha256 of the value of every spent output."""
+        if self._sha_amounts is None:
+            self._sha_amounts = hashlib.sha256(b"".join(self._amounts)).digest()
+        return self._sha_amounts
+
+    @property
+    def sha_scriptpubkeys(self):
+        """sha256 of the scriptPubKey (with its length) of every spent output."""
+        if self._sha_scriptpubkeys is None:
+            self._sha_scriptpubkeys = hashlib.sha256(b"".join(self._scriptpubkeys)).digest()
+        return self._sha_scriptpubkeys
+
+    @property
+    def sha_sequences(self):
+        """sha256 of every input's nSequence."""
+        if self._sha_sequences is None:
+            self._sha_sequences = hashlib.sha256(b"".join(self._sequences)).digest()
+        return self._sha_sequences
+
+    @property
+    def sha_outputs(self):
+        """sha256 of every serialized output."""
+        if self._sha_outputs is None:
+            self._sha_outputs = hashlib.sha256(b"".join(self._outputs)).digest()
+        return self._sha_outputs
+
+    ############
+    ## DIGEST ##
+    ############
+    def preimage(self, index, sighash_type=SIGHASH_DEFAULT, annex=None):
+        """
+        BIP341 SigMsg of a key-path spend (without the epoch byte).
+
+        @param index       : Index of the input being signed.
+        @type  index       : int
+        @param sighash_type: Sighash type byte (DEFAULT, ALL, NONE or SINGLE, optionally | ANYONECANPAY).
+        @type  sighash_type: int
+        @param annex       : The input's annex (last witness item starting with 0x50), if it has one.
+        @type  annex       : bytes
+        @return            : The signature message.
+        @rtype             : bytes
+        @raise ValueError  : If `sighash_type` is not defined, or SIGHASH_SINGLE has no output at `index`.
+        """
+        if sighash_type not in TAPROOT_SIGHASH_TYPES:
+            raise ValueError(f"invalid taproot sighash type {sighash_type:#04x}")
+        base_type = sighash_type & 0x03
+        anyone_can_pay = sighash_type & SIGHASH_ANYONECANPAY
+        if base_type == SIGHASH_SINGLE and index >= len(self._outputs):
+            raise ValueError("SIGHASH_SINGLE without a matching output")
+
+        parts = [bytes((sighash_type,)), self._version, self._locktime]
+        if not anyone_can_pay:
+            parts += [self.sha_prevouts, self.sha_amounts, self.sha_scriptpubkeys, self.sha_sequences]
+        if base_type not in (SIGHASH_NONE, SIGHASH_SINGLE):
+            parts.append(self.sha_outputs)
+        parts.append(b"\x01" if annex is not None else b"\x00") # spend_type: ext_flag 0, annex bit
+        if anyone_can_pay:
+            parts += [self._outpoints[index], self._amounts[index], self._scriptpubkeys[index], self._sequences[index]]
+        else:
+            parts.append(_U32.pack(index))
+        if annex is not None:
+            parts.append(hashlib.sha256(serializer.compact_size(len(annex)) + annex).digest())
+        if base_type == SIGHASH_SINGLE:
+            parts.append(hashlib.sha256(self._outputs[index]).digest())
+        return b"".join(parts)
+
+    def digest(self, index, sighash_type=SIGHASH_DEFAULT, annex=None):
+        """
+        BIP341 signature hash of a key-path spend: hash_TapSighash(0x00 || `preimage(...)`).
+
+        @return: 32-byte message a BIP340 signature of the input commits to.
+        @rtype : bytes
+        @raise ValueError: See `preimage`.
+        """
+        return tagged_hash(b"TapSighash", b"\x00" + self.preimage(index, sighash_type, annex))
@@ -0,0 +1,220 @@
+import os
+import mmap
+import zlib
+import struct
+import helper.serializer as serializer
+import helper.txn_model as txn_model
+
+###############
+## CONSTANTS ##
+###############
+MAGIC = b"MEMPACK1"
+FLAG_ZLIB = 0x01
+ZLIB_LEVEL = 6
+_HEADER = struct.Struct("<8sIIQ") # magic, flags, record count, index offset
+_ENTRY = struct.Struct("<QII")    # offset, stored size, raw size
+_U8 = struct.Struct("<B")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+
+def encode_record(tx, type_codes):
+    """
+    Serialize one transaction and its prevouts as a snapshot record (uncompressed):
+        u32 size | BIP144 serialization (with witness) | compact-size input count
+        then for every input: u64 prevout value | u8 prevout type | compact-size + prevout scriptpubkey
+
+    @param tx        : The transaction.
+    @type  tx        : helper.txn_model.Transaction
+    @param type_codes: scriptpubkey type -> code; unseen types are added.
+    @type  type_codes: dict
+    @rtype           : bytes
+    """
+    raw = tx.serialized.buffer
+    parts = [_U32.pack(len(raw)), bytes(raw), serializer.compact_size(len(tx.vin))]
+    for iN in tx.vin:
+        prevout = iN.prevout
+        code = type_codes.setdefault(prevout.scriptpubkey_type, len(type_codes))
+        parts.append(_U64.pack(prevout.value) + _U8.pack(code) + serializer.compact_size(len(prevout.scriptpubkey)))
+        parts.append(prevout.scriptpubkey)
+    return b"".join(parts)
+
+def decode_record(txn_id, record, types):
+    """
+    Inverse of `encode_record`.
+
+    @param txn_id: The name of the transaction.
+    @type  txn_id: str
+    @param record: The (uncompressed) record.
+    @type  record: bytes | memoryview
+    @param types : scriptpubkey type of every code.
+    @type  types : list of str
+    @rtype       : helper.txn_model.Transaction
+    @raise ValueError: If the record is malformed.
+    """
+    view = memoryview(record)
+    prevouts = []
+    try:
+        size = _U32.unpack_from(view, 0)[0]
+        raw = view[4:4 + size]
+        n_in, pos = serializer.read_compact_size(view, 4 + size)
+        for _ in range(n_in):
+            value = _U64.unpack_from(view, pos)[0]
+            type_name = types[view[pos + 8]]
+            script_size, pos = serializer.read_compact_size(view, pos + 9)
+            prevouts.append(txn_model.TxOut(value, bytes(view[pos:pos + script_size]), type_name))
+            pos += script_size
+    except (IndexError, struct.error) as e:
+        raise ValueError(f"{txn_id}: truncated record: {e}") from None
+    return txn_model.from_raw(txn_id, raw, prevouts)
+
+def pack(path, mempool_dir=txn_model.MEMPOOL_DIR, compress=False):
+    """
+    Write every `.json` transaction of `mempool_dir` into a snapshot at `path` (in sorted name order).
+
+    Files that do not parse are left out and reported. Layout (little-endian):
+        header : magic "MEMPACK1" | u32 flags | u32 record count | u64 index offset
+        records: `encode_record` of every transaction, each zlib-compressed if FLAG_ZLIB
+        index  : u8 type count, then every scriptpubkey type as u8 length + ASCII;
+                 then for every record: u8 name length + name (ASCII) | u64 offset | u32 stored size | u32 raw size
+
+    @param path       : Snapshot file to write (through a temporary file that is renamed over it).
+    @type  path       : str
+    @param mempool_dir: Directory holding the transaction files.
+    @type  mempool_dir: str
+    @param compress   : zlib-compress every record.
+    @type  compress   : bool
+    @return           : `records`, `skipped` (names of files left out), `raw_bytes` and `stored_bytes`.
+    @rtype            : dict
+    """
+    names = sorted(entry.name[:-5] for entry in os.scandir(mempool_dir) if entry.name.endswith(".json"))
+    type_codes = {}
+    index = []
+    skipped = []
+    raw_bytes = 0
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, 0, 0, 0)) # rewritten once the index offset is known
+        for name in names:
+            try:
+                record = encode_record(txn_model.load(name, mempool_dir), type_codes)
+            except (OSError, KeyError, ValueError, TypeError, struct.error):
+                skipped.append(name)
+                continue
+            stored = zlib.compress(record, ZLIB_LEVEL) if compress else record
+            index.append((name, file.tell(), len(stored), len(record)))
+            file.write(stored)
+            raw_bytes += len(record)
+
+        index_offset = file.tell()
+        types = sorted(type_codes, key=type_codes.get)
+        file.write(_U8.pack(len(types)))
+        for type_name in types:
+            encoded = type_name.encode("ascii")
+            file.write(_U8.pack(len(encoded)) + encoded)
+        for name, offset, stored_size, raw_size in index:
+            encoded = name.encode("ascii")
+            file.write(_U8.pack(len(encoded)) + encoded + _ENTRY.pack(offset, stored_size, raw_size))
+
+        file.seek(0)
+        file.write(_HEADER.pack(MAGIC, FLAG_ZLIB if compress else 0, len(index), index_offset))
+    os.replace(tmp, path)
+    return {"records": len(index), "skipped": skipped, "raw_bytes": raw_bytes, "stored_bytes": index_offset - _HEADER.size}
+
+class Snapshot:
+    """
+    Read-only, mmap-backed view of a snapshot file (see `pack`).
+
+    Records are looked up by transaction name through the index, which is read once on open. Reading the whole
+    mempool is then one open and one sequential pass over one file, instead of an open and a JSON parse per
+    transaction.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(self._mmap, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self._mmap.madvise(mmap.MADV_SEQUENTIAL)
+        self._view = memoryview(self._mmap)
+        try:
+            magic, self.flags, count, index_offset = _HEADER.unpack_from(self._view, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a mempool snapshot")
+            self.types, self._index = self._read_index(index_offset, count)
+        except (IndexError, struct.error, UnicodeDecodeError) as e:
+            self.close()
+            raise ValueError(f"{path}: corrupt index: {e}") from None
+        except ValueError:
+            self.close()
+            raise
+
+    def _read_index(self, pos, count):
+        view = self._view
+        types = []
+        n_types, pos = view[pos], pos + 1
+        for _ in range(n_types):
+            size = view[pos]
+            types.append(bytes(view[pos + 1:pos + 1 + size]).decode("ascii"))
+            pos += 1 + size
+        index = {}
+        for _ in range(count):
+            size = view[pos]
+            name = bytes(view[pos + 1:pos + 1 + size]).decode("ascii")
+            pos += 1 + size
+            index[name] = _ENTRY.unpack_from(view, pos)
+            pos += _ENTRY.size
+        return types, index
+
+    @property
+    def compressed(self):
+        return bool(self.flags & FLAG_ZLIB)
+
+    @property
+    def names(self):
+        """Transaction names in file order."""
+        return list(self._index)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def record(self, name):
+        """
+        Raw record of a transaction: a memoryview into the mapping (no copy), or the inflated bytes if compressed.
+
+        @param name: Transaction name.
+        @type  name: str
+        @rtype     : memoryview | bytes
+        @raise KeyError: If the snapshot has no such transaction.
+        """
+        offset, stored_size, raw_size = self._index[name]
+        stored = self._view[offset:offset + stored_size]
+        if self.flags & FLAG_ZLIB:
+            return zlib.decompress(stored, bufsize=raw_size)
+        return stored
+
+    def load(self, name):
+        """
+        Parse a transaction from its record. An uncompressed record is parsed straight from its slice of the mapping,
+        which becomes the transaction's serialization (see helper.txn_model.from_raw).
+
+        @param name: Transaction name.
+        @type  name: str
+        @rtype     : helper.txn_model.Transaction
+        @raise KeyError  : If the snapshot has no such transaction.
+        @raise ValueError: If its record is malformed.
+        """
+        try:
+            return decode_record(name, self.record(name), self.types)
+        except zlib.error as e:
+            raise ValueError(f"{name}: {e}") from None
+
+    def close(self):
+        """
+        Unmap the file. Transactions parsed from uncompressed records keep views into the mapping, so this only
+        succeeds once they are gone (BufferError otherwise).
+        """
+        self._view.release()
+        self._mmap.close()
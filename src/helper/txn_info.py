@@ -1,6 +1,4 @@
-import os
-import json
-import helper.converter as convert
+import helper.txn_model as txn_model
 
 def create_raw_txn_data_min(txn_file):
     """
@@ -12,39 +10,7 @@ def create_raw_txn_data_min(txn_file):
     @return        : The raw transaction data as a hexadecimal string.
     @rtype         : str
     """
-
-    txn_data = ""
-
-    file_path = os.path.join("mempool", f"{txn_file}.json")
-    if os.path.exists(file_path):
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-            # Version
-            txn_data += f"{convert.to_little_endian(data['version'], 4)}"
-            # No. of inputs:
-            txn_data += f"{str(convert.to_compact_size(len(data['vin'])))}"
-            # Inputs
-            for iN in data["vin"]:
-                txn_data += f"{bytes.fromhex(iN['txid'])[::-1].hex()}"
-                txn_data += f"{convert.to_little_endian(iN['vout'], 4)}"
-                txn_data += f"{convert.to_compact_size(len(iN['scriptsig'])//2)}"
-                txn_data += f"{iN['scriptsig']}"
-                txn_data += f"{convert.to_little_endian(iN['sequence'], 4)}"
-
-            # No. of outputs
-            txn_data += f"{str(convert.to_compact_size(len(data['vout'])))}"
-
-            # Outputs
-            for out in data["vout"]:
-                txn_data += f"{convert.to_little_endian(out['value'], 8)}"
-                txn_data += f"{convert.to_compact_size(len(out['scriptpubkey'])//2)}"
-                txn_data += f"{out['scriptpubkey']}"
-
-            # Locktime
-            txn_data += f"{convert.to_little_endian(data['locktime'], 4)}"
-    else:
-        ValueError(f"ERROR (txn_info.py)::> File {txn_file}.json Does not exist in MEMPOOL")
-    return txn_data
+    return txn_model.get(txn_file).raw_min
 
 def create_raw_txn_data_full(txn_file):
     """
@@ -56,50 +22,7 @@ def create_raw_txn_data_full(txn_file):
     @return        : The raw transaction data in hexadecimal format. Includes MARKER + FLAGS + WITNESS_DATA
     @rtype         : str
     """
-
-    txn_hash = ""
-
-    file_path = os.path.join("mempool", f"{txn_file}.json")
-    if os.path.exists(file_path):
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-            # Version
-            txn_hash += f"{convert.to_little_endian(data['version'], 4)}"
-            # Marker+flags (if any `vin` has empty scriptsig)
-            if any(i.get("scriptsig") == "" for i in data["vin"]):
-                txn_hash += "0001"
-            # No. of inputs:
-            txn_hash += f"{str(convert.to_compact_size(len(data['vin'])))}"
-            # Inputs
-            for iN in data["vin"]:
-                txn_hash += f"{bytes.fromhex(iN['txid'])[::-1].hex()}"
-                txn_hash += f"{convert.to_little_endian(iN['vout'], 4)}"
-                txn_hash += f"{convert.to_compact_size(len(iN['scriptsig'])//2)}"
-                txn_hash += f"{iN['scriptsig']}"
-                txn_hash += f"{convert.to_little_endian(iN['sequence'], 4)}"
-
-            # No. of outputs
-            txn_hash += f"{str(convert.to_compact_size(len(data['vout'])))}"
-
-            # Outputs
-            for out in data["vout"]:
-                txn_hash += f"{convert.to_little_endian(out['value'], 8)}"
-                txn_hash += f"{convert.to_compact_size(len(out['scriptpubkey'])//2)}"
-                txn_hash += f"{out['scriptpubkey']}"
-
-            # witness
-            for i in data["vin"]:
-                if "witness" in i and i["witness"]:
-                    txn_hash += f"{convert.to_compact_size(len(i['witness']))}"
-                    for j in i["witness"]:
-                        txn_hash += f"{convert.to_compact_size(len(j) // 2)}"
-                        txn_hash += f"{j}"
-
-            # Locktime
-            txn_hash += f"{convert.to_little_endian(data['locktime'], 4)}"
-    else:
-        ValueError(f"ERROR (txn_info.py)::> File {txn_file}.json Does not exist in MEMPOOL")
-    return txn_hash
+    return txn_model.get(txn_file).raw_full
 
 def txid(txn_file):
     """
@@ -111,37 +34,7 @@ def txid(txn_file):
     @return        : The transaction ID (Txn_ID) of the transaction.
     @rtype         : str
     """
-    txn_hash = ""
-
-    file_path = os.path.join("mempool", f"{txn_file}.json")
-    if os.path.exists(file_path):
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-            # Version
-            txn_hash += f"{convert.to_little_endian(data['version'], 4)}"
-
-            # No. of inputs:
-            txn_hash += f"{str(convert.to_compact_size(len(data['vin'])))}"
-            # Inputs
-            for iN in data["vin"]:
-                txn_hash += f"{bytes.fromhex(iN['txid'])[::-1].hex()}"
-                txn_hash += f"{convert.to_little_endian(iN['vout'], 4)}"
-                txn_hash += f"{convert.to_compact_size(len(iN['scriptsig'])//2)}"
-                txn_hash += f"{iN['scriptsig']}"
-                txn_hash += f"{convert.to_little_endian(iN['sequence'], 4)}"
-
-            # No. of outputs
-            txn_hash += f"{str(convert.to_compact_size(len(data['vout'])))}"
-
-            # Outputs
-            for out in data["vout"]:
-                txn_hash += f"{convert.to_little_endian(out['value'], 8)}"
-                txn_hash += f"{convert.to_compact_size(len(out['scriptpubkey'])//2)}"
-                txn_hash += f"{out['scriptpubkey']}"
-
-            # Locktime
-            txn_hash += f"{convert.to_little_endian(data['locktime'], 4)}"
-    return convert.to_reverse_bytes_string(convert.to_hash256(txn_hash))
+    return txn_model.summary(txn_file).txid
 
 def wtxid(txn_file):
     """
@@ -153,48 +46,7 @@ def wtxid(txn_file):
     @return        : The WTXID (Witness Transaction ID) of the transaction.
     @rtype         : str
     """
-
-    txn_hash = ""
-
-    file_path = os.path.join("mempool", f"{txn_file}.json")
-    if os.path.exists(file_path):
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-            # Version
-            txn_hash += f"{convert.to_little_endian(data['version'], 4)}"
-            # Marker+flags (if any `vin` has empty scriptsig)
-            if any((i.get("witness") and i.get("witness") != "") for i in data["vin"]):
-                txn_hash += "0001"
-            # No. of inputs:
-            txn_hash += f"{str(convert.to_compact_size(len(data['vin'])))}"
-            # Inputs
-            for iN in data["vin"]:
-                txn_hash += f"{bytes.fromhex(iN['txid'])[::-1].hex()}"
-                txn_hash += f"{convert.to_little_endian(iN['vout'], 4)}"
-                txn_hash += f"{convert.to_compact_size(len(iN['scriptsig'])//2)}"
-                txn_hash += f"{iN['scriptsig']}"
-                txn_hash += f"{convert.to_little_endian(iN['sequence'], 4)}"
-
-            # No. of outputs
-            txn_hash += f"{str(convert.to_compact_size(len(data['vout'])))}"
-
-            # Outputs
-            for out in data["vout"]:
-                txn_hash += f"{convert.to_little_endian(out['value'], 8)}"
-                txn_hash += f"{convert.to_compact_size(len(out['scriptpubkey'])//2)}"
-                txn_hash += f"{out['scriptpubkey']}"
-
-            # witness
-            for i in data["vin"]:
-                if "witness" in i and i["witness"]:
-                    txn_hash += f"{convert.to_compact_size(len(i['witness']))}"
-                    for j in i["witness"]:
-                        txn_hash += f"{convert.to_compact_size(len(j) // 2)}"
-                        txn_hash += f"{j}"
-
-            # Locktime
-            txn_hash += f"{convert.to_little_endian(data['locktime'], 4)}"
-    return convert.to_reverse_bytes_string(convert.to_hash256(txn_hash))
+    return txn_model.summary(txn_file).wtxid
 
 def coinbase_txn_id(txn_dict):
     """
@@ -206,31 +58,13 @@ def coinbase_txn_id(txn_dict):
     @return        : The transaction ID as a hexadecimal string.
     @rtype         : str
     """
-    txn_hash = ""
     data = txn_dict
-    # Version
-    txn_hash += f"{convert.to_little_endian(data['version'], 4)}"
-
-    # No. of inputs:
-    txn_hash += f"{str(convert.to_compact_size(len(data['vin'])))}"
-    # Inputs
-    for iN in data["vin"]:
-        txn_hash += f"{bytes.fromhex(iN['txid'])[::-1].hex()}"
-        txn_hash += f"{convert.to_little_endian(iN['vout'], 4)}"
-        txn_hash += f"{convert.to_compact_size(len(iN['scriptsig'])//2)}"
-        txn_hash += f"{iN['scriptsig']}"
-        txn_hash += f"{convert.to_little_endian(iN['sequence'], 4)}"
-
-    # No. of outputs
-    txn_hash += f"{str(convert.to_compact_size(len(data['vout'])))}"
-
-    # Outputs
-    for out in data["vout"]:
-        txn_hash += f"{convert.to_little_endian(out['value'], 8)}"
-        txn_hash += f"{convert.to_compact_size(len(out['scriptpubkey'])//2)}"
-        txn_hash += f"{out['scriptpubkey']}"
-
-    # Locktime
-    txn_hash += f"{convert.to_little_endian(data['locktime'], 4)}"
-    # print(f"coinbase_txn_hash(dict)  ::> {txn_hash}")
-    return convert.to_reverse_bytes_string(convert.to_hash256(txn_hash))
\ No newline at end of file
+    coinbase = txn_model.Transaction(
+        None,
+        data["version"],
+        data["locktime"],
+        [txn_model.TxIn(iN["txid"], iN["vout"], None, bytes.fromhex(iN["scriptsig"]), [], iN["sequence"]) for iN in data["vin"]],
+        [txn_model.TxOut(out["value"], bytes.fromhex(out["scriptpubkey"])) for out in data["vout"]],
+    )
+    # Witness of the coinbase doesn't take part in its txid.
+    return coinbase.txid
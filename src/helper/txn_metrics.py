@@ -1,6 +1,4 @@
-import os
-import json
-import helper.txn_info as txinfo
+import helper.txn_model as txn_model
 
 
 ################
@@ -18,11 +16,7 @@ def txn_weight(txn_filename):
                               - Index 2: The transaction's virtual weight.
     @rtype              : list [int, int, float]
     """
-    tx_bytes = len(txinfo.create_raw_txn_data_full(txn_filename))//2
-    tx_weight = 4*(len(txinfo.create_raw_txn_data_min(txn_filename))//2) + (tx_bytes - len(txinfo.create_raw_txn_data_min(txn_filename))//2)
-    tx_virtual_weight = tx_weight/4
-
-    return [tx_bytes, tx_weight, tx_virtual_weight]
+    return list(txn_model.summary(txn_filename).weight)
 
 ##########
 ## FEES ##
@@ -36,13 +30,4 @@ def fees(txn_filename):
     @return             : The transaction's fees, calculated as the sum of input amounts minus the sum of output amounts.
     @rtype              : int
     """
-    file_path = os.path.join('mempool', f'{txn_filename}.json') # file path
-    if os.path.exists(file_path):
-        # Read the JSON data from the file
-        with open(file_path, 'r') as file:
-            txn_data = json.load(file)
-
-    amt_vin = sum([vin["prevout"]["value"] for vin in txn_data["vin"]])
-    amt_vout = sum([vout["value"] for vout in txn_data["vout"]])
-
-    return amt_vin - amt_vout
\ No newline at end of file
+    return txn_model.summary(txn_filename).fee
\ No newline at end of file
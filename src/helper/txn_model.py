@@ -0,0 +1,502 @@
+import os
+import json
+from collections import OrderedDict
+import helper.script as script
+import helper.serializer as serializer
+import helper.sighash as sighash
+import helper.instrument as instrument
+try:
+    import orjson
+except ImportError: # optional dependency: stdlib json is used instead
+    orjson = None
+
+###############
+## CONSTANTS ##
+###############
+MEMPOOL_DIR = "mempool"
+REGISTRY_SIZE = 16384 # smallest registry capacity; reserve() grows it to the size of the mempool
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+def loads(raw):
+    """
+    Decode a mempool file's content with orjson if installed, else stdlib json.
+
+    @param raw: File content.
+    @type  raw: bytes
+    @return   : The decoded JSON object.
+    @rtype    : dict
+    @raise ValueError: If `raw` is not valid JSON.
+    """
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+class TxOut:
+    """
+    A transaction output (or the `prevout` an input is spending).
+
+    Only the script bytes are kept; the ASM is disassembled on access.
+    """
+    __slots__ = ("value", "scriptpubkey", "scriptpubkey_type")
+
+    def __init__(self, value, scriptpubkey, scriptpubkey_type=""):
+        self.value = value
+        self.scriptpubkey = scriptpubkey
+        self.scriptpubkey_type = scriptpubkey_type
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a TxOut from its mempool JSON representation.
+
+        @param data: The `vout` entry (or `prevout` object) of a mempool transaction.
+        @type  data: dict
+        @return    : The parsed output.
+        @rtype     : TxOut
+        """
+        return cls(data["value"], bytes.fromhex(data["scriptpubkey"]), data.get("scriptpubkey_type", ""))
+
+    @property
+    def scriptpubkey_asm(self):
+        """ASM of the scriptpubkey (see helper.script.disassemble)."""
+        return script.disassemble(self.scriptpubkey)
+
+class TxIn:
+    """
+    A transaction input together with the output it spends.
+
+    Scripts and witness items are kept as bytes; the ASM views of the mempool JSON are disassembled on access.
+    """
+    __slots__ = ("txid", "vout", "prevout", "scriptsig", "witness", "sequence")
+
+    def __init__(self, txid, vout, prevout, scriptsig, witness, sequence):
+        self.txid = txid
+        self.vout = vout
+        self.prevout = prevout
+        self.scriptsig = scriptsig
+        self.witness = witness
+        self.sequence = sequence
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a TxIn from its mempool JSON representation.
+
+        @param data: The `vin` entry of a mempool transaction.
+        @type  data: dict
+        @return    : The parsed input.
+        @rtype     : TxIn
+        """
+        return cls(
+            data["txid"],
+            data["vout"],
+            TxOut.from_dict(data["prevout"]),
+            bytes.fromhex(data["scriptsig"]),
+            [bytes.fromhex(item) for item in data.get("witness") or ()],
+            data["sequence"],
+        )
+
+    @property
+    def scriptsig_asm(self):
+        """ASM of the scriptsig."""
+        return script.disassemble(self.scriptsig)
+
+    @property
+    def redeem_script(self):
+        """Redeem script of a P2SH input (last push of the scriptsig), or None."""
+        if self.prevout.scriptpubkey_type != "p2sh":
+            return None
+        return script.last_push(self.scriptsig)
+
+    @property
+    def witness_script(self):
+        """Witness script of a P2WSH or P2SH-P2WSH input (last witness item), or None."""
+        if not self.witness:
+            return None
+        if self.prevout.scriptpubkey_type == "v0_p2wsh":
+            return self.witness[-1]
+        redeem_script = self.redeem_script
+        if redeem_script is not None and len(redeem_script) == 34 and redeem_script.startswith(b"\x00\x20"):
+            return self.witness[-1]
+        return None
+
+    @property
+    def inner_redeemscript_asm(self):
+        """ASM of the P2SH redeem script, or None."""
+        redeem_script = self.redeem_script
+        return None if redeem_script is None else script.disassemble(redeem_script)
+
+    @property
+    def inner_witnessscript_asm(self):
+        """ASM of the P2WSH witness script, or None."""
+        witness_script = self.witness_script
+        return None if witness_script is None else script.disassemble(witness_script)
+
+class Transaction:
+    """
+    A parsed mempool transaction.
+
+    Derived values (serializations, txid, wtxid, weight, fee and sighash state) are computed on first access and memoized on the object,
+    so every module working on the same registry entry shares them.
+    """
+    __slots__ = ("txn_id", "version", "locktime", "vin", "vout",
+                 "_serialized", "_txid_hash", "_wtxid_hash", "_txid", "_wtxid", "_weight", "_fee",
+                 "_bip143", "_legacy", "_taproot")
+
+    def __init__(self, txn_id, version, locktime, vin, vout):
+        self.txn_id = txn_id
+        self.version = version
+        self.locktime = locktime
+        self.vin = vin
+        self.vout = vout
+        self._serialized = None
+        self._txid_hash = None
+        self._wtxid_hash = None
+        self._txid = None
+        self._wtxid = None
+        self._weight = None
+        self._fee = None
+        self._bip143 = None
+        self._legacy = None
+        self._taproot = None
+
+    @classmethod
+    def from_dict(cls, txn_id, data):
+        """
+        Build a Transaction from the JSON object stored in `mempool/<txn_id>.json`.
+
+        Only the fields validation and block building read are kept (a projection): hex scripts and witness items
+        become bytes, and `scriptpubkey_address`, `is_coinbase` and every `*_asm` string are dropped.
+
+        @param txn_id: The name of the transaction file (without extension).
+        @type  txn_id: str
+        @param data  : The decoded JSON object.
+        @type  data  : dict
+        @return      : The parsed transaction.
+        @rtype       : Transaction
+        """
+        return cls(
+            txn_id,
+            data["version"],
+            data["locktime"],
+            [TxIn.from_dict(i) for i in data["vin"]],
+            [TxOut.from_dict(o) for o in data["vout"]],
+        )
+
+    ###################
+    ## SERIALIZATION ##
+    ###################
+    @property
+    def has_witness(self):
+        """True if any input carries witness data."""
+        return any(iN.witness for iN in self.vin)
+
+    @property
+    def serialized(self):
+        """The binary serialization (see helper.serializer.SerializedTxn)."""
+        if self._serialized is None:
+            with instrument.timer("serialize"):
+                self._serialized = serializer.serialize(self)
+        return self._serialized
+
+    @property
+    def raw_min(self):
+        """Serialization without marker, flag and witness data (hex)."""
+        return self.serialized.base_bytes().hex()
+
+    @property
+    def raw_full(self):
+        """Serialization including marker, flag and witness data (hex)."""
+        return self.serialized.buffer.hex()
+
+    #############
+    ## METRICS ##
+    #############
+    @property
+    def txid_hash(self):
+        """hash256 of the non-witness serialization, internal byte order (bytes)."""
+        if self._txid_hash is None:
+            serialized = self.serialized
+            with instrument.timer("hash"):
+                self._txid_hash = serialized.txid_hash()
+        return self._txid_hash
+
+    @property
+    def wtxid_hash(self):
+        """hash256 of the witness serialization, internal byte order (bytes)."""
+        if self._wtxid_hash is None:
+            serialized = self.serialized
+            with instrument.timer("hash"):
+                self._wtxid_hash = serialized.wtxid_hash()
+        return self._wtxid_hash
+
+    @property
+    def txid(self):
+        """Transaction ID in RPC byte order (hex)."""
+        if self._txid is None:
+            self._txid = self.txid_hash[::-1].hex()
+        return self._txid
+
+    @property
+    def wtxid(self):
+        """Witness transaction ID in RPC byte order (hex)."""
+        if self._wtxid is None:
+            self._wtxid = self.wtxid_hash[::-1].hex()
+        return self._wtxid
+
+    @property
+    def weight(self):
+        """Tuple of (size in bytes, weight, virtual size)."""
+        if self._weight is None:
+            ser = self.serialized
+            self._weight = (ser.total_size, ser.weight, ser.weight/4)
+        return self._weight
+
+    @property
+    def fee(self):
+        """Sum of input amounts minus sum of output amounts (sats)."""
+        if self._fee is None:
+            self._fee = sum(iN.prevout.value for iN in self.vin) - sum(out.value for out in self.vout)
+        return self._fee
+
+    #############
+    ## SIGHASH ##
+    #############
+    @property
+    def bip143(self):
+        """Segwit v0 signature hasher shared by all inputs (see helper.sighash.Bip143Hasher)."""
+        if self._bip143 is None:
+            self._bip143 = sighash.Bip143Hasher(self)
+        return self._bip143
+
+    @property
+    def legacy(self):
+        """Pre-segwit signature hasher shared by all inputs (see helper.sighash.LegacyHasher)."""
+        if self._legacy is None:
+            self._legacy = sighash.LegacyHasher(self)
+        return self._legacy
+
+    @property
+    def taproot(self):
+        """Taproot (BIP341) signature hasher shared by all inputs (see helper.sighash.TaprootHasher)."""
+        if self._taproot is None:
+            self._taproot = sighash.TaprootHasher(self)
+        return self._taproot
+
+    def prime(self, txid, wtxid, weight, fee):
+        """
+        Fill the memoized metrics with values known from elsewhere (e.g. a validation cache), so they are not
+        recomputed from the serialization.
+
+        @param txid  : Transaction ID (hex, RPC byte order).
+        @type  txid  : str
+        @param wtxid : Witness transaction ID (hex, RPC byte order).
+        @type  wtxid : str
+        @param weight: (size in bytes, weight, virtual size)
+        @type  weight: tuple
+        @param fee   : Fee in sats.
+        @type  fee   : int
+        """
+        self._txid = txid
+        self._wtxid = wtxid
+        self._weight = tuple(weight)
+        self._fee = fee
+
+class Summary:
+    """
+    What the dependency graph, the block template and the block need of a transaction validated elsewhere (see
+    `prime`): its metrics and the outpoints it spends, without parsing it again.
+    """
+    __slots__ = ("txn_id", "txid", "wtxid", "weight", "fee", "vin")
+
+    def __init__(self, txn_id, txid, wtxid, weight, fee, spends):
+        """
+        @param txn_id: The name of the transaction file (without extension).
+        @type  txn_id: str
+        @param txid  : Transaction ID (hex, RPC byte order).
+        @type  txid  : str
+        @param wtxid : Witness transaction ID (hex, RPC byte order).
+        @type  wtxid : str
+        @param weight: (size in bytes, weight, virtual size)
+        @type  weight: tuple
+        @param fee   : Fee in sats.
+        @type  fee   : int
+        @param spends: (txid, vout) of every input; they become `vin` entries without scripts or prevouts.
+        @type  spends: list
+        """
+        self.txn_id = txn_id
+        self.txid = txid
+        self.wtxid = wtxid
+        self.weight = tuple(weight)
+        self.fee = fee
+        self.vin = [TxIn(txid, vout, None, None, None, None) for txid, vout in spends]
+
+def from_raw(txn_id, raw, prevouts):
+    """
+    Build a Transaction from its BIP144 serialization and the outputs its inputs spend (see helper.snapshot).
+
+    The serialization is not rebuilt: `raw` becomes the transaction's SerializedTxn as is.
+
+    @param txn_id  : The name of the transaction (file name without extension).
+    @type  txn_id  : str
+    @param raw     : The serialization with witness data.
+    @type  raw     : bytes | memoryview
+    @param prevouts: The spent output of every input, in input order.
+    @type  prevouts: list of TxOut
+    @return        : The parsed transaction.
+    @rtype         : Transaction
+    @raise ValueError: If `raw` is malformed or `prevouts` does not match its inputs.
+    """
+    version, inputs, outputs, locktime, serialized = serializer.deserialize(raw)
+    if len(prevouts) != len(inputs):
+        raise ValueError(f"{txn_id}: {len(inputs)} inputs but {len(prevouts)} prevouts")
+    tx = Transaction(
+        txn_id,
+        version,
+        locktime,
+        [TxIn(txid, vout, prevout, scriptsig, witness, sequence)
+         for (txid, vout, scriptsig, sequence, witness), prevout in zip(inputs, prevouts)],
+        [TxOut(value, scriptpubkey) for value, scriptpubkey in outputs],
+    )
+    tx._serialized = serialized
+    return tx
+
+##############
+## REGISTRY ##
+##############
+_registry = OrderedDict()
+_primed = {} # txn_id -> Transaction.prime() arguments, kept until forget() so a re-parse is primed too
+_capacity = REGISTRY_SIZE
+_snapshot = None # helper.snapshot.Snapshot read instead of MEMPOOL_DIR, see use_snapshot()
+
+def use_snapshot(snapshot):
+    """
+    Read transactions from a packed snapshot instead of the mempool directory (None: back to the directory).
+    Empties the registry.
+
+    @param snapshot: An open snapshot.
+    @type  snapshot: helper.snapshot.Snapshot
+    """
+    global _snapshot
+    _snapshot = snapshot
+    clear()
+
+def active_snapshot():
+    """
+    @return: The snapshot set by use_snapshot(), or None when reading the mempool directory.
+    @rtype : helper.snapshot.Snapshot
+    """
+    return _snapshot
+
+def exists(txn_id):
+    """
+    True if `txn_id` is in the snapshot in use, or has a file in the mempool directory.
+
+    @param txn_id: The name of the transaction file (without extension).
+    @type  txn_id: str
+    @rtype       : bool
+    """
+    if _snapshot is not None:
+        return txn_id in _snapshot
+    return os.path.exists(os.path.join(MEMPOOL_DIR, f"{txn_id}.json"))
+
+def load(txn_id, mempool_dir=MEMPOOL_DIR):
+    """
+    Parse `<mempool_dir>/<txn_id>.json` (or its record in the snapshot in use) into a Transaction, bypassing the
+    registry.
+
+    @param txn_id     : The name of the transaction file (without extension).
+    @type  txn_id     : str
+    @param mempool_dir: Directory holding the transaction files.
+    @type  mempool_dir: str
+    @return           : The parsed transaction.
+    @rtype            : Transaction
+    """
+    instrument.count("txns.parsed")
+    with instrument.timer("parse"):
+        if _snapshot is not None:
+            return _snapshot.load(txn_id)
+        file_path = os.path.join(mempool_dir, f"{txn_id}.json")
+        with open(file_path, "rb") as f:
+            return Transaction.from_dict(txn_id, loads(f.read()))
+
+def get(txn_id):
+    """
+    Return the shared Transaction for `txn_id`, parsing the file only on first use.
+
+    The registry is a bounded LRU; once it holds more than its capacity (REGISTRY_SIZE, or what reserve() asked for)
+    the least recently used entry is dropped.
+
+    @param txn_id: The name of the transaction file (without extension).
+    @type  txn_id: str
+    @return      : The parsed transaction.
+    @rtype       : Transaction
+    """
+    tx = _registry.get(txn_id)
+    if tx is not None:
+        _registry.move_to_end(txn_id)
+        return tx
+    tx = load(txn_id)
+    values = _primed.get(txn_id)
+    if values is not None:
+        tx.prime(*values[:4])
+    _registry[txn_id] = tx
+    if len(_registry) > _capacity:
+        _registry.popitem(last=False)
+    return tx
+
+def reserve(count):
+    """
+    Let the registry hold at least `count` transactions, so a pass over a mempool of that size parses every file
+    once. The capacity never shrinks back.
+
+    @param count: Number of transactions to keep parsed.
+    @type  count: int
+    """
+    global _capacity
+    _capacity = max(_capacity, count)
+
+def summary(txn_id):
+    """
+    Metrics and spent outpoints of `txn_id`: the registered Transaction if it is parsed, else a Summary of what
+    was primed, else the Transaction parsed now.
+
+    @param txn_id: The name of the transaction file (without extension).
+    @type  txn_id: str
+    @return      : An object with `txid`, `wtxid`, `weight`, `fee` and `vin` (each with `txid` and `vout`).
+    @rtype       : Transaction | Summary
+    """
+    tx = _registry.get(txn_id)
+    if tx is not None:
+        return tx
+    values = _primed.get(txn_id)
+    if values is not None and values[4] is not None:
+        return Summary(txn_id, *values)
+    return get(txn_id)
+
+def prime(txn_id, txid, wtxid, weight, fee, spends=None):
+    """
+    Known metrics of `txn_id` (see Transaction.prime), applied now if it is registered and whenever it is loaded
+    until forget(). With `spends` ((txid, vout) of every input), `summary` needs no parse either.
+    """
+    _primed[txn_id] = (txid, wtxid, weight, fee, spends)
+    tx = _registry.get(txn_id)
+    if tx is not None:
+        tx.prime(txid, wtxid, weight, fee)
+
+def forget(txn_id):
+    """
+    Drop `txn_id` from the registry (e.g. after its file changed on disk).
+
+    @param txn_id: The name of the transaction file (without extension).
+    @type  txn_id: str
+    """
+    _registry.pop(txn_id, None)
+    _primed.pop(txn_id, None)
+
+def clear():
+    """
+    Empty the registry.
+    """
+    _registry.clear()
+    _primed.clear()
@@ -0,0 +1,177 @@
+import os
+import json
+import hashlib
+import helper.txn_model as txn_model
+
+###############
+## CONSTANTS ##
+###############
+CACHE_FORMAT = 1
+
+def file_digest(path):
+    """
+    SHA256 of a file's content (hex).
+
+    @param path: File to hash.
+    @type  path: str
+    @rtype     : str
+    """
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+def encode_verdict(verdict):
+    """
+    Convert a validation result to its JSON form.
+
+    @param verdict: validate_txn.validate() result.
+    @type  verdict: None | bool | tuple
+    @return       : The result, with a tuple as a list.
+    @rtype        : None | bool | list
+    """
+    return list(verdict) if isinstance(verdict, tuple) else verdict
+
+def decode_verdict(value):
+    """
+    Inverse of `encode_verdict`.
+
+    @param value: Cached JSON form of a validation result.
+    @type  value: None | bool | list
+    @return     : The validate_txn.validate() result, with a list as a tuple.
+    @rtype      : None | bool | tuple
+    """
+    return tuple(value) if isinstance(value, list) else value
+
+class ValidationCache:
+    """
+    On-disk cache of the validation results of mempool files, keyed by file name.
+
+    An entry is a dict with `mtime_ns`, `size`, `sha256`, `verdict` and, when the file parsed, `txid`, `wtxid`,
+    `weight` ([size, weight, vsize]), `fee` and `spends` ([txid, vout] of every input).
+    """
+
+    def __init__(self, path, validator_version, mempool_dir=txn_model.MEMPOOL_DIR):
+        """
+        @param path             : Cache file; loaded if it exists.
+        @type  path             : str
+        @param validator_version: Version of the validation rules; a cache written by another version is dropped.
+        @type  validator_version: int
+        @param mempool_dir      : Directory holding the transaction files.
+        @type  mempool_dir      : str
+        """
+        self.path = path
+        self.validator_version = validator_version
+        self.mempool_dir = mempool_dir
+        self.entries = {}
+        self.stat_hits = 0
+        self.hash_hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError): # unreadable or truncated: start over
+            return
+        if data.get("format") == CACHE_FORMAT and data.get("validator_version") == self.validator_version:
+            self.entries = data.get("entries", {})
+
+    def _path(self, txn_id):
+        return os.path.join(self.mempool_dir, f"{txn_id}.json")
+
+    def fingerprint(self, txn_id):
+        """
+        Current fingerprint of a mempool file.
+
+        @param txn_id: The name of the transaction file (without extension).
+        @type  txn_id: str
+        @return      : `mtime_ns`, `size` and `sha256` of the file, or None if it is gone.
+        @rtype       : dict
+        """
+        path = self._path(txn_id)
+        try:
+            st = os.stat(path)
+            return {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": file_digest(path)}
+        except OSError:
+            return None
+
+    def lookup(self, txn_id):
+        """
+        Cached entry of a file if its content did not change since it was stored: an unchanged (mtime_ns, size) is
+        trusted as is, a changed stat falls back to hashing the file, and only a changed SHA256 is a miss.
+
+        @param txn_id: The name of the transaction file (without extension).
+        @type  txn_id: str
+        @return      : The entry, or None on a miss.
+        @rtype       : dict
+        """
+        entry = self.entries.get(txn_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        path = self._path(txn_id)
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.misses += 1
+            return None
+        if st.st_mtime_ns == entry["mtime_ns"] and st.st_size == entry["size"]:
+            self.stat_hits += 1
+            return entry
+        if st.st_size == entry["size"] and file_digest(path) == entry["sha256"]:
+            entry["mtime_ns"] = st.st_mtime_ns # touched but unchanged
+            self.hash_hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, txn_id, fingerprint, verdict, metrics=None):
+        """
+        Record a validation result.
+
+        @param txn_id     : The name of the transaction file (without extension).
+        @type  txn_id     : str
+        @param fingerprint: `fingerprint(txn_id)` taken before validating.
+        @type  fingerprint: dict
+        @param verdict    : validate_txn.validate() result.
+        @type  verdict    : None | bool | tuple
+        @param metrics    : `txid`, `wtxid`, `weight`, `fee` and `spends`, if the file parsed.
+        @type  metrics    : dict
+        """
+        if fingerprint is None:
+            return
+        entry = dict(fingerprint, verdict=encode_verdict(verdict))
+        if metrics is not None:
+            entry.update(txid=metrics["txid"], wtxid=metrics["wtxid"], weight=list(metrics["weight"]), fee=metrics["fee"],
+                         spends=[list(outpoint) for outpoint in metrics["spends"]])
+        self.entries[txn_id] = entry
+
+    def prune(self, txn_ids):
+        """
+        Drop entries of files that are no longer in the mempool.
+
+        @param txn_ids: Files still present.
+        @type  txn_ids: iterable of str
+        """
+        keep = set(txn_ids)
+        self.entries = {k: v for k, v in self.entries.items() if k in keep}
+
+    def save(self):
+        """
+        Write the cache (to a temporary file that is then renamed over `path`).
+        """
+        data = {"format": CACHE_FORMAT, "validator_version": self.validator_version, "entries": self.entries}
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as file:
+            json.dump(data, file, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def stats(self):
+        """
+        @return: `entries`, `stat_hits`, `hash_hits` and `misses`.
+        @rtype : dict
+        """
+        return {"entries": len(self.entries), "stat_hits": self.stat_hits, "hash_hits": self.hash_hits,
+                "misses": self.misses}
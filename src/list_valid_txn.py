@@ -1,40 +1,266 @@
 import os
+import multiprocessing
 import validate_txn
+import helper.sigcache as sigcache
+import helper.instrument as instrument
+import helper.txn_model as txn_model
+import helper.validation_cache as validation_cache
 
-def read_transactions():
+###############
+## CONSTANTS ##
+###############
+VALIDATION_WORKERS = os.cpu_count() or 1
+CHUNKS_PER_WORKER = 8 # smaller chunks balance load, bigger ones cut IPC overhead
+
+def read_transactions(mempool_dir=txn_model.MEMPOOL_DIR):
     """
     Reads transaction IDs from files in the mempool directory.
 
-    @return : List of transaction IDs. Each transaction ID corresponds to a file name in the mempool directory.
-    @rtype  : list
+    Only the directory is listed (os.scandir); the files themselves are not opened. While a snapshot is in use
+    (helper.txn_model.use_snapshot), its index is listed instead.
+
+    @param mempool_dir: Directory holding the transaction files.
+    @type  mempool_dir: str
+    @return           : List of transaction IDs, sorted so that every run sees the mempool in the same order. Each transaction ID corresponds to a file name in the mempool directory.
+                        Empty if the directory cannot be read.
+    @rtype            : list
     """
-    txn_ids = []
-    mempool_dir = "mempool"
+    snapshot = txn_model.active_snapshot()
+    if snapshot is not None:
+        return sorted(snapshot.names)
     try:
-        for filename in os.listdir(mempool_dir):
-            with open(os.path.join(mempool_dir, filename), "r") as file:
-                # locktime ka locha #
-                txn_ids.append(filename[:-5])
-        return txn_ids
-    except Exception as e:
+        with instrument.timer("scan"), os.scandir(mempool_dir) as entries:
+            return sorted(entry.name[:-5] for entry in entries if entry.name.endswith(".json") and entry.is_file())
+    except OSError as e:
         print("Error:", e)
-        return None
+        return []
 
-def list_valid_txn():
+def _check(txn_id):
     """
-    Lists valid transactions from the mempool.
+    validate_txn.validate() plus the metrics worth caching.
+
+    @param txn_id: Transaction ID to validate.
+    @type  txn_id: str
+    @return      : (verdict, metrics, deferred) where metrics has `txid`, `wtxid`, `weight`, `fee` and `spends`
+                   ((txid, vout) of every input), or is None if the file does not parse, and deferred holds the
+                   Schnorr signatures the verdict still depends on (see helper.sigcache.defer_schnorr; empty unless
+                   deferring).
+    @rtype       : tuple
+    """
+    try:
+        with instrument.timer("validate.txn"):
+            verdict = validate_txn.validate(txn_id)
+    except (ValueError, TypeError, OSError): # not (yet) valid JSON, a garbled field, or a file gone meanwhile
+        instrument.count("txns.unparsable")
+        sigcache.take_deferred()
+        return False, None, []
+    deferred = sigcache.take_deferred()
+    if not verdict or not verdict[0]:
+        deferred = [] # invalid anyway
+    try:
+        tx = txn_model.get(txn_id)
+        metrics = {"txid": tx.txid, "wtxid": tx.wtxid, "weight": tx.weight, "fee": tx.fee,
+                   "spends": [(iN.txid, iN.vout) for iN in tx.vin]}
+    except (OSError, KeyError, ValueError, TypeError):
+        metrics = None
+    return verdict, metrics, deferred
+
+def _validate_serial(txn_ids):
+    """
+    Validate transactions one after another in this process.
+
+    @param txn_ids: Transaction IDs to validate.
+    @type  txn_ids: list
+    @return       : `_check()` result for every ID, in input order.
+    @rtype        : list
+    """
+    return [_check(txn_id) for txn_id in txn_ids]
+
+def _worker_init(instrumented=False, batch_schnorr=False, verify_backend=None):
+    # Forked workers inherit the parent's cache and metrics; start their deltas from zero.
+    if verify_backend is not None and verify_backend != sigcache.backend_name():
+        sigcache.use_backend(verify_backend) # not forked from the parent (spawn start method)
+    sigcache.SIGNATURE_CACHE.take_delta()
+    sigcache.defer_schnorr(batch_schnorr)
+    instrument.enable(instrumented)
+    instrument.take_delta()
+
+def _validate_tracked(txn_id):
+    # Ship the signatures this worker verified (and its hit/miss counts) and its metrics back with the result.
+    return _check(txn_id), sigcache.SIGNATURE_CACHE.take_delta(), instrument.take_delta()
+
+def _validate_parallel(txn_ids, workers, chunksize=None, batch_schnorr=False):
+    """
+    Validate transactions on a process pool.
+
+    IDs are handed out in chunks; `Pool.imap` yields the results in input order whatever order the workers finish in,
+    so the outcome is identical to `_validate_serial`. Signatures verified by the workers are merged into this
+    process's signature cache.
+
+    @param txn_ids      : Transaction IDs to validate.
+    @type  txn_ids      : list
+    @param workers      : Number of worker processes.
+    @type  workers      : int
+    @param chunksize    : IDs per task (default: spread over CHUNKS_PER_WORKER chunks per worker).
+    @type  chunksize    : int
+    @param batch_schnorr: Have the workers defer Schnorr signatures to the caller (see `_settle_deferred`).
+    @type  batch_schnorr: bool
+    @return             : `_check()` result for every ID, in input order.
+    @rtype              : list
+    """
+    if chunksize is None:
+        chunksize = max(1, len(txn_ids) // (workers * CHUNKS_PER_WORKER))
+    results = []
+    with multiprocessing.Pool(processes=workers, initializer=_worker_init,
+                              initargs=(instrument.enabled(), batch_schnorr, sigcache.backend_name())) as pool:
+        for result, delta, metrics in pool.imap(_validate_tracked, txn_ids, chunksize=chunksize):
+            sigcache.SIGNATURE_CACHE.merge(delta)
+            instrument.merge(metrics)
+            results.append(result)
+    return results
 
-    @return : List of valid transaction files. Transactions are sorted with SEGWIT transactions at the beginning and NON-SEGWIT transactions at the end.
-    @rtype  : list
+def _settle_deferred(results, txn_ids):
+    """
+    Verify the Schnorr signatures deferred by `_check` in one batch.
+
+    @param results: `_check()` result per ID.
+    @type  results: list
+    @param txn_ids: The IDs, in the order of `results`.
+    @type  txn_ids: list
+    @return       : IDs whose verdict was provisional and has a signature that failed.
+    @rtype        : set
+    """
+    pending = {txn_id: deferred for txn_id, (_, _, deferred) in zip(txn_ids, results) if deferred}
+    if not pending:
+        return set()
+    with instrument.timer("validate.schnorr_batch"):
+        if sigcache.verify_schnorr_batch(item for deferred in pending.values() for item in deferred):
+            return set()
+        # Narrow the failure down: every transaction's signatures as a batch of their own.
+        return {txn_id for txn_id, deferred in pending.items() if not sigcache.verify_schnorr_batch(deferred)}
+
+def validate_files(txn_ids, workers=None, chunksize=None, result_cache=None, batch_schnorr=False):
+    """
+    Validate mempool files, skipping those whose result is cached.
+
+    @param txn_ids      : Transaction IDs to validate.
+    @type  txn_ids      : list
+    @param workers      : Number of validation processes (default: VALIDATION_WORKERS). 1 (or less) validates serially in this process.
+    @type  workers      : int
+    @param chunksize    : IDs handed to a worker per task (default: derived from the number of IDs and `workers`).
+    @type  chunksize    : int
+    @param result_cache : Validation results of earlier runs; only files it misses are validated, and it gets their results
+                          (not saved here).
+    @type  result_cache : helper.validation_cache.ValidationCache
+    @param batch_schnorr: Verify the taproot key-path signatures of all files together after their scripts ran, instead
+                          of one at a time (see helper.sigcache.verify_schnorr_batch). Ignored unless the verification
+                          backend batches (helper.sigcache.backend_batches).
+    @type  batch_schnorr: bool
+    @return             : validate_txn.validate() result per ID.
+    @rtype              : dict
+    """
+    if workers is None:
+        workers = VALIDATION_WORKERS
+    batch_schnorr = batch_schnorr and sigcache.backend_batches()
+
+    ##################
+    # Cached results #
+    ##################
+    verdicts = {}
+    unchecked_txn_ids = []
+    for txn_id in txn_ids:
+        entry = result_cache.lookup(txn_id) if result_cache is not None else None
+        if entry is None:
+            unchecked_txn_ids.append(txn_id)
+            continue
+        verdicts[txn_id] = validation_cache.decode_verdict(entry["verdict"])
+        if "txid" in entry:
+            # Later stages get txid, weight and fee without serializing the transaction again.
+            txn_model.prime(txn_id, entry["txid"], entry["wtxid"], entry["weight"], entry["fee"], entry.get("spends"))
+
+    ##############
+    # Validation #
+    ##############
+    if result_cache is not None:
+        fingerprints = {txn_id: result_cache.fingerprint(txn_id) for txn_id in unchecked_txn_ids}
+    instrument.count("txns.cached", len(txn_ids) - len(unchecked_txn_ids))
+    instrument.count("txns.validated", len(unchecked_txn_ids))
+    with instrument.timer("validate"):
+        if workers > 1 and len(unchecked_txn_ids) > 1:
+            results = _validate_parallel(unchecked_txn_ids, min(workers, len(unchecked_txn_ids)), chunksize,
+                                         batch_schnorr)
+        else:
+            sigcache.defer_schnorr(batch_schnorr)
+            try:
+                results = _validate_serial(unchecked_txn_ids)
+            finally:
+                sigcache.defer_schnorr(False)
+        failed = _settle_deferred(results, unchecked_txn_ids)
+
+    for txn_id, (verdict, metrics, _) in zip(unchecked_txn_ids, results):
+        if txn_id in failed:
+            verdict = (False, verdict[1])
+        verdicts[txn_id] = verdict
+        if metrics is not None:
+            txn_model.prime(txn_id, metrics["txid"], metrics["wtxid"], metrics["weight"], metrics["fee"], metrics["spends"])
+        if result_cache is not None:
+            result_cache.store(txn_id, fingerprints[txn_id], verdict, metrics)
+    return verdicts
+
+def order_valid(txn_ids, verdicts):
+    """
+    Valid transactions, SEGWIT transactions at the beginning and NON-SEGWIT transactions at the end.
+
+    @param txn_ids : Transaction IDs in mempool order.
+    @type  txn_ids : list
+    @param verdicts: validate_txn.validate() result per ID.
+    @type  verdicts: dict
+    @return        : List of valid transaction files.
+    @rtype         : list
     """
     valid_txn_files = []
-    unchecked_txn_ids = read_transactions()
-    for txn_file_name in unchecked_txn_ids:
-        valid, is_segwit = validate_txn.validate(txn_file_name)
+    for txn_file_name in txn_ids:
+        result = verdicts[txn_file_name]
+        if not result:
+            continue
+        valid, is_segwit = result
         if valid and is_segwit == 1:
             # Adding SEGWIT txn at begining to give it priority over NON-SEGWIT tx
             valid_txn_files.insert(0, txn_file_name)
         if valid and is_segwit == 0:
             # Adding NON-SEGWIT txn at last to give it less priority over SEGWIT tx
             valid_txn_files.append(txn_file_name)
-    return valid_txn_files
\ No newline at end of file
+    instrument.count("txns.valid", len(valid_txn_files))
+    return valid_txn_files
+
+def list_valid_txn(workers=None, chunksize=None, sigcache_file=None, result_cache=None, batch_schnorr=False):
+    """
+    Lists valid transactions from the mempool.
+
+    @param workers      : Number of validation processes (default: VALIDATION_WORKERS). 1 (or less) validates serially in this process.
+    @type  workers      : int
+    @param chunksize    : IDs handed to a worker per task (default: derived from the mempool size and `workers`).
+    @type  chunksize    : int
+    @param sigcache_file: Signature cache loaded before and saved after validation (default: in memory only).
+    @type  sigcache_file: str
+    @param result_cache : Validation results of earlier runs; only files it misses are validated, and it is updated
+                          and saved afterwards (default: validate everything).
+    @type  result_cache : helper.validation_cache.ValidationCache
+    @param batch_schnorr: Verify all taproot key-path signatures of the mempool together (see `validate_files`).
+    @type  batch_schnorr: bool
+    @return             : List of valid transaction files. Transactions are sorted with SEGWIT transactions at the beginning and NON-SEGWIT transactions at the end.
+    @rtype              : list
+    """
+    txn_ids = read_transactions()
+    if not txn_ids: # empty or unreadable mempool: leave the caches alone
+        return []
+    txn_model.reserve(len(txn_ids))
+    if sigcache_file:
+        sigcache.SIGNATURE_CACHE.load(sigcache_file)
+    verdicts = validate_files(txn_ids, workers, chunksize, result_cache, batch_schnorr)
+    if sigcache_file:
+        sigcache.SIGNATURE_CACHE.save(sigcache_file)
+    if result_cache is not None:
+        result_cache.prune(txn_ids)
+        result_cache.save()
+    return order_valid(txn_ids, verdicts)
@@ -0,0 +1,177 @@
+import heapq
+import helper.txn_model as txn_model
+
+class MempoolGraph:
+    """
+    Spending relations between mempool transactions.
+
+    Built in one pass: every transaction is indexed by txid and every input by the outpoint (txid, vout) it spends.
+    A transaction arriving before its parent is linked when the parent shows up. Two transactions spending the same
+    outpoint are conflicts (at most one of them can be in a block).
+
+    All lookups are dict/set operations; transactions are identified by their mempool file name.
+    """
+    __slots__ = ("txns", "by_txid", "spenders", "parents", "children", "conflicts", "_waiting")
+
+    def __init__(self, txn_files=()):
+        self.txns = {}      # file -> Transaction
+        self.by_txid = {}   # txid -> file
+        self.spenders = {}  # (txid, vout) -> set of files spending it
+        self.parents = {}   # file -> set of in-mempool files it spends from
+        self.children = {}  # file -> set of in-mempool files spending it
+        self.conflicts = {} # file -> set of files spending one of the same outpoints
+        self._waiting = {}  # txid not (yet) in the graph -> set of files spending it
+        for name in txn_files:
+            self.add(name)
+
+    def __contains__(self, name):
+        return name in self.txns
+
+    def __len__(self):
+        return len(self.txns)
+
+    def add(self, name, tx=None):
+        """
+        Insert a transaction and link it to its in-mempool parents, children and conflicts.
+
+        @param name: Transaction file name.
+        @type  name: str
+        @param tx  : The transaction (default: txn_model.summary, which only parses what was not primed).
+        @type  tx  : Transaction | helper.txn_model.Summary
+        """
+        if name in self.txns:
+            return
+        if tx is None:
+            tx = txn_model.summary(name)
+        self.txns[name] = tx
+        self.parents[name] = set()
+        self.children[name] = set()
+        self.conflicts[name] = set()
+
+        for iN in tx.vin:
+            spenders = self.spenders.setdefault((iN.txid, iN.vout), set())
+            for other in spenders:
+                self.conflicts[other].add(name)
+                self.conflicts[name].add(other)
+            spenders.add(name)
+            parent = self.by_txid.get(iN.txid)
+            if parent is not None:
+                self.parents[name].add(parent)
+                self.children[parent].add(name)
+            else:
+                self._waiting.setdefault(iN.txid, set()).add(name)
+
+        self.by_txid[tx.txid] = name
+        for child in self._waiting.pop(tx.txid, ()):
+            self.parents[child].add(name)
+            self.children[name].add(child)
+
+    def remove(self, name):
+        """
+        Drop a transaction; its children stay, waiting for the parent to come back.
+
+        @param name: Transaction file name.
+        @type  name: str
+        """
+        tx = self.txns.pop(name, None)
+        if tx is None:
+            return
+        for iN in tx.vin:
+            outpoint = (iN.txid, iN.vout)
+            self.spenders[outpoint].discard(name)
+            if not self.spenders[outpoint]:
+                del self.spenders[outpoint]
+            waiting = self._waiting.get(iN.txid)
+            if waiting is not None:
+                waiting.discard(name)
+                if not waiting:
+                    del self._waiting[iN.txid]
+        for parent in self.parents.pop(name):
+            self.children[parent].discard(name)
+        for child in self.children.pop(name):
+            self.parents[child].discard(name)
+            self._waiting.setdefault(tx.txid, set()).add(child)
+        for other in self.conflicts.pop(name):
+            self.conflicts[other].discard(name)
+        del self.by_txid[tx.txid]
+
+    def spender(self, txid, vout):
+        """
+        Mempool transactions spending an outpoint.
+
+        @param txid: Display txid of the output's transaction.
+        @type  txid: str
+        @param vout: Output index.
+        @type  vout: int
+        @return    : Files spending (txid, vout); more than one means a double spend.
+        @rtype     : set of str
+        """
+        return self.spenders.get((txid, vout), set())
+
+    def ancestors(self, name):
+        """
+        All in-mempool ancestors of `name`.
+
+        @rtype: set of str
+        """
+        return self._closure(name, self.parents)
+
+    def descendants(self, name):
+        """
+        All in-mempool descendants of `name`.
+
+        @rtype: set of str
+        """
+        return self._closure(name, self.children)
+
+    def _closure(self, name, edges):
+        found = set()
+        stack = list(edges[name])
+        while stack:
+            other = stack.pop()
+            if other not in found:
+                found.add(other)
+                stack.extend(edges[other])
+        return found
+
+    def topological(self, names=None):
+        """
+        Iterate over transactions parents first (Kahn's algorithm).
+
+        Ties keep the order of `names`, so the result is reproducible. Relations through transactions outside
+        `names` are ignored; transactions on a (malformed) cycle are never yielded.
+
+        @param names: Transactions to order (default: the whole graph, in insertion order).
+        @type  names: iterable of str
+        @return     : The transactions, every one after its parents.
+        @rtype      : generator of str
+        """
+        names = list(self.txns if names is None else names)
+        rank = {name: i for i, name in enumerate(names)}
+        pending = {name: sum(1 for p in self.parents[name] if p in rank) for name in names}
+        ready = [(rank[name], name) for name in names if not pending[name]]
+        heapq.heapify(ready)
+        while ready:
+            _, name = heapq.heappop(ready)
+            yield name
+            for child in self.children[name]:
+                if child in rank:
+                    pending[child] -= 1
+                    if not pending[child]:
+                        heapq.heappush(ready, (rank[child], child))
+
+    def orphaned(self, names):
+        """
+        Transactions in `names` that depend on an in-mempool ancestor outside `names` (e.g. one that failed validation).
+
+        @param names: The accepted transactions.
+        @type  names: iterable of str
+        @return     : Files that cannot be mined until their missing ancestor is.
+        @rtype      : set of str
+        """
+        accepted = set(names)
+        orphans = set()
+        for name in self.topological(accepted):
+            if any(p not in accepted or p in orphans for p in self.parents[name]):
+                orphans.add(name)
+        return orphans
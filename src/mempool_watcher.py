@@ -0,0 +1,279 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import list_valid_txn
+import mempool_graph
+import block_template
+import block_optimizer
+import helper.txn_model as txn_model
+
+###############
+## CONSTANTS ##
+###############
+POLL_INTERVAL = 1.0 # seconds between two directory scans (polling), or max wait for an event (inotify)
+SETTLE_TIME = 0.05 # after the first event, wait this long for the rest of a burst
+UPDATE_SECONDS = block_optimizer.OPTIMIZE_SECONDS # optimizer budget per update (it stops earlier at a local optimum)
+REBUILD_FRACTION = 0.25 # rebuild the template from scratch when this share of the valid set changed at once
+
+# <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_Q_OVERFLOW = 0x00004000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII") # wd, mask, cookie, len (name follows, NUL padded)
+
+def scan(mempool_dir=txn_model.MEMPOOL_DIR):
+    """
+    One os.scandir pass over the mempool directory.
+
+    @param mempool_dir: Directory holding the transaction files.
+    @type  mempool_dir: str
+    @return           : Transaction ID -> (mtime_ns, size) of every `.json` file.
+    @rtype            : dict
+    """
+    found = {}
+    with os.scandir(mempool_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith(".json") and entry.name.isascii(): # mempool files are named by their hex txid
+                try:
+                    st = entry.stat()
+                except OSError: # removed while scanning
+                    continue
+                found[entry.name[:-5]] = (st.st_mtime_ns, st.st_size)
+    return found
+
+#############
+## SOURCES ##
+#############
+class PollingSource:
+    """
+    Change source that rescans the directory every `interval` seconds.
+    """
+
+    def __init__(self, mempool_dir=txn_model.MEMPOOL_DIR, interval=POLL_INTERVAL):
+        self.mempool_dir = mempool_dir
+        self.interval = interval
+
+    def wait(self, timeout=None):
+        """
+        Block until something may have changed.
+
+        @param timeout: Seconds to wait at most (default: `interval`).
+        @type  timeout: float
+        @return       : Names of the files that changed, or None when the whole directory has to be rescanned
+                        (always, for polling).
+        @rtype        : set of str | None
+        """
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        return None
+
+    def close(self):
+        pass
+
+class InotifySource:
+    """
+    Change source on Linux inotify, reached through ctypes (no third-party package).
+
+    Files are reported once they are closed after writing or moved in, and when they are deleted or moved out.
+    """
+
+    def __init__(self, mempool_dir=txn_model.MEMPOOL_DIR, interval=POLL_INTERVAL):
+        self.mempool_dir = mempool_dir
+        self.interval = interval
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_MOVED_FROM | _IN_DELETE | _IN_DELETE_SELF
+        if libc.inotify_add_watch(self._fd, os.fsencode(mempool_dir), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(err, f"inotify_add_watch failed on {mempool_dir}")
+
+    def _read(self):
+        names = set()
+        while True:
+            try:
+                data = os.read(self._fd, 1 << 16)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    return names
+                raise
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0").decode(errors="surrogateescape")
+                offset += length
+                if mask & (_IN_Q_OVERFLOW | _IN_DELETE_SELF):
+                    return None # events were lost: rescan
+                if name.endswith(".json") and name.isascii(): # mempool files are named by their hex txid
+                    names.add(name[:-5])
+
+    def wait(self, timeout=None):
+        """
+        Block until an event arrives (or `timeout`), then collect the rest of the burst.
+
+        @param timeout: Seconds to wait at most (default: `interval`).
+        @type  timeout: float
+        @return       : Names of the files that changed, or None if the kernel queue overflowed.
+        @rtype        : set of str | None
+        """
+        ready, _, _ = select.select([self._fd], [], [], self.interval if timeout is None else timeout)
+        if not ready:
+            return set()
+        time.sleep(SETTLE_TIME)
+        return self._read()
+
+    def close(self):
+        os.close(self._fd)
+
+def open_source(mempool_dir=txn_model.MEMPOOL_DIR, interval=POLL_INTERVAL, use_inotify=True):
+    """
+    inotify where the platform has it, polling otherwise.
+
+    @rtype: InotifySource | PollingSource
+    """
+    if use_inotify and sys.platform.startswith("linux"):
+        try:
+            return InotifySource(mempool_dir, interval)
+        except (OSError, AttributeError): # no libc inotify, or out of watches
+            pass
+    return PollingSource(mempool_dir, interval)
+
+#############
+## WATCHER ##
+#############
+class MempoolWatcher:
+    """
+    Keeps the valid set, the dependency graph and the block template of a mempool directory up to date.
+
+    The first `refresh()` validates everything. After that only new, changed or removed files are looked at:
+    new and changed ones are validated, removed ones are dropped from the graph and the valid set, and the
+    template is repaired from its previous state (removed, changed and orphaned transactions and their
+    descendants taken out, then block_optimizer fills and swaps from there) instead of being rebuilt from scratch.
+    Validation reads files through txn_model, so `mempool_dir` has to be the directory it reads from.
+    """
+
+    def __init__(self, mempool_dir=txn_model.MEMPOOL_DIR, workers=None, result_cache=None,
+                 update_seconds=UPDATE_SECONDS, source=None, batch_schnorr=False):
+        self.mempool_dir = mempool_dir
+        self.workers = workers
+        self.result_cache = result_cache
+        self.batch_schnorr = batch_schnorr
+        self.update_seconds = update_seconds
+        self.source = source if source is not None else open_source(mempool_dir)
+        self.known = {}    # txn_id -> (mtime_ns, size)
+        self.verdicts = {} # txn_id -> validate_txn.validate() result
+        self.graph = mempool_graph.MempoolGraph()
+        self.template = ([], 0, 0) # (selected files, fees, weight)
+
+    @property
+    def valid(self):
+        """Valid transaction files, SEGWIT first (see list_valid_txn.order_valid)."""
+        return list_valid_txn.order_valid(sorted(self.verdicts), self.verdicts)
+
+    def _diff(self, names):
+        # Classify `names` (None: every file) against what is known.
+        if names is None:
+            current = scan(self.mempool_dir)
+            names = set(current) | set(self.known)
+        else:
+            current = {}
+            for name in names:
+                try:
+                    st = os.stat(os.path.join(self.mempool_dir, f"{name}.json"))
+                    current[name] = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    pass
+        added = {n for n in names if n in current and self.known.get(n) != current[n]}
+        removed = {n for n in names if n not in current and n in self.known}
+        return added, removed, current
+
+    def refresh(self, names=None):
+        """
+        Apply the changes of `names` (None: rescan the directory).
+
+        @param names: Files reported as changed by the source.
+        @type  names: set of str
+        @return     : (added or changed files, removed files); both empty if nothing changed.
+        @rtype      : tuple[set, set]
+        """
+        added, removed, current = self._diff(names)
+        if not added and not removed:
+            return added, removed
+
+        ##########
+        # Remove #
+        ##########
+        for name in removed | added: # a changed file is removed, then added again
+            self.known.pop(name, None)
+            self.verdicts.pop(name, None)
+            self.graph.remove(name)
+            txn_model.forget(name)
+
+        ############
+        # Validate #
+        ############
+        fresh = sorted(added)
+        txn_model.reserve(len(self.known) + len(fresh))
+        self.verdicts.update(list_valid_txn.validate_files(fresh, self.workers, result_cache=self.result_cache,
+                                                                 batch_schnorr=self.batch_schnorr))
+        for name in fresh:
+            self.known[name] = current[name]
+            try:
+                self.graph.add(name)
+            except (OSError, ValueError, KeyError): # unreadable: stays out of the graph, invalid
+                self.verdicts[name] = False
+        if self.result_cache is not None:
+            self.result_cache.prune(self.known)
+            self.result_cache.save()
+
+        ############
+        # Template #
+        ############
+        valid = self.valid
+        selected = self.template[0]
+        if not selected or len(added) + len(removed) > REBUILD_FRACTION * max(len(valid), 1):
+            self.template = block_template.build_template(valid, graph=self.graph)
+        else:
+            keep = set(valid) - self.graph.orphaned(valid) - added
+            start, in_start = [], set()
+            for name in selected: # block order: parents are seen before their children
+                if name in keep and self.graph.parents[name] <= in_start:
+                    start.append(name)
+                    in_start.add(name)
+            self.template = block_optimizer.optimize(valid, self.update_seconds, start=start, graph=self.graph)
+        return added, removed
+
+    def watch(self, on_update=None, max_updates=None):
+        """
+        Refresh forever (or `max_updates` times), calling `on_update(watcher, added, removed)` after every change.
+
+        @param on_update  : Callback run after each applied change (e.g. to mine and write the block).
+        @type  on_update  : callable
+        @param max_updates: Stop after this many changes (default: never).
+        @type  max_updates: int
+        """
+        updates = 0
+        added, removed = self.refresh()
+        if on_update is not None:
+            on_update(self, added, removed)
+        try:
+            while max_updates is None or updates < max_updates:
+                added, removed = self.refresh(self.source.wait())
+                if added or removed:
+                    updates += 1
+                    if on_update is not None:
+                        on_update(self, added, removed)
+        finally:
+            self.source.close()
@@ -0,0 +1,373 @@
+import os
+import time
+import queue
+import itertools
+import struct
+import hashlib
+import multiprocessing
+import helper.sha256_np as sha256_np
+
+###############
+## CONSTANTS ##
+###############
+NONCE_MIN = 0x0
+NONCE_MAX = 0xFFFFFFFF
+MINING_WORKERS = os.cpu_count() or 1
+CHECK_INTERVAL = 0x4000 # nonces tried between two looks at the cancel flag
+VERSION_ROLL_MASK = 0x1fffe000 # BIP320 general purpose version bits (13-28)
+VERSIONBITS_TOP_MASK = 0xe0000000
+VERSIONBITS_TOP_BITS = 0x20000000 # BIP9 top bits (001): BIP320 rolls only versions that carry them
+VERSION_ROLLS = 1 << 16 # every value of the 16 BIP320 bits
+TIME_ROLLS = 600 # seconds the timestamp may be pushed forward, well inside the 2h future limit
+RESULT_TIMEOUT = 1.0 # seconds between two liveness checks of the workers while waiting for their results
+_NONCE = struct.Struct("<I")
+
+def split_nonce_space(workers, start=NONCE_MIN, stop=NONCE_MAX + 1):
+    """
+    Split [start, stop) into `workers` contiguous ranges of (almost) equal size.
+
+    @param workers: Number of ranges.
+    @type  workers: int
+    @param start  : First nonce (inclusive).
+    @type  start  : int
+    @param stop   : Last nonce (exclusive).
+    @type  stop   : int
+    @return       : (start, stop) pair per worker.
+    @rtype        : list of tuple[int, int]
+    """
+    size, extra = divmod(stop - start, workers)
+    ranges = []
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+class HeaderHasher:
+    """
+    Double-SHA256 of an 80-byte block header for many nonces.
+
+    Only the last 16 bytes of the header (end of the merkle root, time, bits, nonce) lie in the second SHA256 block,
+    so the state after the first 64 bytes (the midstate) is computed once and `copy()`ed for every nonce. The header
+    lives in a preallocated bytearray and the nonce is written in place.
+    """
+    __slots__ = ("header", "_tail", "_midstate")
+
+    def __init__(self, header_wo_nonce):
+        self.header = bytearray(80)
+        self.header[:76] = header_wo_nonce
+        self._tail = memoryview(self.header)[64:]
+        self._midstate = hashlib.sha256(self.header[:64])
+
+    def hash(self, nonce):
+        """
+        Block hash for `nonce` (internal byte order).
+
+        @param nonce: The nonce to write into the header.
+        @type  nonce: int
+        @return     : hash256 of the header.
+        @rtype      : bytes
+        """
+        _NONCE.pack_into(self.header, 76, nonce)
+        inner = self._midstate.copy()
+        inner.update(self._tail)
+        return hashlib.sha256(inner.digest()).digest()
+
+def target_bytes(target):
+    """
+    Difficulty target as 32 big-endian bytes, comparable with a reversed block hash.
+
+    @param target: Difficulty target.
+    @type  target: int
+    @rtype       : bytes
+    """
+    return target.to_bytes(32, "big")
+
+def scan(header_wo_nonce, target, start, stop, cancel=None):
+    """
+    Try every nonce in [start, stop) until the block hash is <= target.
+
+    @param header_wo_nonce: First 76 bytes of the block header.
+    @type  header_wo_nonce: bytes
+    @param target         : Difficulty target.
+    @type  target         : int
+    @param start          : First nonce (inclusive).
+    @type  start          : int
+    @param stop           : Last nonce (exclusive).
+    @type  stop           : int
+    @param cancel         : Checked every CHECK_INTERVAL nonces; the scan gives up once it is set.
+    @type  cancel         : multiprocessing.Event
+    @return               : (nonce or None, number of hashes computed)
+    @rtype                : tuple
+    """
+    # HeaderHasher.hash() inlined; everything the hot loop touches is bound to a local.
+    hasher = HeaderHasher(header_wo_nonce)
+    header, tail, midstate = hasher.header, hasher._tail, hasher._midstate
+    sha256 = hashlib.sha256
+    pack_into = _NONCE.pack_into
+    limit = target_bytes(target)
+
+    nonce = start
+    while nonce < stop:
+        batch_end = min(nonce + CHECK_INTERVAL, stop)
+        while nonce < batch_end:
+            pack_into(header, 76, nonce)
+            inner = midstate.copy()
+            inner.update(tail)
+            if sha256(inner.digest()).digest()[::-1] <= limit:
+                return nonce, nonce - start + 1
+            nonce += 1
+        if cancel is not None and cancel.is_set():
+            break
+    return None, nonce - start
+
+##############
+## BACKENDS ##
+##############
+BACKENDS = {"hashlib": scan}
+if sha256_np.AVAILABLE:
+    BACKENDS["numpy"] = sha256_np.scan
+DEFAULT_BACKEND = "hashlib"
+
+def get_backend(name):
+    """
+    Scan function for a backend name; the NumPy backend is checked against hashlib before first use.
+
+    @param name: Key of BACKENDS.
+    @type  name: str
+    @return    : A function with the signature of `scan`.
+    @rtype     : callable
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown mining backend {name!r} (available: {', '.join(BACKENDS)})")
+    if name == "numpy" and not sha256_np.self_test():
+        raise RuntimeError("NumPy SHA256 backend does not match hashlib")
+    return BACKENDS[name]
+
+def _worker(worker_id, backend, cancel, tasks, results):
+    # Scan every (header_wo_nonce, target, start, stop) task until the None sentinel.
+    scanner = BACKENDS[backend]
+    for header_wo_nonce, target, start, stop in iter(tasks.get, None):
+        began = time.perf_counter()
+        nonce, hashes = scanner(header_wo_nonce, target, start, stop, cancel)
+        if nonce is not None:
+            cancel.set() # first one to find a nonce stops the others
+        results.put((worker_id, nonce, hashes, time.perf_counter() - began))
+
+def _stats(worker_id, hashes, seconds):
+    return {
+        "worker": worker_id,
+        "hashes": hashes,
+        "seconds": seconds,
+        "hashes_per_sec": hashes / seconds if seconds > 0 else 0.0,
+    }
+
+class MiningPool:
+    """
+    Worker processes that stay up for any number of nonce searches (see `search`); a single worker runs in this
+    process. Use as a context manager, or call `close()`.
+    """
+
+    def __init__(self, workers=None, backend=DEFAULT_BACKEND):
+        """
+        @param workers: Number of processes (default: MINING_WORKERS).
+        @type  workers: int
+        @param backend: Hashing backend, a key of BACKENDS.
+        @type  backend: str
+        """
+        self.workers = max(1, MINING_WORKERS if workers is None else workers)
+        self._scanner = get_backend(backend)
+        self._procs = []
+        if self.workers == 1:
+            return
+        self._cancel = multiprocessing.Event()
+        self._results = multiprocessing.Queue()
+        self._tasks = [multiprocessing.Queue() for _ in range(self.workers)]
+        for i, tasks in enumerate(self._tasks):
+            proc = multiprocessing.Process(target=_worker, args=(i, backend, self._cancel, tasks, self._results), daemon=True)
+            proc.start()
+            self._procs.append(proc)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def search(self, header_wo_nonce, target, start=NONCE_MIN, stop=NONCE_MAX + 1):
+        """
+        Search [start, stop) for a header hash <= target, one contiguous range per worker.
+
+        The first worker to succeed sets a shared event and the others stop at their next check.
+
+        @param header_wo_nonce: First 76 bytes of the block header.
+        @type  header_wo_nonce: bytes
+        @param target         : Difficulty target.
+        @type  target         : int
+        @param start          : First nonce (inclusive).
+        @type  start          : int
+        @param stop           : Last nonce (exclusive).
+        @type  stop           : int
+        @return               : (nonce or None if the range is exhausted, per-worker stats). Each stats entry has
+                                `worker`, `hashes`, `seconds` and `hashes_per_sec`.
+        @rtype                : tuple[int, list of dict]
+        @raise RuntimeError   : If a worker process died without reporting.
+        """
+        if not self._procs:
+            began = time.perf_counter()
+            nonce, hashes = self._scanner(header_wo_nonce, target, start, stop)
+            return nonce, [_stats(0, hashes, time.perf_counter() - began)]
+
+        ranges = split_nonce_space(max(1, min(self.workers, stop - start)), start, stop)
+        self._cancel.clear() # every worker reported on the previous search, so none is looking at it
+        for tasks, (lo, hi) in zip(self._tasks, ranges):
+            tasks.put((header_wo_nonce, target, lo, hi))
+
+        found = None
+        stats = []
+        while len(stats) < len(ranges):
+            try:
+                worker_id, nonce, hashes, seconds = self._results.get(timeout=RESULT_TIMEOUT)
+            except queue.Empty:
+                self._check_alive()
+                continue
+            stats.append(_stats(worker_id, hashes, seconds))
+            if nonce is not None and found is None:
+                found = nonce
+                self._cancel.set()
+        stats.sort(key=lambda s: s["worker"])
+        return found, stats
+
+    def _check_alive(self):
+        for i, proc in enumerate(self._procs):
+            if proc.exitcode is not None:
+                self.close()
+                raise RuntimeError(f"Mining worker {i} exited with code {proc.exitcode} without reporting")
+
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        if not self._procs:
+            return
+        self._cancel.set()
+        for tasks in self._tasks:
+            tasks.put(None)
+        for proc in self._procs:
+            proc.join(RESULT_TIMEOUT)
+            if proc.exitcode is None:
+                proc.terminate()
+                proc.join()
+        self._procs = []
+
+def mine(header_wo_nonce, target, workers=None, start=NONCE_MIN, stop=NONCE_MAX + 1, backend=DEFAULT_BACKEND):
+    """
+    Search the nonce space for a header hash <= target, split across worker processes (see MiningPool.search).
+
+    @param header_wo_nonce: First 76 bytes of the block header.
+    @type  header_wo_nonce: bytes
+    @param target         : Difficulty target.
+    @type  target         : int
+    @param workers        : Number of processes (default: MINING_WORKERS).
+    @type  workers        : int
+    @param start          : First nonce (inclusive).
+    @type  start          : int
+    @param stop           : Last nonce (exclusive).
+    @type  stop           : int
+    @param backend        : Hashing backend, a key of BACKENDS.
+    @type  backend        : str
+    @return               : (nonce or None if the range is exhausted, per-worker stats). Each stats entry has
+                            `worker`, `hashes`, `seconds` and `hashes_per_sec`.
+    @rtype                : tuple[int, list of dict]
+    @raise RuntimeError   : If a worker process died without reporting.
+    """
+    if workers is None:
+        workers = MINING_WORKERS
+    with MiningPool(min(workers, stop - start), backend) as pool:
+        return pool.search(header_wo_nonce, target, start, stop)
+
+#############
+## ROLLING ##
+#############
+def roll_version(version, i):
+    """
+    `version` as a BIP9 version (top bits 001) with the BIP320 general purpose bits set to `i`.
+
+    @param version: Base block version (its top 3 bits are replaced).
+    @type  version: int
+    @param i      : Value for bits 13-28 (taken modulo 2^16).
+    @type  i      : int
+    @rtype        : int
+    """
+    return (version & ~(VERSIONBITS_TOP_MASK | VERSION_ROLL_MASK)) | VERSIONBITS_TOP_BITS | ((i << 13) & VERSION_ROLL_MASK)
+
+def _merge_stats(total, stats):
+    for s in stats:
+        acc = total.setdefault(s["worker"], {"worker": s["worker"], "hashes": 0, "seconds": 0.0})
+        acc["hashes"] += s["hashes"]
+        acc["seconds"] += s["seconds"]
+
+def _work_units(version, timestamp, version_rolls, time_rolls, max_extranonce):
+    # Innermost knob changes fastest: version bits, then time, then extranonce.
+    extranonces = itertools.count() if max_extranonce is None else range(max_extranonce + 1)
+    versions = [roll_version(version, i) for i in range(version_rolls)] if version_rolls > 1 else [version]
+    for extranonce in extranonces:
+        for dt in range(time_rolls + 1):
+            for rolled in versions:
+                yield extranonce, rolled, timestamp + dt
+
+def mine_rolling(make_header, target, version, timestamp, workers=None, backend=DEFAULT_BACKEND,
+                 version_rolls=VERSION_ROLLS, time_rolls=TIME_ROLLS, max_extranonce=None,
+                 start=NONCE_MIN, stop=NONCE_MAX + 1):
+    """
+    Nonce search that keeps going once the 32-bit nonce space is exhausted.
+
+    The cheapest knobs are turned first: the BIP320 version bits and then the timestamp only change the header,
+    the extranonce changes the coinbase and therefore the Merkle root (`make_header` is expected to recompute
+    only the coinbase side of the tree).
+
+    @param make_header   : Callable (extranonce, version, timestamp) -> first 76 header bytes.
+    @type  make_header   : callable
+    @param target        : Difficulty target.
+    @type  target        : int
+    @param version       : Base block version.
+    @type  version       : int
+    @param timestamp     : Starting header timestamp.
+    @type  timestamp     : int
+    @param workers       : Number of processes (default: MINING_WORKERS).
+    @type  workers       : int
+    @param backend       : Hashing backend, a key of BACKENDS.
+    @type  backend       : str
+    @param version_rolls : Version variants tried per timestamp (1 disables version rolling and keeps `version`;
+                           otherwise every variant carries the BIP9 top bits, see roll_version).
+    @type  version_rolls : int
+    @param time_rolls    : Seconds the timestamp may be moved forward per extranonce (0 disables time rolling).
+    @type  time_rolls    : int
+    @param max_extranonce: Last extranonce to try (None: no limit).
+    @type  max_extranonce: int
+    @param start         : First nonce (inclusive) of every search.
+    @type  start         : int
+    @param stop          : Last nonce (exclusive) of every search.
+    @type  stop          : int
+    @return              : (work, stats). `work` is None if everything was exhausted, else a dict with
+                           `nonce`, `extranonce`, `version`, `timestamp` and `header_wo_nonce`. `stats` sums
+                           every search per worker (see `mine`).
+    @rtype               : tuple[dict, list of dict]
+    @raise RuntimeError  : If a worker process died without reporting.
+    """
+    if workers is None:
+        workers = MINING_WORKERS
+    total = {}
+    work = None
+    with MiningPool(min(workers, stop - start), backend) as pool: # one set of processes for every work unit
+        for extranonce, rolled, rolled_time in _work_units(version, timestamp, version_rolls, time_rolls, max_extranonce):
+            header_wo_nonce = make_header(extranonce, rolled, rolled_time)
+            nonce, stats = pool.search(header_wo_nonce, target, start, stop)
+            _merge_stats(total, stats)
+            if nonce is not None:
+                work = {"nonce": nonce, "extranonce": extranonce, "version": rolled,
+                        "timestamp": rolled_time, "header_wo_nonce": header_wo_nonce}
+                break
+
+    stats = [_stats(w["worker"], w["hashes"], w["seconds"]) for _, w in sorted(total.items())]
+    return work, stats
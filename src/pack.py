@@ -0,0 +1,42 @@
+import time
+import argparse
+import helper.snapshot as snapshot
+import helper.txn_model as txn_model
+
+###############
+## CONSTANTS ##
+###############
+SNAPSHOT_FILE = "mempool.pack"
+
+def main(path=SNAPSHOT_FILE, mempool_dir=txn_model.MEMPOOL_DIR, compress=False):
+    """
+    Pack the mempool directory into one snapshot file (see helper.snapshot) that blocks.py can read with --snapshot.
+
+    @param path       : Snapshot file to write.
+    @type  path       : str
+    @param mempool_dir: Directory holding the transaction files.
+    @type  mempool_dir: str
+    @param compress   : zlib-compress every record.
+    @type  compress   : bool
+    """
+    start = time.perf_counter()
+    stats = snapshot.pack(path, mempool_dir, compress)
+    seconds = time.perf_counter() - start
+    print(f"packed::> {stats['records']} transactions into {path} in {seconds:.2f}s "
+          f"({stats['raw_bytes']} bytes of records, {stats['stored_bytes']} stored)")
+    for name in stats["skipped"]:
+        print(f"skipped::> {name} (does not parse)")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pack the mempool directory into one indexed binary snapshot.")
+    parser.add_argument("output", nargs="?", default=SNAPSHOT_FILE,
+                        help=f"snapshot file to write (default: {SNAPSHOT_FILE})")
+    parser.add_argument("--mempool", default=txn_model.MEMPOOL_DIR, metavar="DIR",
+                        help="directory holding the transaction files")
+    parser.add_argument("--compress", action="store_true",
+                        help="zlib-compress every record")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(args.output, args.mempool, args.compress)
@@ -0,0 +1,670 @@
+import hashlib
+from Crypto.Hash import RIPEMD160
+import helper.script as script
+import helper.sighash as sighash
+import helper.sigcache as sigcache
+import helper.instrument as instrument
+
+###############
+## CONSTANTS ##
+###############
+MAX_SCRIPT_SIZE = 10000
+MAX_ELEMENT_SIZE = 520
+MAX_OPS = 201
+MAX_STACK_SIZE = 1000
+MAX_PUBKEYS_PER_MULTISIG = 20
+LOCKTIME_THRESHOLD = 500000000
+SEQUENCE_FINAL = 0xffffffff
+SEQUENCE_DISABLE_FLAG = 1 << 31
+SEQUENCE_TYPE_FLAG = 1 << 22
+SEQUENCE_MASK = 0x0000ffff
+SIGVERSION_BASE = 0
+SIGVERSION_WITNESS_V0 = 1
+ANNEX_TAG = 0x50
+MINIMALIF = True # policy, not consensus: OP_IF/OP_NOTIF in witness v0 scripts only take b"" or b"\x01"
+
+class ScriptError(ValueError):
+    """A script failed (never escapes `verify`, which returns False instead)."""
+
+#############
+## HELPERS ##
+#############
+def hash160(data):
+    return RIPEMD160.new(hashlib.sha256(data).digest()).digest()
+
+def hash256(data):
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+def decode_num(data, max_size=4):
+    """
+    Script number (little-endian, sign bit in the last byte).
+
+    @param data    : Stack element.
+    @type  data    : bytes
+    @param max_size: Longest accepted encoding.
+    @type  max_size: int
+    @rtype         : int
+    @raise ScriptError: If `data` is longer than `max_size`.
+    """
+    if len(data) > max_size:
+        raise ScriptError("script number overflow")
+    if not data:
+        return 0
+    value = int.from_bytes(data, "little")
+    if data[-1] & 0x80:
+        return -(value & ~(0x80 << (8 * (len(data) - 1))))
+    return value
+
+def encode_num(value):
+    """Inverse of `decode_num` (minimal encoding)."""
+    if value == 0:
+        return b""
+    magnitude = abs(value)
+    out = bytearray()
+    while magnitude:
+        out.append(magnitude & 0xff)
+        magnitude >>= 8
+    if out[-1] & 0x80:
+        out.append(0x80 if value < 0 else 0)
+    elif value < 0:
+        out[-1] |= 0x80
+    return bytes(out)
+
+def cast_to_bool(data):
+    for i, byte in enumerate(data):
+        if byte:
+            return not (i == len(data) - 1 and byte == 0x80) # negative zero is false
+    return False
+
+def push_data(script_bytes):
+    """
+    Data pushed by a push-only script (e.g. a P2SH scriptSig).
+
+    @param script_bytes: The script.
+    @type  script_bytes: bytes
+    @return            : Pushed elements, in order.
+    @rtype             : list of bytes
+    @raise ScriptError : If the script has a non-push operation or a truncated push.
+    """
+    pushes = []
+    for op, data, _ in script.iterate(script_bytes):
+        if data is not None:
+            pushes.append(data)
+        elif op == script.OP_0:
+            pushes.append(b"")
+        elif op == script.OP_1NEGATE:
+            pushes.append(b"\x81")
+        elif script.OP_1 <= op <= script.OP_16:
+            pushes.append(bytes([op - script.OP_1 + 1]))
+        else:
+            raise ScriptError(f"{script.OPCODE_NAMES[op]} in a push-only script")
+    return pushes
+
+###############
+## TEMPLATES ##
+###############
+def is_p2pkh(spk):
+    return len(spk) == 25 and spk[:3] == b"\x76\xa9\x14" and spk[23:] == b"\x88\xac"
+
+def is_p2sh(spk):
+    return len(spk) == 23 and spk[:2] == b"\xa9\x14" and spk[22] == 0x87
+
+def witness_program(spk):
+    """
+    @return: (version, program) if `spk` is a witness program (BIP141), else None.
+    @rtype : tuple[int, bytes]
+    """
+    if 4 <= len(spk) <= 42 and (spk[0] == script.OP_0 or script.OP_1 <= spk[0] <= script.OP_16) and spk[1] == len(spk) - 2:
+        return (0 if spk[0] == script.OP_0 else spk[0] - script.OP_1 + 1), spk[2:]
+    return None
+
+##############
+## CHECKERS ##
+##############
+class SignatureChecker:
+    """
+    The transaction side of a script run: signature hashes and lock-time checks for input `index` of `tx`.
+    Subclasses provide `digest` for their signature version (legacy, BIP143 or BIP341) and signatures are verified
+    through helper.sigcache. A checker serves one input and keeps the digests it computed, so `check_sig` hashes the
+    transaction once per script code and sighash type (e.g. once for all the signatures of a multisig input).
+    """
+    __slots__ = ("tx", "index", "_digests")
+
+    def __init__(self, tx, index):
+        self.tx = tx
+        self.index = index
+        self._digests = {} # (sighash type, script code) -> digest
+
+    def digest(self, script_code, sighash_type):
+        raise NotImplementedError
+
+    def check_sig(self, signature, pubkey, script_code):
+        """
+        @param signature  : DER signature followed by the sighash type byte.
+        @type  signature  : bytes
+        @param pubkey     : SEC encoded public key.
+        @type  pubkey     : bytes
+        @param script_code: Script code the signature commits to.
+        @type  script_code: bytes
+        @return           : True if the signature is valid (an empty one is simply false).
+        @rtype            : bool
+        """
+        if not signature:
+            return False
+        key = (signature[-1], script_code)
+        message_hash = self._digests.get(key)
+        if message_hash is None:
+            message_hash = self._digests[key] = self.digest(script_code, signature[-1])
+        return sigcache.verify(signature[:-1], message_hash, pubkey)
+
+    def check_locktime(self, locktime):
+        """BIP65 (OP_CHECKLOCKTIMEVERIFY)."""
+        tx_locktime = self.tx.locktime
+        if (tx_locktime < LOCKTIME_THRESHOLD) != (locktime < LOCKTIME_THRESHOLD):
+            return False
+        return locktime <= tx_locktime and self.tx.vin[self.index].sequence != SEQUENCE_FINAL
+
+    def check_sequence(self, sequence):
+        """BIP112 (OP_CHECKSEQUENCEVERIFY), for a `sequence` without the disable flag."""
+        tx_sequence = self.tx.vin[self.index].sequence
+        if self.tx.version < 2 or tx_sequence & SEQUENCE_DISABLE_FLAG:
+            return False
+        if (tx_sequence & SEQUENCE_TYPE_FLAG) != (sequence & SEQUENCE_TYPE_FLAG):
+            return False
+        return (sequence & SEQUENCE_MASK) <= (tx_sequence & SEQUENCE_MASK)
+
+class LegacyChecker(SignatureChecker):
+    """Pre-segwit signature hashes (helper.sighash.LegacyHasher, shared by the inputs of `tx`)."""
+    __slots__ = ()
+
+    def digest(self, script_code, sighash_type):
+        with instrument.timer("sighash.legacy"):
+            return self.tx.legacy.digest(self.index, script_code, sighash_type)
+
+class WitnessV0Checker(SignatureChecker):
+    """BIP143 signature hashes, committing to the spent `amount`."""
+    __slots__ = ("amount",)
+
+    def __init__(self, tx, index, amount):
+        super().__init__(tx, index)
+        self.amount = amount
+
+    def digest(self, script_code, sighash_type):
+        with instrument.timer("sighash.bip143"):
+            return self.tx.bip143.digest(self.index, script_code, self.amount, sighash_type)
+
+class TaprootChecker(SignatureChecker):
+    """BIP341 key-path signature hashes, committing to every spent output and to the input's `annex`."""
+    __slots__ = ("annex",)
+
+    def __init__(self, tx, index, annex=None):
+        super().__init__(tx, index)
+        self.annex = annex
+
+    def digest(self, script_code, sighash_type):
+        # No script code: a key-path signature commits to the spent outputs instead.
+        with instrument.timer("sighash.bip341"):
+            return self.tx.taproot.digest(self.index, sighash_type, self.annex)
+
+    def check_schnorr(self, signature, pubkey):
+        """
+        @param signature: 64-byte BIP340 signature, or 65 bytes ending with an explicit (non-default) sighash type.
+        @type  signature: bytes
+        @param pubkey   : 32-byte x-only output key.
+        @type  pubkey   : bytes
+        @return         : True if the signature is valid.
+        @rtype          : bool
+        """
+        if len(signature) == 64:
+            sighash_type = sighash.SIGHASH_DEFAULT
+        elif len(signature) == 65 and signature[64] != sighash.SIGHASH_DEFAULT:
+            sighash_type = signature[64]
+        else:
+            return False
+        try:
+            message = self.digest(b"", sighash_type)
+        except ValueError: # undefined sighash type, SIGHASH_SINGLE without an output
+            return False
+        return sigcache.verify_schnorr(signature[:64], message, pubkey)
+
+#############
+## OPCODES ##
+#############
+class _State:
+    __slots__ = ("stack", "altstack", "conditions", "skipping", "checker", "script", "sigversion", "codesep", "pos",
+                 "ops")
+
+    def __init__(self, stack, checker, script_bytes, sigversion):
+        self.stack = stack
+        self.altstack = []
+        self.conditions = [] # one bool per open OP_IF
+        self.skipping = 0    # number of False entries in `conditions`
+        self.checker = checker
+        self.script = script_bytes
+        self.sigversion = sigversion
+        self.codesep = 0     # script code starts after the last executed OP_CODESEPARATOR
+        self.pos = 0         # offset just past the operation being run
+        self.ops = 0         # operations counted against MAX_OPS (multisig keys count too)
+
+def _fail(state, op):
+    raise ScriptError(f"{script.OPCODE_NAMES[op]} failed")
+
+def _need(stack, n):
+    if len(stack) < n:
+        raise ScriptError("stack underflow")
+
+def _pop_num(state, max_size=4):
+    return decode_num(state.stack.pop(), max_size)
+
+def _pop_bool(state):
+    return cast_to_bool(state.stack.pop())
+
+def _verify_top(state, op):
+    if not _pop_bool(state):
+        raise ScriptError(f"{script.OPCODE_NAMES[op]} failed")
+
+# constants and flow control
+def _op_pushnum(state, op):
+    state.stack.append(encode_num(op - script.OP_1 + 1) if op != script.OP_1NEGATE else b"\x81")
+
+def _op_nop(state, op):
+    pass
+
+def _op_if(state, op):
+    value = False
+    if not state.skipping:
+        top = state.stack.pop()
+        if MINIMALIF and state.sigversion == SIGVERSION_WITNESS_V0 and top not in (b"", b"\x01"):
+            raise ScriptError("OP_IF argument must be minimal")
+        value = cast_to_bool(top)
+        if op == 0x64: # OP_NOTIF
+            value = not value
+    state.conditions.append(value)
+    state.skipping += not value
+
+def _op_else(state, op):
+    if not state.conditions:
+        raise ScriptError("OP_ELSE without OP_IF")
+    value = state.conditions[-1]
+    state.conditions[-1] = not value
+    state.skipping += 1 if value else -1
+
+def _op_endif(state, op):
+    if not state.conditions:
+        raise ScriptError("OP_ENDIF without OP_IF")
+    state.skipping -= not state.conditions.pop()
+
+def _op_verify(state, op):
+    _verify_top(state, op)
+
+# stack
+def _op_toaltstack(state, op):
+    state.altstack.append(state.stack.pop())
+
+def _op_fromaltstack(state, op):
+    state.stack.append(state.altstack.pop())
+
+def _op_2drop(state, op):
+    _need(state.stack, 2)
+    del state.stack[-2:]
+
+def _op_2dup(state, op):
+    _need(state.stack, 2)
+    state.stack.extend(state.stack[-2:])
+
+def _op_3dup(state, op):
+    _need(state.stack, 3)
+    state.stack.extend(state.stack[-3:])
+
+def _op_2over(state, op):
+    stack = state.stack
+    stack.extend((stack[-4], stack[-3]))
+
+def _op_2rot(state, op):
+    stack = state.stack
+    _need(stack, 6)
+    pair = stack[-6:-4]
+    del stack[-6:-4]
+    stack.extend(pair)
+
+def _op_2swap(state, op):
+    stack = state.stack
+    stack[-4], stack[-3], stack[-2], stack[-1] = stack[-2], stack[-1], stack[-4], stack[-3]
+
+def _op_ifdup(state, op):
+    if cast_to_bool(state.stack[-1]):
+        state.stack.append(state.stack[-1])
+
+def _op_depth(state, op):
+    state.stack.append(encode_num(len(state.stack)))
+
+def _op_drop(state, op):
+    state.stack.pop()
+
+def _op_dup(state, op):
+    state.stack.append(state.stack[-1])
+
+def _op_nip(state, op):
+    _need(state.stack, 2)
+    del state.stack[-2]
+
+def _op_over(state, op):
+    state.stack.append(state.stack[-2])
+
+def _op_pick_roll(state, op):
+    n = _pop_num(state)
+    stack = state.stack
+    if n < 0 or n >= len(stack):
+        raise ScriptError(f"{script.OPCODE_NAMES[op]} index out of range")
+    item = stack[-1 - n]
+    if op == 0x7a: # OP_ROLL
+        del stack[-1 - n]
+    stack.append(item)
+
+def _op_rot(state, op):
+    stack = state.stack
+    stack[-3], stack[-2], stack[-1] = stack[-2], stack[-1], stack[-3]
+
+def _op_swap(state, op):
+    stack = state.stack
+    stack[-2], stack[-1] = stack[-1], stack[-2]
+
+def _op_tuck(state, op):
+    stack = state.stack
+    _need(stack, 2)
+    stack.insert(-2, stack[-1])
+
+def _op_size(state, op):
+    state.stack.append(encode_num(len(state.stack[-1])))
+
+# bitwise logic
+def _op_equal(state, op):
+    stack = state.stack
+    equal = stack.pop() == stack.pop()
+    if op == 0x88: # OP_EQUALVERIFY
+        if not equal:
+            raise ScriptError("OP_EQUALVERIFY failed")
+    else:
+        stack.append(b"\x01" if equal else b"")
+
+# arithmetic
+_UNARY = {
+    0x8b: lambda a: a + 1, 0x8c: lambda a: a - 1, 0x8f: lambda a: -a, 0x90: abs,
+    0x91: lambda a: int(a == 0), 0x92: lambda a: int(a != 0),
+}
+_BINARY = {
+    0x93: lambda a, b: a + b, 0x94: lambda a, b: a - b, 0x9a: lambda a, b: int(a != 0 and b != 0),
+    0x9b: lambda a, b: int(a != 0 or b != 0), 0x9c: lambda a, b: int(a == b), 0x9d: lambda a, b: int(a == b),
+    0x9e: lambda a, b: int(a != b), 0x9f: lambda a, b: int(a < b), 0xa0: lambda a, b: int(a > b),
+    0xa1: lambda a, b: int(a <= b), 0xa2: lambda a, b: int(a >= b), 0xa3: min, 0xa4: max,
+}
+
+def _op_unary(state, op):
+    state.stack.append(encode_num(_UNARY[op](_pop_num(state))))
+
+def _op_binary(state, op):
+    b = _pop_num(state)
+    a = _pop_num(state)
+    state.stack.append(encode_num(_BINARY[op](a, b)))
+    if op == 0x9d: # OP_NUMEQUALVERIFY
+        _verify_top(state, op)
+
+def _op_within(state, op):
+    high, low, value = _pop_num(state), _pop_num(state), _pop_num(state)
+    state.stack.append(b"\x01" if low <= value < high else b"")
+
+# crypto
+_HASHES = {
+    0xa6: lambda data: RIPEMD160.new(data).digest(), 0xa7: lambda data: hashlib.sha1(data).digest(),
+    0xa8: lambda data: hashlib.sha256(data).digest(), 0xa9: hash160, 0xaa: hash256,
+}
+
+def _op_hash(state, op):
+    state.stack.append(_HASHES[op](state.stack.pop()))
+
+def _op_codeseparator(state, op):
+    state.codesep = state.pos
+
+def _script_code(state):
+    return state.script[state.codesep:]
+
+def _op_checksig(state, op):
+    stack = state.stack
+    pubkey = stack.pop()
+    signature = stack.pop()
+    valid = state.checker.check_sig(signature, pubkey, _script_code(state))
+    if op == 0xad: # OP_CHECKSIGVERIFY
+        if not valid:
+            raise ScriptError("OP_CHECKSIGVERIFY failed")
+    else:
+        stack.append(b"\x01" if valid else b"")
+
+def _op_checkmultisig(state, op):
+    # Stack: <dummy> <sig_1> .. <sig_m> m <key_1> .. <key_n> n
+    stack = state.stack
+    n = _pop_num(state)
+    if not 0 <= n <= MAX_PUBKEYS_PER_MULTISIG:
+        raise ScriptError("OP_CHECKMULTISIG key count out of range")
+    state.ops += n
+    if state.ops > MAX_OPS:
+        raise ScriptError("too many operations")
+    _need(stack, n + 1)
+    pubkeys = stack[len(stack) - n:]
+    del stack[len(stack) - n:]
+    m = _pop_num(state)
+    if not 0 <= m <= n:
+        raise ScriptError("OP_CHECKMULTISIG signature count out of range")
+    _need(stack, m + 1)
+    signatures = stack[len(stack) - m:]
+    del stack[len(stack) - m:]
+    if stack.pop(): # NULLDUMMY (BIP147)
+        raise ScriptError("OP_CHECKMULTISIG dummy must be empty")
+
+    # Signatures must appear in key order: a key that fails the current signature is never tried again (one ordered
+    # pass, as in Bitcoin Core), so m-of-n costs at most n verifications, and the pass stops as soon as the
+    # signatures left outnumber the keys left.
+    script_code = _script_code(state)
+    check_sig = state.checker.check_sig
+    sig, key = 0, 0
+    while sig < m and m - sig <= n - key:
+        if check_sig(signatures[sig], pubkeys[key], script_code):
+            sig += 1
+        key += 1
+    valid = sig == m
+
+    if op == 0xaf: # OP_CHECKMULTISIGVERIFY
+        if not valid:
+            raise ScriptError("OP_CHECKMULTISIGVERIFY failed")
+    else:
+        stack.append(b"\x01" if valid else b"")
+
+# lock times
+def _op_checklocktimeverify(state, op):
+    locktime = decode_num(state.stack[-1], 5)
+    if locktime < 0 or not state.checker.check_locktime(locktime):
+        raise ScriptError("OP_CHECKLOCKTIMEVERIFY failed")
+
+def _op_checksequenceverify(state, op):
+    sequence = decode_num(state.stack[-1], 5)
+    if sequence < 0:
+        raise ScriptError("OP_CHECKSEQUENCEVERIFY failed")
+    if not sequence & SEQUENCE_DISABLE_FLAG and not state.checker.check_sequence(sequence):
+        raise ScriptError("OP_CHECKSEQUENCEVERIFY failed")
+
+OPCODES = [_fail] * 256 # unknown opcodes, OP_RESERVED*, OP_VER, OP_RETURN, ...
+for _op in range(script.OP_1, script.OP_16 + 1):
+    OPCODES[_op] = _op_pushnum
+OPCODES[script.OP_1NEGATE] = _op_pushnum
+for _op, _handler in {
+    0x61: _op_nop, 0x63: _op_if, 0x64: _op_if, 0x67: _op_else, 0x68: _op_endif, 0x69: _op_verify,
+    0x6b: _op_toaltstack, 0x6c: _op_fromaltstack, 0x6d: _op_2drop, 0x6e: _op_2dup, 0x6f: _op_3dup,
+    0x70: _op_2over, 0x71: _op_2rot, 0x72: _op_2swap, 0x73: _op_ifdup, 0x74: _op_depth, 0x75: _op_drop,
+    0x76: _op_dup, 0x77: _op_nip, 0x78: _op_over, 0x79: _op_pick_roll, 0x7a: _op_pick_roll, 0x7b: _op_rot,
+    0x7c: _op_swap, 0x7d: _op_tuck, 0x82: _op_size, 0x87: _op_equal, 0x88: _op_equal, 0xa5: _op_within,
+    0xab: _op_codeseparator, 0xac: _op_checksig, 0xad: _op_checksig, 0xae: _op_checkmultisig,
+    0xaf: _op_checkmultisig,
+    0xb0: _op_nop, 0xb1: _op_checklocktimeverify, 0xb2: _op_checksequenceverify,
+}.items():
+    OPCODES[_op] = _handler
+for _op in _UNARY:
+    OPCODES[_op] = _op_unary
+for _op in _BINARY:
+    OPCODES[_op] = _op_binary
+for _op in _HASHES:
+    OPCODES[_op] = _op_hash
+for _op in range(0xb3, 0xba): # OP_NOP4 .. OP_NOP10
+    OPCODES[_op] = _op_nop
+# Disabled: fail even in an unexecuted branch.
+DISABLED = frozenset((0x7e, 0x7f, 0x80, 0x81, 0x83, 0x84, 0x85, 0x86, 0x8d, 0x8e, 0x95, 0x96, 0x97, 0x98, 0x99))
+# OP_VERIF, OP_VERNOTIF: inside the OP_IF .. OP_ENDIF range, so Bitcoin Core runs (and fails) them even when skipping.
+_VERIFS = frozenset((0x65, 0x66))
+_CONDITIONALS = frozenset((0x63, 0x64, 0x67, 0x68))
+
+def evaluate(script_bytes, stack, checker, sigversion=SIGVERSION_BASE):
+    """
+    Run a script. It is decoded once (helper.script.iterate) and its operations are run through OPCODES, a 256-entry
+    table of handlers acting on a stack of bytes, so an operation costs one list lookup and one call.
+
+    @param script_bytes: The script.
+    @type  script_bytes: bytes
+    @param stack       : Initial stack, modified in place.
+    @type  stack       : list of bytes
+    @param checker     : Signature and lock-time checks of the input.
+    @type  checker     : SignatureChecker
+    @param sigversion  : SIGVERSION_BASE or SIGVERSION_WITNESS_V0.
+    @type  sigversion  : int
+    @return            : The final stack.
+    @rtype             : list of bytes
+    @raise ScriptError : If the script fails.
+    """
+    if len(script_bytes) > MAX_SCRIPT_SIZE:
+        raise ScriptError("script too large")
+    state = _State(stack, checker, script_bytes, sigversion)
+    try:
+        for op, data, end in script.iterate(script_bytes):
+            if op <= script.OP_PUSHDATA4:
+                if data is None:
+                    if op != script.OP_0:
+                        raise ScriptError("push past the end of the script")
+                    data = b""
+                if len(data) > MAX_ELEMENT_SIZE:
+                    raise ScriptError("push larger than 520 bytes")
+                if not state.skipping:
+                    stack.append(data)
+            else:
+                if op > script.OP_16:
+                    state.ops += 1
+                    if state.ops > MAX_OPS:
+                        raise ScriptError("too many operations")
+                if op in DISABLED:
+                    raise ScriptError(f"{script.OPCODE_NAMES[op]} is disabled")
+                if op in _VERIFS:
+                    raise ScriptError(f"{script.OPCODE_NAMES[op]} is invalid, even unexecuted")
+                if not state.skipping or op in _CONDITIONALS:
+                    state.pos = end
+                    OPCODES[op](state, op)
+            if len(stack) + len(state.altstack) > MAX_STACK_SIZE:
+                raise ScriptError("stack too large")
+    except IndexError:
+        raise ScriptError("stack underflow") from None
+    if state.conditions:
+        raise ScriptError("unbalanced OP_IF")
+    return stack
+
+############
+## VERIFY ##
+############
+def _check_pkh(signature, pubkey, pubkey_hash, checker, script_code):
+    # OP_DUP OP_HASH160 <pubkey_hash> OP_EQUALVERIFY OP_CHECKSIG on the stack [signature, pubkey].
+    return hash160(pubkey) == pubkey_hash and checker.check_sig(signature, pubkey, script_code)
+
+def _verify_taproot(program, witness, tx, index):
+    if len(witness) >= 2 and witness[-1][:1] == bytes((ANNEX_TAG,)):
+        annex, witness = witness[-1], witness[:-1]
+    else:
+        annex = None
+    if len(witness) != 1:
+        return False # script path: tapscript is not supported
+    return TaprootChecker(tx, index, annex).check_schnorr(witness[0], program)
+
+def _verify_witness(version, program, witness, tx, index, amount):
+    if version == 1 and len(program) == 32:
+        return _verify_taproot(program, witness, tx, index)
+    if version != 0:
+        return False # future versions are not supported
+    checker = WitnessV0Checker(tx, index, amount)
+    if len(program) == 20: # P2WPKH
+        if len(witness) != 2:
+            return False
+        return _check_pkh(witness[0], witness[1], program, checker, sighash.p2wpkh_script_code(program))
+    if len(program) == 32: # P2WSH: the last witness item is the script, the others its initial stack
+        if not witness or hashlib.sha256(witness[-1]).digest() != program:
+            return False
+        stack = witness[:-1]
+        if any(len(item) > MAX_ELEMENT_SIZE for item in stack):
+            return False
+        stack = evaluate(witness[-1], stack, checker, SIGVERSION_WITNESS_V0)
+        return len(stack) == 1 and cast_to_bool(stack[0]) # clean stack is consensus for witness scripts
+    return False
+
+def _verify_p2sh(pushes, script_hash, witness, tx, index, amount):
+    if not pushes or hash160(pushes[-1]) != script_hash:
+        return False
+    redeem = pushes[-1]
+    program = witness_program(redeem)
+    if program is not None: # nested segwit: the scriptSig is the redeem script alone
+        if len(pushes) != 1 or program[0] != 0: # P2SH-wrapped v1 is not taproot
+            return False
+        return _verify_witness(*program, witness, tx, index, amount)
+    if witness:
+        return False
+    stack = evaluate(redeem, pushes[:-1], LegacyChecker(tx, index))
+    return bool(stack) and cast_to_bool(stack[-1])
+
+def verify(tx, index):
+    """
+    Run the scripts of one input: scriptSig, scriptPubKey, and the P2SH (BIP16), segwit v0 P2WPKH / P2WSH (BIP141)
+    and taproot key-path (BIP341) stages.
+
+    The standard templates take fast paths that do the same checks without the dispatch loop of `evaluate`: P2PKH
+    with a push-only scriptSig (hash160 of the key, then one signature check), P2WPKH, and P2SH (the scriptSig pushes
+    are taken as they are, the redeem script is hashed and then run or, for nested segwit, its witness verified).
+
+    Not supported (the input fails): taproot script-path spends (tapscript) and witness versions above 1. FindAndDelete
+    of the signature from a legacy script code is not done; no standard template has its signature in the script
+    code.
+
+    @param tx   : The spending transaction.
+    @type  tx   : helper.txn_model.Transaction
+    @param index: Index of the input in `tx.vin`.
+    @type  index: int
+    @return     : True if the input's scripts succeed.
+    @rtype      : bool
+    """
+    iN = tx.vin[index]
+    spk, scriptsig, witness, amount = iN.prevout.scriptpubkey, iN.scriptsig, iN.witness, iN.prevout.value
+    try:
+        ##############
+        # Fast paths #
+        ##############
+        if is_p2pkh(spk):
+            try:
+                pushes = push_data(scriptsig)
+            except ScriptError: # not push-only: legal for a legacy scriptSig, left to the generic path
+                pushes = None
+            if pushes is not None and len(pushes) == 2 and not witness:
+                return _check_pkh(pushes[0], pushes[1], spk[3:23], LegacyChecker(tx, index), spk)
+        elif is_p2sh(spk):
+            return _verify_p2sh(push_data(scriptsig), spk[2:22], witness, tx, index, amount)
+        program = witness_program(spk)
+        if program is not None:
+            return not scriptsig and _verify_witness(*program, witness, tx, index, amount)
+
+        ###########
+        # Generic #
+        ###########
+        stack = evaluate(scriptsig, [], LegacyChecker(tx, index))
+        stack = evaluate(spk, stack, LegacyChecker(tx, index))
+        return bool(stack) and cast_to_bool(stack[-1]) and not witness
+    except ScriptError:
+        return False
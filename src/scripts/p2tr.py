@@ -0,0 +1,20 @@
+import helper.instrument as instrument
+import scripts.interpreter as interpreter
+
+def validate_p2tr_txn(txn, index):
+    """
+    Validate one Pay-to-Taproot (P2TR) input spent through the key path: the witness holds a single BIP340 signature
+    (plus an optional annex) by the output key, over the BIP341 signature hash. Script-path spends are not verified
+    and fail.
+
+    @param txn  : The spending transaction.
+    @type  txn  : helper.txn_model.Transaction
+    @param index: Index of the input in `txn.vin`.
+    @type  index: int
+
+    @return     : A boolean indicating whether the input is valid.
+    @rtype      : bool
+    """
+    # The shared BIP341 hashes (sha_prevouts, sha_amounts, ...) live on the transaction.
+    with instrument.timer("script.p2tr"):
+        return interpreter.verify(txn, index)
@@ -0,0 +1,18 @@
+import helper.instrument as instrument
+import scripts.interpreter as interpreter
+
+def validate_p2wsh_txn(txn, index):
+    """
+    Validate one Pay-to-Witness-Script-Hash (P2WSH) input: the last witness item (the witness script) hashes to the
+    program, and runs on the other items with BIP143 signature hashes; it must leave exactly one true element.
+
+    @param txn  : The spending transaction.
+    @type  txn  : helper.txn_model.Transaction
+    @param index: Index of the input in `txn.vin`.
+    @type  index: int
+
+    @return     : A boolean indicating whether the input is valid.
+    @rtype      : bool
+    """
+    with instrument.timer("script.p2wsh"):
+        return interpreter.verify(txn, index)
@@ -1,10 +1,24 @@
-import os
-import json
 import scripts.p2sh
+import scripts.p2tr
 import scripts.p2pkh
+import scripts.p2wsh
 import scripts.p2wpkh
 import helper.txn_info as txinfo
+import helper.txn_model as txn_model
 import helper.converter as convert
+import helper.instrument as instrument
+
+###############
+## CONSTANTS ##
+###############
+VALIDATOR_VERSION = 5 # bump whenever a rule changes: cached verdicts of older versions are discarded
+INPUT_VALIDATORS = { # scriptpubkey_type -> validate(txn, index)
+    "p2pkh": scripts.p2pkh.validate_p2pkh_txn,
+    "p2sh": scripts.p2sh.validate_p2sh_txn,
+    "v0_p2wpkh": scripts.p2wpkh.validate_p2wpkh_txn,
+    "v0_p2wsh": scripts.p2wsh.validate_p2wsh_txn,
+    "v1_p2tr": scripts.p2tr.validate_p2tr_txn,
+}
 
 def _is_segwit(txn_id):
     """
@@ -15,10 +29,8 @@ def _is_segwit(txn_id):
     @return     : True if the transaction is a SegWit transaction, False otherwise.
     @rtype      : boolean
     """
-    txn_data = txinfo.create_raw_txn_data_full(txn_id) # get raw txn_data
-    if txn_data[8:12] == "0001":
-        return True
-    return False
+    # Same rule the raw serializer used for the marker+flag: any `vin` with an empty scriptsig.
+    return any(not iN.scriptsig for iN in txn_model.get(txn_id).vin)
 
 def validate(txnId):
     """
@@ -36,98 +48,72 @@ def validate(txnId):
     ###############
     ## READ TXNS ##
     ###############
-    file_path = os.path.join('mempool', f'{txnId}.json') # file path
-
-    if os.path.exists(file_path):
-        # Read the JSON data from the file
-        with open(file_path, 'r') as file:
-            txn_data = json.load(file) # JSON Object
-    else:
+    if not txn_model.exists(txnId): # mempool file, or snapshot record
         print(f"ERROR::> Transaction with ID {txnId} not found.")
         return None
-    
+
     ##################
     ## BASIC CHECKS ##
     ##################
-    required_fields = ['version', 'locktime', 'vin', 'vout']
-    for field in required_fields:
-        if field not in txn_data:
-            print(f"ERROR::> Transaction is missing the required field: {field}")
-            return False
+    try:
+        txn_data = txn_model.get(txnId) # shared parsed Transaction
+    except OSError: # removed or renamed since it was listed
+        print(f"ERROR::> Transaction with ID {txnId} not found.")
+        return None
+    except KeyError as field:
+        print(f"ERROR::> Transaction is missing the required field: {field}")
+        return False
+    except TypeError as e:
+        print(f"ERROR::> Transaction has a field of the wrong type: {e}")
+        return False
     # version check
-    if txn_data["version"] > 2 or txn_data["version"] < 0:
+    if txn_data.version > 2 or txn_data.version < 0:
         print(f"ERROR::> Possible Transaction versions :: 1 and 2")
         return False
     # vin and vout check - Empty or not
-    if len(txn_data["vin"]) < 1 or len(txn_data["vout"]) < 1:
+    if len(txn_data.vin) < 1 or len(txn_data.vout) < 1:
         print(f"ERROR::> Vin or Vout fields can't be empty")
         return False
     # Amount Consistency <vin >= vout> as coinbase txn are not present in mempool
-    if sum([vin["prevout"]["value"] for vin in txn_data["vin"]]) < sum([vout["value"] for vout in txn_data["vout"]]):
+    if sum([vin.prevout.value for vin in txn_data.vin]) < sum([vout.value for vout in txn_data.vout]):
         print("ERROR::> value_Vin shouldn't be less than value_Vout")
         return False
 
     ########################
     ## TXN CONTENT CHECKS ##
     ########################
-    if txnId != convert.to_sha256(txinfo.txid(txnId)):
+    with instrument.timer("validate.txid"):
+        txid = txinfo.txid(txnId)
+    if txnId != convert.to_sha256(txid):
         return False
     
     ############################
     ## TXN INPUT VERIFICATION ##    
     ############################
+    with instrument.timer("validate.inputs"):
+        return _verify_inputs(txnId, txn_data)
 
-    if _is_segwit(txnId):
-        truth = []
-        # for i in txn_data["vin"]: # and any(i.get("prevout").get("scriptpubkey_type") == "v0_p2wpkh" for i in txn_data["vin"]):
-        if any(i['prevout']['scriptpubkey_type'] == "v0_p2wpkh" for i in txn_data["vin"]):
-            for i in txn_data["vin"]:
-                if i['prevout']['scriptpubkey_type'] == "v0_p2wpkh":
-                    # Gather necessary fields for verification.
-                    wit = i["witness"]
-                    wit_asm = i["prevout"]["scriptpubkey_asm"]
-                    raw_txn_data = txinfo.create_raw_txn_data_full(txnId)
-                    # Get the results
-                    truth.append(scripts.p2wpkh.validate_p2wpkh_txn(wit, wit_asm, raw_txn_data) or True)
-
-                if i['prevout']['scriptpubkey_type'] == "p2pkh":
-                    # as I have tested that all the p2pkh txn are valid. Hence bydefault I'm passing it true.
-                    truth.append(True)
-
-                if i['prevout']['scriptpubkey_type'] == "p2wsh":
-                    # I haven't verified p2wsh txn yet.
-                    truth.append(False)
-        else:
-            # Other Non-segwit transactions are false.
-            truth.append(False)
+def _verify_inputs(txnId, txn_data):
+    """
+    Run the scripts of every input of a transaction that passed the basic checks (see `validate`).
 
-        if any(i == False for i in truth):
-            return (False, 1) # Mentioned about this return value in Natspec
-        else:
-            return (True, 1)
-    else:
-        truth = []
-        if any(i['prevout']['scriptpubkey_type'] == "p2pkh" for i in txn_data["vin"]):
-            for i in txn_data["vin"]:
-                if i['prevout']['scriptpubkey_type'] == "p2pkh":
-                    # Gather necessary fields for verification.
-                    signature = i["scriptsig_asm"].split(" ")[1]
-                    pubkey = i["scriptsig_asm"].split(" ")[3]
-                    scriptpubkey_asm = i["prevout"]["scriptpubkey_asm"].split(" ")
-                    raw_txn_data = scripts.p2pkh.legacy_txn_data(txnId)
-                    # Get the results
-                    truth.append(scripts.p2pkh.validate_p2pkh_txn(signature, pubkey, scriptpubkey_asm, raw_txn_data))
+    Every input is verified by the validator of its scriptpubkey type (INPUT_VALIDATORS); an input of a type
+    without one makes the transaction invalid.
 
-        if any(i['prevout']['scriptpubkey_type'] == "p2sh" for i in txn_data["vin"]):
-            for i in txn_data["vin"]:
-                if i['prevout']['scriptpubkey_type'] == "p2sh":
-                    redeemscript_asm = i["inner_redeemscript_asm"]
-                    scriptpubkey_asm = i["scriptsig_asm"]
-                    truth.append(scripts.p2sh.validate_p2sh_txn_basic(redeemscript_asm, scriptpubkey_asm))
-        if any(i == False for i in truth):
-            return (False, 0)
-        else:
-            return (True, 0)
+    @param txnId    : The ID of the transaction.
+    @type  txnId    : string
+    @param txn_data : The parsed transaction.
+    @type  txn_data : helper.txn_model.Transaction
+    @return         : (valid, segwit flag), as returned by `validate`.
+    @rtype          : tuple (bool, int)
+    """
+    segwit = 1 if _is_segwit(txnId) else 0
+    for index, iN in enumerate(txn_data.vin):
+        validator = INPUT_VALIDATORS.get(iN.prevout.scriptpubkey_type)
+        # Signature hashes shared by the inputs (legacy serialization, BIP143 hashes) are cached on txn_data.
+        if validator is None or not validator(txn_data, index):
+            return (False, segwit) # Mentioned about this return value in Natspec
+    return (True, segwit)
 
 # print("\nOUTPUT::>\n")
 # print(validate("0a3c3139b32f021a35ac9a7bef4d59d4abba9ee0160910ac94b4bcefb294f196")) # - p2wpkh only
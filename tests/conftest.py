@@ -0,0 +1,36 @@
+import os
+import sys
+import json
+import shutil
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import helper.txn_model as txn_model
+
+BUNDLED_MEMPOOL = os.path.join(ROOT, "mempool")
+
+@pytest.fixture
+def mempool(tmp_path, monkeypatch):
+    """
+    Empty mempool directory in a temporary working directory (txn_model reads MEMPOOL_DIR relative to it), with an
+    empty registry. Returns a function (name, data=None) that copies a bundled transaction into it, or writes
+    `data` as its JSON; `mempool.path` is the directory.
+    """
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / txn_model.MEMPOOL_DIR
+    path.mkdir()
+    txn_model.clear()
+
+    def add(name, data=None):
+        target = path / f"{name}.json"
+        if data is None:
+            shutil.copy(os.path.join(BUNDLED_MEMPOOL, f"{name}.json"), target)
+        else:
+            target.write_text(json.dumps(data))
+        return str(target)
+
+    add.path = str(path)
+    yield add
+    txn_model.use_snapshot(None)
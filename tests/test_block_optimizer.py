@@ -0,0 +1,98 @@
+"""
+block_optimizer.optimize: never worse than the greedy template, every block it returns is valid (parents first, no
+double spends, within the weight limit), and it stops at its deadline.
+"""
+import random
+import mempool_graph
+import block_template
+import block_optimizer
+import helper.txn_model as txn_model
+
+def _graph(*txns):
+    # txns: (name, fee, weight, spends); the txid of `name` is the name itself.
+    graph = mempool_graph.MempoolGraph()
+    for name, fee, weight, spends in txns:
+        graph.add(name, txn_model.Summary(name, name, name, (weight // 4, weight, weight / 4), fee, spends))
+    return graph
+
+def _random_graph(count, seed):
+    # Chains and fan-outs over a few confirmed outpoints, with some double spends.
+    rng = random.Random(seed)
+    txns = []
+    for i in range(count):
+        name = f"t{i:05d}"
+        if i and rng.random() < 0.3:
+            parent = txns[rng.randrange(i)][0]
+            spends = [(parent, rng.randrange(3))]
+        else:
+            spends = [(f"confirmed{rng.randrange(count)}", 0)]
+        txns.append((name, rng.randrange(100, 50000), rng.randrange(400, 4000, 4), spends))
+    return [name for name, _, _, _ in txns], _graph(*txns)
+
+def _check(block, fee, weight, txn_files, graph, max_weight):
+    assert len(set(block)) == len(block) and set(block) <= set(txn_files)
+    position = {name: i for i, name in enumerate(block)}
+    for name in block:
+        assert all(parent in position and position[parent] < position[name] for parent in graph.parents[name])
+        assert not graph.conflicts[name] & set(block)
+    assert fee == sum(graph.txns[name].fee for name in block)
+    assert weight == sum(graph.txns[name].weight[1] for name in block) <= max_weight
+
+def test_swap_beats_greedy():
+    # By feerate c then a go in, and b no longer fits; a + b pays more.
+    graph = _graph(("a", 600, 500, [("x", 0)]),
+                   ("b", 590, 500, [("y", 0)]),
+                   ("c", 130, 100, [("z", 0)]))
+    names = ["a", "b", "c"]
+    greedy = block_template.build_template(names, max_weight=1000, graph=graph)
+    assert greedy == (["c", "a"], 730, 600)
+    block, fee, weight = block_optimizer.optimize(names, seconds=5, max_weight=1000, graph=graph)
+    assert sorted(block) == ["a", "b"] and (fee, weight) == (1190, 1000)
+
+def test_eviction_makes_room():
+    # Two small leaves give way to one transaction that pays more than both.
+    graph = _graph(("a", 300, 400, [("x", 0)]),
+                   ("b", 300, 400, [("y", 0)]),
+                   ("c", 700, 800, [("z", 0)]))
+    block, fee, _ = block_optimizer.optimize(["a", "b", "c"], seconds=5, max_weight=800, start=["a", "b"], graph=graph)
+    assert block == ["c"] and fee == 700
+
+def test_blocks_stay_valid():
+    for seed in range(5):
+        names, graph = _random_graph(400, seed)
+        max_weight = 100000
+        greedy = block_template.build_template(names, max_weight=max_weight, graph=graph)
+        result = block_optimizer.optimize(names, seconds=5, max_weight=max_weight, graph=graph)
+        _check(*result, names, graph, max_weight)
+        assert result[1] >= greedy[1]
+
+def test_no_budget_returns_the_start():
+    names, graph = _random_graph(200, 7)
+    greedy = block_template.build_template(names, max_weight=50000, graph=graph)
+    assert block_optimizer.optimize(names, seconds=0, max_weight=50000, graph=graph) == greedy
+
+class _Clock:
+    """time.perf_counter stand-in that moves one second per look."""
+
+    def __init__(self):
+        self.now = 0
+
+    def perf_counter(self):
+        self.now += 1
+        return self.now
+
+def test_deadline(monkeypatch):
+    names, graph = _random_graph(20000, 11)
+    max_weight = 2000000
+    greedy = block_template.build_template(names, max_weight=max_weight, graph=graph)
+    clock = _Clock()
+    monkeypatch.setattr(block_optimizer, "time", clock)
+    block_optimizer.optimize(names, seconds=10 ** 9, max_weight=max_weight, start=greedy[0], graph=graph)
+    looks = clock.now
+    assert looks > 100
+    for budget in (0, 1, 10, looks // 2, looks - 2):
+        clock.now = 0
+        result = block_optimizer.optimize(names, seconds=budget, max_weight=max_weight, start=greedy[0], graph=graph)
+        assert clock.now <= budget + 1 # gave up at the first look past the deadline
+        _check(*result, names, graph, max_weight)
+        assert result[1] >= greedy[1]
@@ -0,0 +1,78 @@
+"""
+BlockProofs: txid proofs against the Merkle root and wtxid proofs against the witness commitment verify, tampered
+ones do not, and the JSON export holds a proof for every transaction.
+"""
+import json
+import random
+import pytest
+import block_proofs
+import coinbase_data
+import helper.merkle_root as merkle
+import helper.txn_info as txn_info
+
+P2WPKH = "000cb561188c762c81f76976f816829424e2af9e0e491c617b7bf41038df3d35"
+P2TR = "001035505afbf143e51bd667099190943a38eee20092bb691e72eaa44992b2f7"
+P2PKH = "00d12b523d8b7ad90e2269767478764c243625539dc59bcd457d14ca1aa4e38c"
+
+def _block(count, seed=0):
+    rng = random.Random(seed)
+    txids = [rng.randbytes(32).hex() for _ in range(count)]
+    wtxids = [coinbase_data.WTXID_COINBASE] + [rng.randbytes(32).hex() for _ in range(count - 1)]
+    proofs = block_proofs.BlockProofs(merkle.MerkleTree.from_txids(txids), merkle.MerkleTree.from_txids(wtxids))
+    return txids, wtxids, proofs
+
+@pytest.mark.parametrize("count", [1, 2, 7, 64])
+def test_txid_proofs(count):
+    txids, _, proofs = _block(count)
+    for index, txid in enumerate(txids):
+        proof = proofs.txid_proof(txid)
+        assert proof.index == index and proof.root == proofs.merkle_root and proof.verify()
+        assert merkle.merkle_root_from_branch(txid, [node.hex() for node in proof.branch], index) == \
+            proofs.merkle_root.hex()
+    with pytest.raises(KeyError):
+        proofs.txid_proof("00" * 32)
+
+def test_tampered_proofs_fail():
+    txids, wtxids, proofs = _block(9)
+    proof = proofs.txid_proof(txids[4])
+    other = merkle.MerkleProof(proof.leaf, proof.index ^ 1, proof.branch, proof.root)
+    assert not other.verify()
+    other = merkle.MerkleProof(proof.leaf, proof.index, proof.branch[:-1] + [bytes(32)], proof.root)
+    assert not other.verify()
+    witness = proofs.wtxid_proof(wtxids[4])
+    witness.commitment = bytes(32)
+    assert not witness.verify()
+
+def test_wtxid_proofs():
+    _, wtxids, proofs = _block(12)
+    for wtxid in wtxids[1:]:
+        proof = proofs.wtxid_proof(wtxid)
+        assert proof.verify() and proof.coinbase.index == 0
+    with pytest.raises(KeyError):
+        proofs.wtxid_proof(coinbase_data.WTXID_COINBASE)
+
+def test_commitment_of_a_mempool_block(mempool):
+    names = [P2WPKH, P2TR, P2PKH]
+    for name in names:
+        mempool(name)
+    tree = coinbase_data.witness_tree(names)
+    proofs = block_proofs.BlockProofs(merkle.MerkleTree.from_txids(["11" * 32] + [txn_info.txid(n) for n in names]),
+                                      tree)
+    assert proofs.commitment.hex() == coinbase_data.calculate_witness_commitment(names, tree)
+    for name in names:
+        assert proofs.wtxid_proof(txn_info.wtxid(name)).verify()
+        assert proofs.txid_proof(txn_info.txid(name)).verify()
+
+def test_export(tmp_path):
+    txids, wtxids, proofs = _block(5)
+    path = str(tmp_path / "proofs.json")
+    proofs.save(path)
+    with open(path) as file:
+        data = json.load(file)
+    assert data == proofs.to_dict()
+    assert data["merkle_root"] == proofs.merkle_root.hex()
+    assert sorted(data["txids"]) == sorted(txids) and sorted(data["wtxids"]) == sorted(wtxids[1:])
+    for txid, entry in data["txids"].items():
+        branch = [bytes.fromhex(node) for node in entry["branch"]]
+        proof = merkle.MerkleProof(bytes.fromhex(entry["leaf"]), entry["index"], branch, bytes.fromhex(entry["root"]))
+        assert proof.verify() and entry["leaf"] == merkle.leaf(txid).hex()
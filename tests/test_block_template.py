@@ -0,0 +1,63 @@
+"""
+block_template.build_template on hand-made graphs: ancestor packages, parents before children, and double spends.
+"""
+import mempool_graph
+import block_template
+import helper.txn_model as txn_model
+
+def _graph(*txns):
+    # txns: (name, fee, weight, spends); the txid of `name` is the name itself.
+    graph = mempool_graph.MempoolGraph()
+    for name, fee, weight, spends in txns:
+        graph.add(name, txn_model.Summary(name, name, name, (weight // 4, weight, weight / 4), fee, spends))
+    return graph
+
+def test_package_with_inner_double_spend_is_skipped():
+    # a and b spend the same confirmed outpoint; c spends both and pays for them.
+    graph = _graph(("a", 100, 400, [("x", 0)]),
+                   ("b", 100, 400, [("x", 0)]),
+                   ("c", 100000, 400, [("a", 0), ("b", 0)]))
+    assert graph.conflicts["a"] == {"b"}
+    block, fee, weight = block_template.build_template(["a", "b", "c"], graph=graph)
+    assert "c" not in block
+    assert len(block) == 1 and block[0] in ("a", "b")
+    assert (fee, weight) == (100, 400)
+
+def test_child_pays_for_parent():
+    # p alone is the worst feerate, but p + c beats m.
+    graph = _graph(("p", 100, 400, [("x", 0)]),
+                   ("c", 10000, 400, [("p", 0)]),
+                   ("m", 3000, 400, [("y", 0)]),
+                   ("n", 150, 400, [("z", 0)]))
+    block, fee, weight = block_template.build_template(["c", "m", "n", "p"], graph=graph)
+    assert block == ["p", "c", "m", "n"]
+    assert (fee, weight) == (13250, 1600)
+    block, fee, weight = block_template.build_template(["c", "m", "n", "p"], max_weight=800, graph=graph)
+    assert block == ["p", "c"] and (fee, weight) == (10100, 800)
+
+def test_ancestors_come_first():
+    # A chain whose last member pays for everything, and a child of two parents.
+    graph = _graph(("a", 10, 400, [("x", 0)]),
+                   ("b", 10, 400, [("a", 0)]),
+                   ("c", 50000, 400, [("b", 0)]),
+                   ("d", 10, 400, [("y", 0)]),
+                   ("e", 40000, 400, [("a", 1), ("d", 0)]))
+    block, fee, _ = block_template.build_template(["e", "d", "c", "b", "a"], graph=graph)
+    assert sorted(block) == ["a", "b", "c", "d", "e"] and fee == 90030
+    position = {name: i for i, name in enumerate(block)}
+    for child, parents in graph.parents.items():
+        assert all(position[parent] < position[child] for parent in parents)
+
+def test_child_of_a_missing_parent_is_left_out():
+    graph = _graph(("p", 100, 400, [("x", 0)]),
+                   ("c", 10000, 400, [("p", 0)]),
+                   ("m", 3000, 400, [("y", 0)]))
+    block, fee, _ = block_template.build_template(["c", "m"], graph=graph)
+    assert block == ["m"] and fee == 3000
+
+def test_only_one_of_two_double_spends():
+    graph = _graph(("a", 1000, 400, [("x", 0)]),
+                   ("b", 2000, 400, [("x", 0)]),
+                   ("c", 500, 400, [("a", 0)]))
+    block, fee, _ = block_template.build_template(["a", "b", "c"], graph=graph)
+    assert block == ["b"] and fee == 2000
@@ -0,0 +1,116 @@
+"""
+helper/instrument.py: timers, counters and gauges while enabled and nothing while disabled, worker deltas adding up to
+the serial numbers, and the JSON and Prometheus exports (label escaping, files replaced whole).
+"""
+import os
+import json
+import pytest
+import list_valid_txn
+import helper.instrument as instrument
+import helper.sigcache as sigcache
+import helper.txn_model as txn_model
+
+P2WPKH = "000cb561188c762c81f76976f816829424e2af9e0e491c617b7bf41038df3d35"
+P2TR = "001035505afbf143e51bd667099190943a38eee20092bb691e72eaa44992b2f7"
+P2PKH = "00d12b523d8b7ad90e2269767478764c243625539dc59bcd457d14ca1aa4e38c"
+
+@pytest.fixture
+def recording():
+    instrument.REGISTRY.clear()
+    instrument.enable()
+    yield instrument.REGISTRY
+    instrument.enable(False)
+    instrument.REGISTRY.clear()
+
+def test_disabled_records_nothing():
+    instrument.REGISTRY.clear()
+    assert not instrument.enabled()
+    assert instrument.timer("a") is instrument.timer("b") # one shared no-op
+    with instrument.timer("a"):
+        instrument.count("events")
+        instrument.gauge("level", 3)
+    assert instrument.take_delta() is None
+    instrument.merge(None)
+    data = instrument.report()
+    assert (data["stages"], data["counters"], data["gauges"]) == ({}, {}, {})
+
+def test_timers_counters_gauges(recording, monkeypatch):
+    now = iter([0.0, 1.0, 3.0, 3.5, 10.0, 11.0])
+    monkeypatch.setattr(instrument, "time", type("Clock", (), {"perf_counter": staticmethod(lambda: next(now))}))
+    with instrument.timer("outer"):
+        with instrument.timer("inner"):
+            pass
+        instrument.count("events", 4)
+        instrument.count("events")
+    with instrument.timer("inner"):
+        pass
+    instrument.gauge("level", 3)
+    instrument.gauge("level", 7)
+    data = instrument.report()
+    assert data["stages"] == {"inner": {"calls": 2, "seconds": 3.0, "max_seconds": 2.0},
+                              "outer": {"calls": 1, "seconds": 3.5, "max_seconds": 3.5}}
+    assert data["counters"] == {"events": 5} and data["gauges"] == {"level": 7}
+    assert list(data["stages"]) == sorted(data["stages"])
+
+def test_merge(recording):
+    recording.add_time("stage", 1.0)
+    recording.add_count("events", 2)
+    worker = instrument.Registry()
+    worker.add_time("stage", 3.0)
+    worker.add_time("stage", 0.5)
+    worker.add_time("other", 0.25)
+    worker.add_count("events", 5)
+    delta = worker.take_delta()
+    assert worker.take_delta() == ({}, {})
+    instrument.merge(delta)
+    assert recording.timers == {"stage": [3, 4.5, 3.0], "other": [1, 0.25, 0.25]}
+    assert recording.counters == {"events": 7}
+
+def test_workers_add_up_to_serial(mempool, recording):
+    for name in (P2WPKH, P2TR, P2PKH):
+        mempool(name)
+    reports = []
+    for workers in (1, 2):
+        txn_model.clear()
+        sigcache.SIGNATURE_CACHE.clear()
+        recording.clear()
+        assert len(list_valid_txn.list_valid_txn(workers=workers)) == 3
+        reports.append(instrument.report())
+    serial, pooled = reports
+    assert serial["counters"] == pooled["counters"]
+    assert serial["counters"]["txns.valid"] == 3 and serial["counters"]["txns.parsed"] >= 3
+    for name in ("validate.txn", "validate.inputs"):
+        assert serial["stages"][name]["calls"] == pooled["stages"][name]["calls"] == 3
+
+def test_prometheus_text(recording):
+    recording.add_time("validate.txn", 1.5)
+    recording.add_count('odd "name"\\\n', 2)
+    recording.set_gauge("block.fees", 1234)
+    lines = instrument.prometheus_text(prefix="p").splitlines()
+    assert 'p_stage_seconds_total{stage="validate.txn"} 1.5' in lines
+    assert 'p_stage_calls_total{stage="validate.txn"} 1' in lines
+    assert 'p_stage_max_seconds{stage="validate.txn"} 1.5' in lines
+    assert 'p_events_total{event="odd \\"name\\"\\\\\\n"} 2' in lines
+    assert 'p_value{name="block.fees"} 1234' in lines
+    assert f"p_started_seconds {recording.started!r}" in lines
+    for family in ("stage_seconds_total", "stage_calls_total", "stage_max_seconds", "events_total", "value",
+                   "started_seconds"):
+        assert sum(line.startswith(f"# TYPE p_{family} ") for line in lines) == 1
+    # every sample line is `name{labels} value` or `name value`
+    assert all(line.startswith("#") or len(line.rsplit(" ", 1)) == 2 for line in lines)
+
+def test_saved_files(recording, tmp_path):
+    recording.add_time("graph", 0.5)
+    recording.add_count("txns.valid", 9)
+    json_path = str(tmp_path / "metrics.json")
+    prom_path = str(tmp_path / "metrics.prom")
+    for path in (json_path, prom_path):
+        with open(path, "w") as file:
+            file.write("stale " * 1000)
+    instrument.save_json(json_path)
+    instrument.save_prometheus(prom_path)
+    with open(json_path) as file:
+        assert json.load(file) == instrument.report()
+    with open(prom_path) as file:
+        assert file.read() == instrument.prometheus_text()
+    assert sorted(os.listdir(tmp_path)) == ["metrics.json", "metrics.prom"] # no temporary file left behind
@@ -0,0 +1,116 @@
+"""
+Script vectors for scripts/interpreter.py, in the format of Bitcoin Core's src/test/data/script_tests.json:
+[scriptSig, scriptPubKey, flags, expected error, comment]. Both scripts run as Core runs them (scriptSig first, its
+stack handed to the scriptPubKey, which must leave a true top element); only OK or not OK is compared.
+"""
+import os
+import json
+import pytest
+import helper.script as script
+import helper.txn_model as txn_model
+import scripts.interpreter as interpreter
+
+VECTORS_FILE = os.path.join(os.path.dirname(__file__), "data", "script_tests.json")
+BUNDLED_MEMPOOL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mempool")
+P2PKH = "00d12b523d8b7ad90e2269767478764c243625539dc59bcd457d14ca1aa4e38c"
+
+# Core's opcode names: helper.script's table without the OP_ prefix, plus the names it spells differently.
+OPCODES = {name[3:]: op for op, name in enumerate(script.OPCODE_NAMES)
+           if not name.startswith(("OP_PUSHBYTES_", "OP_PUSHNUM_", "OP_RETURN_"))}
+OPCODES.update({"FALSE": 0x00, "TRUE": 0x51, "1NEGATE": 0x4f, "NOP2": 0xb1, "CHECKLOCKTIMEVERIFY": 0xb1,
+                "NOP3": 0xb2, "CHECKSEQUENCEVERIFY": 0xb2})
+
+class NoSignatureChecker(interpreter.SignatureChecker):
+    """No transaction: every signature and lock-time check fails."""
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(None, 0)
+
+    def check_sig(self, signature, pubkey, script_code):
+        return False
+
+    def check_locktime(self, locktime):
+        return False
+
+    def check_sequence(self, sequence):
+        return False
+
+def _push(data):
+    if len(data) < script.OP_PUSHDATA1:
+        return bytes([len(data)]) + data
+    if len(data) <= 0xff:
+        return bytes([script.OP_PUSHDATA1, len(data)]) + data
+    return bytes([script.OP_PUSHDATA2]) + len(data).to_bytes(2, "little") + data
+
+def parse_asm(text):
+    """
+    Core's test notation: decimal numbers are pushed as script numbers (OP_0, OP_1NEGATE and OP_1..OP_16 where they
+    fit), 0x<hex> is copied into the script as it is, 'text' is pushed, anything else is an opcode name.
+    """
+    out = bytearray()
+    for token in text.split():
+        if token.lstrip("-").isdigit():
+            number = int(token)
+            if number == 0:
+                out.append(script.OP_0)
+            elif number == -1 or 1 <= number <= 16:
+                out.append(script.OP_1 + number - 1 if number > 0 else script.OP_1NEGATE)
+            else:
+                out += _push(interpreter.encode_num(number))
+        elif token.startswith("0x"):
+            out += bytes.fromhex(token[2:])
+        elif len(token) >= 2 and token[0] == token[-1] == "'":
+            out += _push(token[1:-1].encode())
+        else:
+            out.append(OPCODES[token[3:] if token.startswith("OP_") else token])
+    return bytes(out)
+
+def run(script_sig, script_pubkey):
+    checker = NoSignatureChecker()
+    try:
+        stack = interpreter.evaluate(script_sig, [], checker)
+        stack = interpreter.evaluate(script_pubkey, stack, checker)
+    except interpreter.ScriptError:
+        return False
+    return bool(stack) and interpreter.cast_to_bool(stack[-1])
+
+def _vectors():
+    with open(VECTORS_FILE) as file:
+        entries = json.load(file)
+    return [pytest.param(*entry[:4], id=entry[4] if len(entry) > 4 else f"{entry[0]} | {entry[1]}"[:60])
+            for entry in entries if len(entry) >= 4] # one-element entries are comments
+
+@pytest.mark.parametrize("script_sig, script_pubkey, flags, expected", _vectors())
+def test_script_vectors(script_sig, script_pubkey, flags, expected):
+    assert run(parse_asm(script_sig), parse_asm(script_pubkey)) == (expected == "OK")
+
+@pytest.mark.parametrize("op", [0x65, 0x66])
+def test_verif_fails_unexecuted(op):
+    # OP_0 OP_IF OP_VERIF OP_ENDIF OP_1: rejected by Bitcoin Core although the branch is skipped.
+    with pytest.raises(interpreter.ScriptError):
+        interpreter.evaluate(bytes([0x00, 0x63, op, 0x68, 0x51]), [], NoSignatureChecker())
+
+def test_reserved_ok_unexecuted():
+    assert interpreter.evaluate(bytes.fromhex("006350006851"), [], NoSignatureChecker()) == [b"\x01"]
+
+def test_minimalif_witness_v0(monkeypatch):
+    # OP_IF OP_1 OP_ELSE OP_0 OP_ENDIF on a non-minimal true argument.
+    program = bytes([0x63, 0x51, 0x67, 0x00, 0x68])
+    assert interpreter.evaluate(program, [b"\x02"], NoSignatureChecker()) == [b"\x01"]
+    with pytest.raises(interpreter.ScriptError):
+        interpreter.evaluate(program, [b"\x02"], NoSignatureChecker(), interpreter.SIGVERSION_WITNESS_V0)
+    monkeypatch.setattr(interpreter, "MINIMALIF", False) # policy only
+    assert interpreter.evaluate(program, [b"\x02"], NoSignatureChecker(), interpreter.SIGVERSION_WITNESS_V0) == [b"\x01"]
+
+def test_p2pkh_scriptsig_not_push_only():
+    # A legacy scriptSig may run non-push operations: the P2PKH fast path hands it to the generic interpreter.
+    tx = txn_model.load(P2PKH, BUNDLED_MEMPOOL)
+    assert interpreter.verify(tx, 0)
+    scriptsig = tx.vin[0].scriptsig
+    tx.vin[0].scriptsig = bytes([0x61]) + scriptsig # OP_NOP first; the legacy sighash doesn't cover scriptSigs
+    assert interpreter.verify(tx, 0)
+    tx.vin[0].scriptsig = bytes([0x51, 0x75]) + scriptsig # OP_1 OP_DROP
+    assert interpreter.verify(tx, 0)
+    tx.vin[0].scriptsig = bytes([0x6a]) + scriptsig # OP_RETURN
+    assert not interpreter.verify(tx, 0)
@@ -0,0 +1,92 @@
+"""
+list_valid_txn: the mempool listing, and validation in this process or on a process pool.
+"""
+import os
+import json
+import pytest
+import list_valid_txn
+import mempool_graph
+import block_template
+import helper.sigcache as sigcache
+import helper.txn_model as txn_model
+import helper.txn_metrics as txn_metrics
+import helper.validation_cache as validation_cache
+
+BUNDLED_MEMPOOL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mempool")
+P2WPKH = "000cb561188c762c81f76976f816829424e2af9e0e491c617b7bf41038df3d35"
+PARENT = "ca2da85e7bce75821cf44d0e25a18769891af8d01f57a7d5ced4949566b263cd"
+CHILD = "0018c221bca3da35128baabe412a14c95b6864b2e6f7f7a8ffdd8eb0923dec49"
+P2TR = "001035505afbf143e51bd667099190943a38eee20092bb691e72eaa44992b2f7"
+GARBLED = "fe" * 32
+
+def _mixed_mempool(mempool):
+    # Bundled files of most script types, a parent and its child, a taproot spend with a bad signature (the witness
+    # is not part of the txid, so the file keeps its name) and a file with a field of the wrong type.
+    for name in sorted(os.listdir(BUNDLED_MEMPOOL))[:40]:
+        mempool(name[:-5])
+    for name in (PARENT, CHILD):
+        mempool(name)
+    with open(os.path.join(BUNDLED_MEMPOOL, f"{P2TR}.json")) as file:
+        data = json.load(file)
+    signature = data["vin"][0]["witness"][0]
+    data["vin"][0]["witness"][0] = signature[:-2] + ("00" if signature[-2:] != "00" else "01")
+    mempool(P2TR, data)
+    data["vin"][0]["prevout"]["value"] = "lots"
+    mempool(GARBLED, data)
+    return list_valid_txn.read_transactions()
+
+def _fresh():
+    txn_model.clear()
+    sigcache.SIGNATURE_CACHE.clear()
+
+def test_unreadable_mempool(mempool, tmp_path):
+    os.rmdir(mempool.path)
+    cache_file = tmp_path / "cache.json"
+    cache_file.write_text('{"format": 1, "validator_version": 0, "entries": {}}')
+    cache = validation_cache.ValidationCache(str(cache_file), 0)
+    assert list_valid_txn.read_transactions() == []
+    assert list_valid_txn.list_valid_txn(workers=1, result_cache=cache) == []
+    assert cache_file.read_text() == '{"format": 1, "validator_version": 0, "entries": {}}'
+
+def test_graph_needs_no_second_parse(mempool, monkeypatch):
+    names = [P2WPKH, PARENT, CHILD]
+    for name in names:
+        mempool(name)
+    verdicts = list_valid_txn.validate_files(names, workers=2)
+    assert all(verdicts[name][0] for name in names)
+
+    def no_parse(txn_id, mempool_dir=None):
+        raise AssertionError(f"{txn_id} parsed again")
+
+    monkeypatch.setattr(txn_model, "load", no_parse)
+    graph = mempool_graph.MempoolGraph(list_valid_txn.read_transactions())
+    assert graph.parents[CHILD] == {PARENT}
+    block, fees, _ = block_template.build_template(names, graph=graph)
+    assert block.index(PARENT) < block.index(CHILD)
+    assert fees == sum(txn_metrics.fees(name) for name in names)
+
+@pytest.mark.parametrize("workers, chunksize", [(2, None), (2, 1), (3, 7)])
+def test_pool_matches_serial(mempool, workers, chunksize):
+    names = _mixed_mempool(mempool)
+    serial = list_valid_txn.validate_files(names, workers=1)
+    assert serial[P2TR] == (False, 1) and serial[GARBLED] is False
+    assert serial[PARENT][0] and serial[CHILD][0]
+    primed = {name: txn_model.summary(name).txid for name in names if serial[name]}
+    _fresh()
+    pooled = list_valid_txn.validate_files(names, workers=workers, chunksize=chunksize)
+    assert pooled == serial
+    assert {name: txn_model.summary(name).txid for name in names if pooled[name]} == primed
+    _fresh()
+    assert list_valid_txn.list_valid_txn(workers=workers, chunksize=chunksize) == \
+        list_valid_txn.order_valid(names, serial)
+
+def test_batched_schnorr_matches_serial(mempool):
+    names = _mixed_mempool(mempool)
+    serial = list_valid_txn.validate_files(names, workers=1)
+    sigcache.use_backend("python")
+    try:
+        for workers in (1, 2):
+            _fresh()
+            assert list_valid_txn.validate_files(names, workers=workers, batch_schnorr=True) == serial
+    finally:
+        sigcache.use_backend(sigcache.DEFAULT_BACKEND)
@@ -0,0 +1,53 @@
+"""
+The projection loader (helper.txn_model.load): every bundled mempool file parses to the fields of its plain JSON, with
+scripts and witness items as bytes and the ASM strings disassembled back exactly as the JSON has them; orjson and
+stdlib json decode alike.
+"""
+import os
+import json
+import pytest
+import helper.txn_model as txn_model
+
+BUNDLED_MEMPOOL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mempool")
+P2WPKH = "000cb561188c762c81f76976f816829424e2af9e0e491c617b7bf41038df3d35"
+
+def _assert_output(out, data):
+    assert out.value == data["value"]
+    assert out.scriptpubkey == bytes.fromhex(data["scriptpubkey"])
+    assert out.scriptpubkey_type == data["scriptpubkey_type"]
+    assert out.scriptpubkey_asm == data["scriptpubkey_asm"]
+
+def test_every_file_matches_its_json():
+    for file_name in sorted(os.listdir(BUNDLED_MEMPOOL)):
+        txn_id = file_name[:-len(".json")]
+        with open(os.path.join(BUNDLED_MEMPOOL, file_name)) as file:
+            data = json.load(file)
+        tx = txn_model.load(txn_id, BUNDLED_MEMPOOL)
+        assert (tx.txn_id, tx.version, tx.locktime) == (txn_id, data["version"], data["locktime"])
+        assert len(tx.vin) == len(data["vin"]) and len(tx.vout) == len(data["vout"])
+        for iN, entry in zip(tx.vin, data["vin"]):
+            assert (iN.txid, iN.vout, iN.sequence) == (entry["txid"], entry["vout"], entry["sequence"])
+            assert iN.scriptsig == bytes.fromhex(entry["scriptsig"])
+            assert iN.witness == [bytes.fromhex(item) for item in entry.get("witness") or ()]
+            assert iN.scriptsig_asm == entry["scriptsig_asm"]
+            assert iN.inner_redeemscript_asm == entry.get("inner_redeemscript_asm")
+            assert iN.inner_witnessscript_asm == entry.get("inner_witnessscript_asm")
+            _assert_output(iN.prevout, entry["prevout"])
+        for out, entry in zip(tx.vout, data["vout"]):
+            _assert_output(out, entry)
+
+def test_unused_fields_are_dropped():
+    tx = txn_model.load(P2WPKH, BUNDLED_MEMPOOL)
+    for obj, field in ((tx.vout[0], "scriptpubkey_address"), (tx.vin[0], "is_coinbase")):
+        with pytest.raises(AttributeError):
+            getattr(obj, field)
+    assert not hasattr(tx.vin[0], "__dict__") # __slots__ only
+
+def test_json_backends_agree(monkeypatch):
+    with open(os.path.join(BUNDLED_MEMPOOL, f"{P2WPKH}.json"), "rb") as file:
+        raw = file.read()
+    decoded = txn_model.loads(raw)
+    monkeypatch.setattr(txn_model, "orjson", None)
+    assert txn_model.loads(raw) == decoded == json.loads(raw)
+    with pytest.raises(ValueError):
+        txn_model.loads(raw[:-2])
@@ -0,0 +1,84 @@
+"""
+MempoolGraph: links made in any arrival order, conflicts, removal, topological order and orphaned transactions;
+then the parent and child of the bundled mempool.
+"""
+import itertools
+import mempool_graph
+import helper.txn_model as txn_model
+
+PARENT = "ca2da85e7bce75821cf44d0e25a18769891af8d01f57a7d5ced4949566b263cd"
+CHILD = "0018c221bca3da35128baabe412a14c95b6864b2e6f7f7a8ffdd8eb0923dec49"
+
+# name -> spends; the txid of `name` is the name itself. d double spends c's first input.
+TXNS = {
+    "a": [("x", 0)],
+    "b": [("a", 0)],
+    "c": [("a", 1), ("y", 0)],
+    "d": [("b", 0), ("a", 1)],
+    "e": [("d", 0), ("c", 0)],
+}
+
+def _summary(name):
+    return txn_model.Summary(name, name, name, (100, 400, 100.0), 1000, TXNS[name])
+
+def _graph(names):
+    graph = mempool_graph.MempoolGraph()
+    for name in names:
+        graph.add(name, _summary(name))
+    return graph
+
+def _edges(graph):
+    return ({name: set(p) for name, p in graph.parents.items()}, {name: set(c) for name, c in graph.children.items()},
+            {name: set(c) for name, c in graph.conflicts.items()})
+
+def test_links_do_not_depend_on_arrival_order():
+    expected = _edges(_graph(TXNS))
+    assert expected[0] == {"a": set(), "b": {"a"}, "c": {"a"}, "d": {"a", "b"}, "e": {"c", "d"}}
+    assert expected[2] == {"a": set(), "b": set(), "c": {"d"}, "d": {"c"}, "e": set()}
+    for order in itertools.permutations(TXNS):
+        assert _edges(_graph(order)) == expected
+    graph = _graph(TXNS)
+    assert graph.spender("a", 1) == {"c", "d"}
+    assert graph.spender("a", 5) == set()
+    assert graph.ancestors("e") == {"a", "b", "c", "d"}
+    assert graph.descendants("b") == {"d", "e"}
+
+def test_topological_order():
+    graph = _graph(reversed(list(TXNS)))
+    for names in (None, ["e", "d", "c", "b", "a"], ["e", "c", "a"], ["d", "b"]):
+        order = list(graph.topological(names))
+        assert sorted(order) == sorted(names or TXNS)
+        position = {name: i for i, name in enumerate(order)}
+        for name in order:
+            assert all(position[p] < position[name] for p in graph.parents[name] if p in position)
+    # ties keep the given order
+    assert list(graph.topological(["c", "b", "a"])) == ["a", "c", "b"]
+    assert list(graph.topological(["b", "c", "a"])) == ["a", "b", "c"]
+
+def test_orphaned():
+    graph = _graph(TXNS)
+    assert graph.orphaned(TXNS) == set()
+    assert graph.orphaned(["a", "c", "d", "e"]) == {"d", "e"}
+    assert graph.orphaned(["b", "c"]) == {"b", "c"}
+    assert graph.orphaned(["a", "b", "d"]) == set()
+
+def test_remove_and_add_back():
+    graph = _graph(TXNS)
+    before = _edges(graph)
+    graph.remove("a")
+    assert "a" not in graph and len(graph) == 4
+    assert graph.parents["b"] == set() and graph.parents["c"] == set()
+    assert graph.spender("x", 0) == set()
+    graph.remove("d")
+    assert graph.conflicts["c"] == set() and graph.parents["e"] == {"c"}
+    graph.add("d", _summary("d"))
+    graph.add("a", _summary("a"))
+    assert _edges(graph) == before
+
+def test_bundled_parent_and_child(mempool):
+    mempool(PARENT)
+    mempool(CHILD)
+    graph = mempool_graph.MempoolGraph([CHILD, PARENT])
+    assert graph.parents[CHILD] == {PARENT} and graph.children[PARENT] == {CHILD}
+    assert list(graph.topological([CHILD, PARENT])) == [PARENT, CHILD]
+    assert graph.orphaned([CHILD]) == {CHILD}
@@ -0,0 +1,84 @@
+"""
+MerkleTree: roots against a block of the main chain and a from-scratch computation, and trees edited with replace,
+append and remove keeping exactly the levels of a tree rebuilt from their leaves.
+"""
+import random
+import hashlib
+import pytest
+import helper.merkle_root as merkle
+
+# Block 100000 of the main chain.
+BLOCK_100000_TXIDS = [
+    "8c14f0db3df150123e6f3dbbf30f8b955a8249b62ac1d1ff16284aefa3d06d87",
+    "fff2525b8931402dd09222c50775608f75787bd2b87e56995a7bdd30f79702c4",
+    "6359f0868171b1d194cbee1af2f16ea598ae8fad666d9b012c8ed2b79a236ec4",
+    "e9a66845e05d5abc0ad04ec80f774a7e585c6e8db975962d069a522137b80c1d",
+]
+BLOCK_100000_ROOT = "f3e94742aca4b5ef85488dc37c06c3282295ffec960994b2c0d5ac2a25a95766"
+
+def reference_root(leaves):
+    level = list(leaves)
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [hashlib.sha256(hashlib.sha256(level[i] + level[i + 1]).digest()).digest()
+                 for i in range(0, len(level), 2)]
+    return level[0] if level else None
+
+def _leaves(rng, count):
+    return [rng.randbytes(32) for _ in range(count)]
+
+def _assert_rebuilt(tree):
+    assert tree.levels == merkle.MerkleTree(tree.leaves).levels
+
+def test_block_100000():
+    assert merkle.MerkleTree.from_txids(BLOCK_100000_TXIDS).root[::-1].hex() == BLOCK_100000_ROOT
+    assert merkle.merkle_root_calculator(BLOCK_100000_TXIDS) == bytes.fromhex(BLOCK_100000_ROOT)[::-1].hex()
+
+@pytest.mark.parametrize("count", [0, 1, 2, 3, 5, 8, 13, 64, 100])
+def test_root_matches_reference(count):
+    leaves = _leaves(random.Random(count), count)
+    tree = merkle.MerkleTree(leaves)
+    assert tree.root == reference_root(leaves)
+    assert len(tree) == count
+
+def test_replace_append_remove():
+    rng = random.Random(1)
+    tree = merkle.MerkleTree()
+    assert tree.root is None
+    for _ in range(300):
+        action = rng.random()
+        if action < 0.45 or len(tree) < 2:
+            tree.append(rng.randbytes(32))
+        elif action < 0.75:
+            tree.replace(rng.randrange(len(tree)), rng.randbytes(32))
+        else:
+            index = rng.choice((0, len(tree) - 1, rng.randrange(len(tree))))
+            leaf = tree.leaves[index]
+            assert tree.remove(index) == leaf
+        _assert_rebuilt(tree)
+        assert tree.root == reference_root(tree.leaves)
+    while len(tree):
+        tree.remove(rng.randrange(len(tree)))
+        _assert_rebuilt(tree)
+    assert tree.root is None
+
+def test_replace_rehashes_one_path(monkeypatch):
+    tree = merkle.MerkleTree(_leaves(random.Random(2), 1000))
+    calls = []
+    hash_pair = merkle._hash_pair
+    monkeypatch.setattr(merkle, "_hash_pair", lambda left, right: calls.append(1) or hash_pair(left, right))
+    tree.replace(0, bytes(32))
+    assert len(calls) == 10 # ceil(log2(1000)) levels above the leaves
+    calls.clear()
+    tree.append(bytes(32))
+    assert len(calls) == 10
+    _assert_rebuilt(tree)
+
+def test_coinbase_branch():
+    txids = [random.Random(3).randbytes(32).hex()] + BLOCK_100000_TXIDS[1:]
+    branch = merkle.merkle_branch(BLOCK_100000_TXIDS)
+    # The branch of the coinbase does not depend on it: any coinbase folds into that block's root.
+    root = merkle.merkle_root_calculator(BLOCK_100000_TXIDS)
+    assert merkle.merkle_root_from_branch(BLOCK_100000_TXIDS[0], branch) == root
+    assert merkle.merkle_root_from_branch(txids[0], branch) == merkle.merkle_root_calculator(txids)
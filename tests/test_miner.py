@@ -0,0 +1,94 @@
+"""
+The nonce search: the midstate header hash matches a plain double SHA256, scan() returns the first qualifying nonce
+and counts its hashes, MiningPool worker processes find the same nonce as a serial scan, stay up across the work
+units of mine_rolling, and a worker that dies without reporting makes the search fail instead of hang.
+"""
+import os
+import hashlib
+import threading
+import pytest
+import miner
+
+HEADER = bytes(range(76))
+EASY = 1 << 250 # about one header in 64 qualifies
+
+def _first(header_wo_nonce, target, start=0, stop=1 << 16):
+    for nonce in range(start, stop):
+        if miner.HeaderHasher(header_wo_nonce).hash(nonce)[::-1] <= miner.target_bytes(target):
+            return nonce
+    return None
+
+def _die(header_wo_nonce, target, start, stop, cancel=None):
+    os._exit(3)
+
+def test_midstate_hash_matches_hashlib():
+    hasher = miner.HeaderHasher(HEADER)
+    for nonce in (0, 1, 0x12345678, 0xFFFFFFFF, 1): # the midstate is copied, never advanced
+        header = HEADER + nonce.to_bytes(4, "little")
+        assert hasher.hash(nonce) == hashlib.sha256(hashlib.sha256(header).digest()).digest()
+
+def test_scan_counts_and_cancels():
+    nonce = _first(HEADER, EASY)
+    assert miner.scan(HEADER, EASY, 0, 1 << 16) == (nonce, nonce + 1)
+    assert miner.scan(HEADER, EASY, nonce + 1, 1 << 16)[0] == _first(HEADER, EASY, nonce + 1)
+    assert miner.scan(HEADER, 0, 10, 300) == (None, 290)
+    cancel = threading.Event()
+    cancel.set()
+    assert miner.scan(HEADER, 0, 0, 1 << 20, cancel) == (None, miner.CHECK_INTERVAL) # checked after every interval
+
+def test_serial_pool_matches_scan():
+    with miner.MiningPool(1) as pool:
+        nonce, stats = pool.search(HEADER, EASY, 0, 1 << 16)
+    assert nonce == _first(HEADER, EASY)
+    assert stats[0]["hashes"] == nonce + 1
+
+def test_workers_find_a_valid_nonce():
+    nonce, stats = miner.mine(HEADER, EASY, workers=2, start=0, stop=1 << 16)
+    assert nonce is not None
+    assert miner.HeaderHasher(HEADER).hash(nonce)[::-1] <= miner.target_bytes(EASY)
+    assert [s["worker"] for s in stats] == [0, 1]
+
+def test_exhausted_range():
+    nonce, stats = miner.mine(HEADER, 0, workers=2, start=0, stop=256)
+    assert nonce is None
+    assert sum(s["hashes"] for s in stats) == 256
+
+def test_pool_is_reused_between_searches():
+    with miner.MiningPool(2) as pool:
+        pids = [proc.pid for proc in pool._procs]
+        for i in range(3):
+            header = bytes([i]) + HEADER[1:]
+            nonce, _ = pool.search(header, EASY, 0, 1 << 16)
+            assert nonce is not None
+            assert [proc.pid for proc in pool._procs] == pids
+    assert not pool._procs
+
+def test_rolling_uses_one_pool(monkeypatch):
+    pools = []
+    real = miner.MiningPool
+
+    def counting(*args, **kwargs):
+        pools.append(real(*args, **kwargs))
+        return pools[-1]
+
+    monkeypatch.setattr(miner, "MiningPool", counting)
+    make_header = lambda extranonce, version, timestamp: bytes([extranonce, version & 0xff]) + HEADER[2:]
+    work, _ = miner.mine_rolling(make_header, 1 << 248, 0, 0, workers=2, version_rolls=1, time_rolls=0,
+                                 max_extranonce=20, start=0, stop=64)
+    assert work is not None and work["extranonce"] > 0
+    assert len(pools) == 1
+
+def test_dead_worker_raises(monkeypatch):
+    monkeypatch.setitem(miner.BACKENDS, "dies", _die)
+    monkeypatch.setattr(miner, "RESULT_TIMEOUT", 0.1)
+    with pytest.raises(RuntimeError, match="exited with code 3"):
+        miner.mine(HEADER, EASY, workers=2, start=0, stop=1 << 16, backend="dies")
+
+def test_rolled_versions_carry_bip9_top_bits():
+    assert miner.roll_version(4, 0) == 0x20000004
+    assert miner.roll_version(4, 0xffff) == 0x3fffe004
+    assert miner.roll_version(0xe0000004, 1) == 0x20002004
+    versions = {version for _, version, _ in miner._work_units(4, 0, 1 << 16, 0, 0)}
+    assert len(versions) == 1 << 16
+    assert all(v & miner.VERSIONBITS_TOP_MASK == miner.VERSIONBITS_TOP_BITS and v & 0xfff == 4 for v in versions)
+    assert [version for _, version, _ in miner._work_units(4, 0, 1, 0, 0)] == [4] # no rolling: left alone
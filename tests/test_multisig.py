@@ -0,0 +1,147 @@
+"""
+OP_CHECKMULTISIG: signatures are matched to keys in one ordered pass, the dummy element must be empty (BIP147), and
+keys left over after the last signature are never tried. Checked on the interpreter with a checker that accepts
+chosen (signature, key) pairs, then end to end through scripts/p2sh.py and scripts/p2wsh.py with real signatures.
+"""
+import hashlib
+import pytest
+import helper.sighash as sighash
+import helper.txn_model as txn_model
+import scripts.interpreter as interpreter
+import scripts.p2sh as p2sh
+import scripts.p2wsh as p2wsh
+try:
+    import coincurve
+except ImportError: # optional dependency
+    coincurve = None
+
+OP_CHECKMULTISIG = 0xae
+KEYS = [bytes([2]) + bytes([i]) * 32 for i in range(1, 6)] # stand-ins: the checker never parses them
+SIGS = {key: b"sig-" + key[1:2] for key in KEYS}
+
+class PairChecker(interpreter.SignatureChecker):
+    """Accepts SIGS[key] for `key` only, and records every check."""
+    __slots__ = ("calls",)
+
+    def __init__(self):
+        super().__init__(None, 0)
+        self.calls = []
+
+    def check_sig(self, signature, pubkey, script_code):
+        self.calls.append((signature, pubkey))
+        return SIGS.get(pubkey) == signature
+
+def _push(data):
+    return bytes([len(data)]) + data
+
+def _number(n):
+    return bytes([interpreter.script.OP_1 + n - 1]) if n else b"\x00"
+
+def multisig_script(m, keys):
+    return _number(m) + b"".join(_push(key) for key in keys) + _number(len(keys)) + bytes([OP_CHECKMULTISIG])
+
+def run(signatures, m, keys, dummy=b""):
+    checker = PairChecker()
+    stack = [dummy] + list(signatures)
+    result = interpreter.evaluate(multisig_script(m, keys), stack, checker)
+    return result == [b"\x01"], checker.calls
+
+def test_signatures_in_key_order():
+    valid, calls = run([SIGS[KEYS[0]], SIGS[KEYS[1]]], 2, KEYS[:3])
+    assert valid and len(calls) == 2
+
+def test_skipped_key():
+    valid, calls = run([SIGS[KEYS[0]], SIGS[KEYS[2]]], 2, KEYS[:3])
+    assert valid and len(calls) == 3
+
+def test_out_of_order_signatures():
+    valid, calls = run([SIGS[KEYS[1]], SIGS[KEYS[0]]], 2, KEYS[:3])
+    assert not valid
+    assert len(calls) <= 3 and len(set(key for _, key in calls)) == len(calls) # every key tried at most once
+
+def test_trailing_keys_not_tried():
+    valid, calls = run([SIGS[KEYS[0]], SIGS[KEYS[1]]], 2, KEYS)
+    assert valid
+    assert [key for _, key in calls] == KEYS[:2]
+
+def test_gives_up_when_signatures_outnumber_keys():
+    # The first key matches neither signature: one key left for two signatures after the second check.
+    valid, calls = run([b"bad", b"bad"], 2, KEYS[:3])
+    assert not valid and len(calls) == 2
+
+def test_at_most_n_checks():
+    for m in range(1, 6):
+        _, calls = run([SIGS[KEYS[-1]]] * m, m, KEYS)
+        assert len(calls) <= len(KEYS)
+
+@pytest.mark.parametrize("dummy", [b"\x00", b"\x01", b"\x80"])
+def test_nonempty_dummy(dummy):
+    with pytest.raises(interpreter.ScriptError):
+        run([SIGS[KEYS[0]]], 1, KEYS[:2], dummy=dummy)
+
+def test_zero_of_n():
+    valid, calls = run([], 0, KEYS[:3])
+    assert valid and not calls
+
+################
+## END TO END ##
+################
+needs_coincurve = pytest.mark.skipif(coincurve is None, reason="signing needs coincurve")
+PRIVATE = [coincurve.PrivateKey(hashlib.sha256(b"multisig %d" % i).digest()) for i in range(3)] if coincurve else []
+PUBKEYS = [key.public_key.format() for key in PRIVATE]
+REDEEM = multisig_script(2, PUBKEYS) # 2-of-3
+AMOUNT = 100000
+
+def _transaction(spk, spk_type, scriptsig=b"", witness=()):
+    prevout = txn_model.TxOut(AMOUNT, spk, spk_type)
+    vin = [txn_model.TxIn("11" * 32, 0, prevout, scriptsig, list(witness), 0xffffffff)]
+    vout = [txn_model.TxOut(AMOUNT - 1000, bytes.fromhex("0014") + b"\x22" * 20, "v0_p2wpkh")]
+    return txn_model.Transaction("multisig-test", 2, 0, vin, vout)
+
+def _sign(digest, signers):
+    return [PRIVATE[i].sign(digest, hasher=None) + bytes([sighash.SIGHASH_ALL]) for i in signers]
+
+def p2wsh_spend(signers, dummy=b"", witness_script=REDEEM):
+    spk = b"\x00\x20" + hashlib.sha256(witness_script).digest()
+    digest = _transaction(spk, "v0_p2wsh").bip143.digest(0, witness_script, AMOUNT, sighash.SIGHASH_ALL)
+    return _transaction(spk, "v0_p2wsh", witness=[dummy] + _sign(digest, signers) + [witness_script])
+
+def p2sh_spend(signers, dummy=b""):
+    spk = b"\xa9\x14" + interpreter.hash160(REDEEM) + b"\x87"
+    digest = _transaction(spk, "p2sh").legacy.digest(0, REDEEM, sighash.SIGHASH_ALL)
+    pushes = [dummy] + _sign(digest, signers) + [REDEEM]
+    scriptsig = b"".join(b"\x00" if not item else (_push(item) if len(item) < 0x4c else b"\x4c" + _push(item))
+                         for item in pushes)
+    return _transaction(spk, "p2sh", scriptsig=scriptsig)
+
+@needs_coincurve
+@pytest.mark.parametrize("spend, validate", [(p2wsh_spend, p2wsh.validate_p2wsh_txn), (p2sh_spend, p2sh.validate_p2sh_txn)])
+class TestEndToEnd:
+    def test_in_order(self, spend, validate):
+        assert validate(spend([0, 1]), 0)
+        assert validate(spend([0, 2]), 0)
+        assert validate(spend([1, 2]), 0)
+
+    def test_out_of_order(self, spend, validate):
+        assert not validate(spend([1, 0]), 0)
+        assert not validate(spend([2, 0]), 0)
+
+    def test_nonempty_dummy(self, spend, validate):
+        assert not validate(spend([0, 1], dummy=b"\x00"), 0)
+
+    def test_too_few_signatures(self, spend, validate):
+        assert not validate(spend([0]), 0)
+
+    def test_same_signature_twice(self, spend, validate):
+        assert not validate(spend([0, 0]), 0)
+
+@needs_coincurve
+def test_p2wsh_wrong_script_hash():
+    tx = p2wsh_spend([0, 1])
+    tx.vin[0].witness[-1] = multisig_script(1, PUBKEYS)
+    assert not p2wsh.validate_p2wsh_txn(tx, 0)
+
+@needs_coincurve
+def test_p2wsh_trailing_keys():
+    # 1-of-3 signed by the first key: the two keys after it are never needed.
+    assert p2wsh.validate_p2wsh_txn(p2wsh_spend([0], witness_script=multisig_script(1, PUBKEYS)), 0)
@@ -0,0 +1,191 @@
+"""
+helper/secp256k1.py: the BIP340 test vectors (tests/data/bip340_test_vectors.csv, from the BIPs repository), single
+and batched, and ECDSA edge cases (high S, non-strict DER, keys off the curve) with the outcome libsecp256k1 gives;
+the cases are also run through coincurve when it is installed, so the two implementations are compared directly.
+"""
+import os
+import csv
+import hashlib
+import pytest
+import helper.secp256k1 as secp256k1
+try:
+    import coincurve
+except ImportError: # optional dependency
+    coincurve = None
+
+VECTORS_FILE = os.path.join(os.path.dirname(__file__), "data", "bip340_test_vectors.csv")
+needs_coincurve = pytest.mark.skipif(coincurve is None, reason="comparison with coincurve")
+
+def _bip340_vectors():
+    with open(VECTORS_FILE) as file:
+        return [pytest.param(bytes.fromhex(row["public key"]), bytes.fromhex(row["message"]),
+                             bytes.fromhex(row["signature"]), row["verification result"] == "TRUE",
+                             id=f"{row['index']} {row['comment']}".strip()) for row in csv.DictReader(file)]
+
+def schnorr_outcome(pubkey, message, signature):
+    try:
+        return secp256k1.verify_schnorr(secp256k1.parse_xonly(pubkey), signature, message)
+    except ValueError:
+        return False
+
+############
+## BIP340 ##
+############
+@pytest.mark.parametrize("pubkey, message, signature, expected", _bip340_vectors())
+def test_bip340_vectors(pubkey, message, signature, expected):
+    assert schnorr_outcome(pubkey, message, signature) == expected
+
+def test_bip340_batch():
+    vectors = [param.values for param in _bip340_vectors()]
+    valid = [(secp256k1.parse_xonly(pubkey), signature, message) for pubkey, message, signature, ok in vectors if ok]
+    assert secp256k1.verify_schnorr_batch(valid)
+    assert secp256k1.verify_schnorr_batch(valid + valid) # repeats
+    for pubkey, message, signature, ok in vectors:
+        if ok or secp256k1.lift_x(int.from_bytes(pubkey, "big")) is None:
+            continue # keys off the curve do not parse, so they never reach a batch
+        bad = (secp256k1.parse_xonly(pubkey), signature, message)
+        assert not secp256k1.verify_schnorr_batch(valid[:2] + [bad] + valid[2:])
+
+###########
+## ECDSA ##
+###########
+SECRET = int.from_bytes(hashlib.sha256(b"secp256k1 test key").digest(), "big") % secp256k1.N
+DIGEST = hashlib.sha256(b"secp256k1 test message").digest()
+
+def _point(scalar):
+    return secp256k1._to_affine([secp256k1._multiply([], scalar)])[0]
+
+def _der_int(value):
+    data = value.to_bytes(33, "big").lstrip(b"\x00")
+    if not data or data[0] & 0x80:
+        data = b"\x00" + data
+    return b"\x02" + bytes([len(data)]) + data
+
+def _der(r, s):
+    body = _der_int(r) + _der_int(s)
+    return b"\x30" + bytes([len(body)]) + body
+
+def _sign(secret=SECRET, digest=DIGEST):
+    # (r, low s) with a deterministic nonce: enough for tests, not RFC 6979.
+    nonce = int.from_bytes(hashlib.sha256(secret.to_bytes(32, "big") + digest).digest(), "big") % secp256k1.N
+    r = _point(nonce)[0] % secp256k1.N
+    s = pow(nonce, -1, secp256k1.N) * (int.from_bytes(digest, "big") + r * secret) % secp256k1.N
+    return r, min(s, secp256k1.N - s)
+
+X, Y = _point(SECRET)
+COMPRESSED = bytes([2 | Y & 1]) + X.to_bytes(32, "big")
+UNCOMPRESSED = b"\x04" + X.to_bytes(32, "big") + Y.to_bytes(32, "big")
+R, S = _sign()
+SIGNATURE = _der(R, S)
+
+def ecdsa_outcome(pubkey, signature, digest=DIGEST):
+    # "valid", "invalid" (parses, does not verify) or "malformed" (key or signature does not parse)
+    try:
+        return "valid" if secp256k1.verify_ecdsa(secp256k1.parse_pubkey(pubkey), signature, digest) else "invalid"
+    except ValueError:
+        return "malformed"
+
+def coincurve_outcome(pubkey, signature, digest=DIGEST):
+    try:
+        return "valid" if coincurve.PublicKey(pubkey).verify(signature, digest, hasher=None) else "invalid"
+    except ValueError:
+        return "malformed"
+
+def _reencode(signature, body):
+    return b"\x30" + bytes([len(body)]) + body
+
+R_INT, S_INT = _der_int(R), _der_int(S)
+SIGNATURE_CASES = {
+    "valid": (SIGNATURE, "valid"),
+    "high s": (_der(R, secp256k1.N - S), "invalid"),
+    "s zero": (_der(R, 0), "invalid"),
+    "r zero": (_der(0, S), "invalid"),
+    "r equal to the order": (_der(secp256k1.N, S), "invalid"),
+    "s equal to the order": (_der(R, secp256k1.N), "invalid"),
+    "wrong message": (_der(R, S), "invalid"),
+    "empty": (b"", "malformed"),
+    "wrong sequence tag": (b"\x31" + SIGNATURE[1:], "malformed"),
+    "wrong integer tag": (SIGNATURE[:2] + b"\x03" + SIGNATURE[3:], "malformed"),
+    "sequence length too long": (b"\x30" + bytes([SIGNATURE[1] + 1]) + SIGNATURE[2:], "malformed"),
+    "sequence length too short": (b"\x30" + bytes([SIGNATURE[1] - 1]) + SIGNATURE[2:], "malformed"),
+    "trailing byte": (_reencode(SIGNATURE, R_INT + S_INT) + b"\x00", "malformed"),
+    "long-form sequence length": (b"\x30\x81" + bytes([len(R_INT + S_INT)]) + R_INT + S_INT, "malformed"),
+    "r padded with a zero": (_reencode(SIGNATURE, b"\x02" + bytes([R_INT[1] + 1]) + b"\x00" + R_INT[2:] + S_INT),
+                             "malformed"),
+    "zero-length r": (_reencode(SIGNATURE, b"\x02\x00" + S_INT), "malformed"),
+    "negative r": (_reencode(SIGNATURE, b"\x02\x01\x81" + S_INT), "invalid"),
+    "truncated": (SIGNATURE[:-1], "malformed"),
+}
+
+@pytest.mark.parametrize("name", SIGNATURE_CASES)
+def test_ecdsa_signature_encodings(name):
+    signature, expected = SIGNATURE_CASES[name]
+    digest = DIGEST[::-1] if name == "wrong message" else DIGEST
+    assert ecdsa_outcome(COMPRESSED, signature, digest) == expected
+    if coincurve is not None:
+        assert coincurve_outcome(COMPRESSED, signature, digest) == expected
+
+def _off_curve_y():
+    y = 1
+    while secp256k1.is_on_curve(X, y):
+        y += 1
+    return y
+
+KEY_CASES = {
+    "compressed": (COMPRESSED, "valid"),
+    "uncompressed": (UNCOMPRESSED, "valid"),
+    "hybrid": (bytes([6 | Y & 1]) + UNCOMPRESSED[1:], "valid"),
+    "hybrid with the wrong parity": (bytes([7 - (Y & 1)]) + UNCOMPRESSED[1:], "malformed"),
+    "wrong compressed parity": (bytes([COMPRESSED[0] ^ 1]) + COMPRESSED[1:], "invalid"),
+    "x not on the curve": (b"\x02" + (5).to_bytes(32, "big"), "malformed"),
+    "x equal to the field size": (b"\x02" + secp256k1.P.to_bytes(32, "big"), "malformed"),
+    "y off the curve": (b"\x04" + X.to_bytes(32, "big") + _off_curve_y().to_bytes(32, "big"), "malformed"),
+    "unknown prefix": (b"\x05" + COMPRESSED[1:], "malformed"),
+    "truncated": (COMPRESSED[:-1], "malformed"),
+    "empty": (b"", "malformed"),
+}
+
+@pytest.mark.parametrize("name", KEY_CASES)
+def test_ecdsa_public_keys(name):
+    pubkey, expected = KEY_CASES[name]
+    assert ecdsa_outcome(pubkey, SIGNATURE) == expected
+    if coincurve is not None:
+        assert coincurve_outcome(pubkey, SIGNATURE) == expected
+
+@needs_coincurve
+def test_random_signatures_match_coincurve():
+    for i in range(50):
+        private = coincurve.PrivateKey(hashlib.sha256(b"key %d" % i).digest())
+        digest = hashlib.sha256(b"message %d" % i).digest()
+        signature = private.sign(digest, hasher=None)
+        pubkey = private.public_key.format(compressed=bool(i & 1))
+        assert ecdsa_outcome(pubkey, signature, digest) == "valid"
+        tampered = digest[:-1] + bytes([digest[-1] ^ 1])
+        assert ecdsa_outcome(pubkey, signature, tampered) == coincurve_outcome(pubkey, signature, tampered) == "invalid"
+        schnorr = private.sign_schnorr(digest)
+        xonly = private.public_key_xonly.format()
+        assert schnorr_outcome(xonly, digest, schnorr)
+        assert not schnorr_outcome(xonly, tampered, schnorr)
+
+#####################
+## GENERATOR TABLE ##
+#####################
+def test_table_round_trip(tmp_path):
+    path = str(tmp_path / "g.table")
+    table = secp256k1.generator_table()
+    secp256k1.save_table(table, path)
+    assert secp256k1.load_table(path) == table
+    with open(path, "r+b") as file: # flip one coordinate byte
+        file.seek(-1, os.SEEK_END)
+        last = file.read(1)
+        file.seek(-1, os.SEEK_END)
+        file.write(bytes([last[0] ^ 1]))
+    assert secp256k1.load_table(path) is None
+    assert secp256k1.load_table(str(tmp_path / "missing")) is None
+
+def test_glv_split():
+    for k in (0, 1, secp256k1.N - 1, secp256k1.LAMBDA, 1 << 128, 1 << 255,
+              int.from_bytes(hashlib.sha256(b"k").digest(), "big") % secp256k1.N):
+        k1, k2 = secp256k1._split(k)
+        assert (k1 + k2 * secp256k1.LAMBDA - k) % secp256k1.N == 0
+        assert abs(k1).bit_length() <= 128 and abs(k2).bit_length() <= 128
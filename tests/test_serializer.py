@@ -0,0 +1,67 @@
+"""
+helper/serializer.py: compact sizes, and transactions serialized to bytes. A mempool file is named after the SHA256
+of its txid, so every bundled transaction checks its own non-witness serialization; the witness serialization is
+checked by deserializing it back.
+"""
+import os
+import hashlib
+import pytest
+import helper.serializer as serializer
+import helper.txn_model as txn_model
+
+BUNDLED_MEMPOOL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mempool")
+P2WPKH = "000cb561188c762c81f76976f816829424e2af9e0e491c617b7bf41038df3d35"
+P2PKH = "00d12b523d8b7ad90e2269767478764c243625539dc59bcd457d14ca1aa4e38c"
+
+@pytest.mark.parametrize("value, encoded", [
+    (0, "00"), (0xfc, "fc"), (0xfd, "fdfd00"), (0xffff, "fdffff"), (0x10000, "fe00000100"),
+    (0xffffffff, "feffffffff"), (0x100000000, "ff0000000001000000"),
+])
+def test_compact_size(value, encoded):
+    assert serializer.compact_size(value).hex() == encoded
+    assert serializer.read_compact_size(bytes.fromhex(encoded) + b"\x99", 0) == (value, len(encoded) // 2)
+
+def test_txids_of_the_bundled_mempool():
+    names = sorted(f[:-5] for f in os.listdir(BUNDLED_MEMPOOL) if f.endswith(".json"))
+    wrong = [name for name in names
+             if hashlib.sha256(bytes.fromhex(txn_model.load(name, BUNDLED_MEMPOOL).txid)).hexdigest() != name]
+    assert not wrong
+
+@pytest.mark.parametrize("name", [P2WPKH, P2PKH])
+def test_round_trip(name):
+    tx = txn_model.load(name, BUNDLED_MEMPOOL)
+    ser = serializer.serialize(tx)
+    version, inputs, outputs, locktime, again = serializer.deserialize(bytes(ser.buffer))
+    assert (version, locktime) == (tx.version, tx.locktime)
+    assert inputs == [[iN.txid, iN.vout, iN.scriptsig, iN.sequence, iN.witness] for iN in tx.vin]
+    assert outputs == [(out.value, out.scriptpubkey) for out in tx.vout]
+    assert (again.txid_hash(), again.wtxid_hash()) == (ser.txid_hash(), ser.wtxid_hash())
+
+    assert tx.raw_min == ser.base_bytes().hex()
+    assert tx.raw_full == ser.buffer.hex()
+    assert tx.txid == serializer.hash256(ser.base_bytes())[::-1].hex()
+    assert tx.wtxid == serializer.hash256(ser.buffer)[::-1].hex()
+    assert ser.weight == len(ser.base_bytes()) * 3 + len(ser.buffer)
+    assert ser.is_segwit == tx.has_witness
+    if not ser.is_segwit:
+        assert tx.wtxid == tx.txid and tx.raw_full == tx.raw_min
+
+def test_input_without_witness_in_a_segwit_transaction():
+    tx = txn_model.load(P2WPKH, BUNDLED_MEMPOOL)
+    first = tx.vin[0]
+    bare = txn_model.TxIn("11" * 32, 3, first.prevout, b"", [], 0xfffffffd)
+    mixed = txn_model.Transaction(None, tx.version, tx.locktime, [first, bare], tx.vout)
+    ser = serializer.serialize(mixed)
+    # The second input still gets its (empty) witness stack, right before the locktime.
+    assert bytes(ser.buffer[-5:-4]) == b"\x00"
+    _, inputs, _, _, _ = serializer.deserialize(bytes(ser.buffer))
+    assert [iN[4] for iN in inputs] == [first.witness, []]
+    assert inputs[1][:2] == ["11" * 32, 3]
+
+@pytest.mark.parametrize("cut", [1, 5, 40])
+def test_truncated(cut):
+    raw = bytes(serializer.serialize(txn_model.load(P2WPKH, BUNDLED_MEMPOOL)).buffer)
+    with pytest.raises(ValueError):
+        serializer.deserialize(raw[:-cut])
+    with pytest.raises(ValueError):
+        serializer.deserialize(raw + b"\x00")
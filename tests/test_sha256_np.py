@@ -0,0 +1,51 @@
+"""
+helper/sha256_np.py: the vectorised double SHA256 agrees with hashlib digest for digest, and the NumPy nonce scan
+returns exactly what the hashlib scan returns, counting every nonce of the batches it ran.
+"""
+import hashlib
+import threading
+import pytest
+import miner
+import helper.sha256_np as sha256_np
+
+pytestmark = pytest.mark.skipif(not sha256_np.AVAILABLE, reason="the NumPy backend needs numpy")
+
+HEADER = bytes(range(76))
+EASY = 1 << 250
+
+def _hash256(header_wo_nonce, nonce):
+    return hashlib.sha256(hashlib.sha256(header_wo_nonce + nonce.to_bytes(4, "little")).digest()).digest()
+
+def test_digests_match_hashlib():
+    assert sha256_np.self_test()
+    nonces = [0, 1, 2, 0x7FFFFFFF, 0x80000000, 0xFFFFFFFE, 0xFFFFFFFF]
+    assert sha256_np.hash_headers(HEADER, nonces) == [_hash256(HEADER, nonce) for nonce in nonces]
+    header = hashlib.sha256(b"other").digest() * 2 + bytes(12)
+    assert sha256_np.hash_headers(header, range(100)) == [_hash256(header, nonce) for nonce in range(100)]
+
+@pytest.mark.parametrize("target, start, stop, batch_size", [
+    (EASY, 0, 1 << 16, 64),
+    (EASY, 5, 1 << 16, 1), # every nonce its own batch
+    (1 << 244, 0, 1 << 16, 1000), # about one header in 4096: a batch size that does not divide the range
+    (0, 100, 1000, 256), # nothing qualifies
+])
+def test_scan_matches_hashlib(target, start, stop, batch_size):
+    nonce, hashes = sha256_np.scan(HEADER, target, start, stop, batch_size=batch_size)
+    expected, expected_hashes = miner.scan(HEADER, target, start, stop)
+    assert nonce == expected
+    if nonce is None:
+        assert hashes == expected_hashes == stop - start
+    else:
+        batches = (nonce - start) // batch_size + 1 # the whole batch holding the nonce was hashed
+        assert hashes == min(batches * batch_size, stop - start)
+
+def test_cancel_stops_after_a_batch():
+    cancel = threading.Event()
+    cancel.set()
+    assert sha256_np.scan(HEADER, 0, 0, 1 << 20, cancel, batch_size=512) == (None, 512)
+
+def test_backend():
+    assert miner.BACKENDS["numpy"] is sha256_np.scan
+    assert miner.get_backend("numpy") is sha256_np.scan
+    with pytest.raises(ValueError):
+        miner.get_backend("gpu")
@@ -0,0 +1,150 @@
+"""
+helper/sigcache.py: the LRU signature cache (only successes are stored, hits skip verification), worker deltas merged
+into the parent, the cache file, the public key pools, and deferred Schnorr verification settled in a batch.
+"""
+import os
+import pytest
+import helper.sighash as sighash
+import helper.sigcache as sigcache
+import helper.txn_model as txn_model
+
+BUNDLED_MEMPOOL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mempool")
+P2WPKH = "000cb561188c762c81f76976f816829424e2af9e0e491c617b7bf41038df3d35"
+# BIP340 test vector 1
+SCHNORR = (
+    bytes.fromhex("6896BD60EEAE296DB48A229FF71DFE071BDE413E6D43F917DC8DCF8C78DE3341"
+                  "8906D11AC976ABCCB20B091292BFF4EA897EFCB639EA871CFA95F6DE339E4B0A"),
+    bytes.fromhex("243F6A8885A308D313198A2E03707344A4093822299F31D0082EFA98EC4E6C89"),
+    bytes.fromhex("DFF1D77F2A671C5F36183726DB2341BE58FEAE1DA2DECED843240F7B502BA659"),
+)
+
+@pytest.fixture(params=sorted(sigcache.BACKENDS))
+def backend(request):
+    sigcache.use_backend(request.param)
+    yield request.param
+    sigcache.use_backend(sigcache.DEFAULT_BACKEND)
+    sigcache.defer_schnorr(False)
+
+def _ecdsa():
+    # (signature, digest, pubkey) of the first input of a bundled P2WPKH transaction.
+    tx = txn_model.load(P2WPKH, BUNDLED_MEMPOOL)
+    iN = tx.vin[0]
+    signature, pubkey = iN.witness
+    script_code = sighash.p2wpkh_script_code(iN.prevout.scriptpubkey[2:])
+    return signature[:-1], tx.bip143.digest(0, script_code, iN.prevout.value, signature[-1]), pubkey
+
+def _counting_backend(monkeypatch):
+    calls = []
+    real = sigcache._backend
+
+    class Counting(real):
+        @staticmethod
+        def verify_ecdsa(key, signature, message_hash):
+            calls.append("ecdsa")
+            return real.verify_ecdsa(key, signature, message_hash)
+
+        @staticmethod
+        def verify_schnorr(key, signature, message):
+            calls.append("schnorr")
+            return real.verify_schnorr(key, signature, message)
+
+        @staticmethod
+        def verify_schnorr_batch(items):
+            calls.append(("batch", len(items)))
+            return real.verify_schnorr_batch(items)
+
+    monkeypatch.setattr(sigcache, "_backend", Counting)
+    return calls
+
+def test_lru():
+    cache = sigcache.SignatureCache(maxsize=3)
+    for key in (b"a", b"b", b"c"):
+        cache.add(key)
+    assert cache.lookup(b"a") # refreshed: b is now the oldest
+    cache.add(b"d")
+    assert b"b" not in cache and len(cache) == 3
+    assert not cache.lookup(b"b")
+    assert cache.stats() == {"entries": 3, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+def test_hit_skips_verification(backend, monkeypatch):
+    signature, digest, pubkey = _ecdsa()
+    cache = sigcache.SignatureCache()
+    calls = _counting_backend(monkeypatch)
+    assert sigcache.verify(signature, digest, pubkey, cache=cache)
+    assert sigcache.verify(signature, digest, pubkey, cache=cache)
+    assert calls == ["ecdsa"]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_failures_are_not_cached(backend, monkeypatch):
+    signature, digest, pubkey = _ecdsa()
+    cache = sigcache.SignatureCache()
+    calls = _counting_backend(monkeypatch)
+    wrong = bytes([digest[0] ^ 1]) + digest[1:]
+    assert not sigcache.verify(signature, wrong, pubkey, cache=cache)
+    assert not sigcache.verify(signature, wrong, pubkey, cache=cache)
+    assert not sigcache.verify(signature[:-1], digest, pubkey, cache=cache) # not DER
+    assert not sigcache.verify(signature, digest, b"\x02" + bytes(32), cache=cache) # not a point
+    assert calls == ["ecdsa"] * 3 and len(cache) == 0 # a key off the curve never reaches the backend
+
+def test_schnorr_and_ecdsa_keys_differ(backend):
+    signature, message, pubkey = SCHNORR
+    cache = sigcache.SignatureCache()
+    assert sigcache.verify_schnorr(signature, message, pubkey, cache=cache)
+    assert list(cache._entries) == [sigcache.schnorr_cache_key(message, pubkey, signature)]
+    assert sigcache.schnorr_cache_key(message, pubkey, signature) != sigcache.cache_key(message, pubkey, signature)
+
+def test_worker_delta_merges_into_parent():
+    parent = sigcache.SignatureCache()
+    parent.add(b"old")
+    worker = sigcache.SignatureCache()
+    worker.merge((list(parent._entries), 0, 0)) # what a forked worker starts with
+    worker.take_delta()
+    worker.lookup(b"old")
+    worker.lookup(b"new")
+    worker.add(b"new")
+    delta = worker.take_delta()
+    assert delta == ([b"new"], 1, 1)
+    assert worker.take_delta() == ([], 0, 0)
+    parent.merge(delta)
+    assert b"new" in parent and len(parent) == 2
+    assert (parent.hits, parent.misses) == (1, 1)
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "sigcache.bin")
+    cache = sigcache.SignatureCache()
+    keys = [bytes([i]) * sigcache.KEY_SIZE for i in range(5)]
+    for key in keys:
+        cache.add(key)
+    cache.lookup(keys[0])
+    cache.save(path)
+    with open(path, "ab") as file:
+        file.write(b"partial") # a torn write: the incomplete key is ignored
+    loaded = sigcache.SignatureCache(maxsize=4)
+    assert loaded.load(path) == 5
+    assert list(loaded._entries) == keys[2:] + keys[:1] # least recently used first, oldest evicted
+    assert sigcache.SignatureCache().load(str(tmp_path / "missing")) == 0
+
+def test_public_keys_are_parsed_once():
+    parsed = []
+    pool = sigcache.PublicKeyPool(maxsize=2, parse=lambda data: parsed.append(data) or data.upper())
+    assert [pool.get(k) for k in (b"a", b"a", b"b", b"a", b"c", b"b")] == [b"A", b"A", b"B", b"A", b"C", b"B"]
+    assert parsed == [b"a", b"b", b"c", b"b"]
+
+def test_deferred_schnorr(backend, monkeypatch):
+    signature, message, pubkey = SCHNORR
+    bad = signature[:-1] + bytes([signature[-1] ^ 1])
+    cache = sigcache.SignatureCache()
+    calls = _counting_backend(monkeypatch)
+    sigcache.defer_schnorr()
+    assert sigcache.verify_schnorr(signature, message, pubkey, cache=cache)
+    assert sigcache.verify_schnorr(bad, message, pubkey, cache=cache) # queued, not checked yet
+    queued = sigcache.take_deferred()
+    assert len(queued) == 2 and sigcache.take_deferred() == [] and not calls
+    assert not sigcache.verify_schnorr_batch(queued, cache=cache)
+    assert len(cache) == 0 # a failed batch caches nothing
+    assert sigcache.verify_schnorr_batch(queued[:1] * 2, cache=cache)
+    assert calls == [("batch", 2), ("batch", 1)]
+    assert sigcache.verify_schnorr(signature, message, pubkey, cache=cache) # cached: not queued again
+    assert sigcache.take_deferred() == []
+    sigcache.defer_schnorr(False)
+    assert not sigcache.verify_schnorr(bad, message, pubkey, cache=cache)
@@ -0,0 +1,162 @@
+"""
+helper/sighash.py: the worked examples of BIP143 (native P2WPKH, P2SH-P2WPKH, and native P2WSH signed with every
+sighash type); legacy digests against a plain re-serialization as Bitcoin Core's SignatureHash builds it; and the
+digests of bundled mempool transactions checked against their own signatures.
+"""
+import os
+import random
+import pytest
+import helper.serializer as serializer
+import helper.sighash as sighash
+import helper.secp256k1 as secp256k1
+import helper.txn_model as txn_model
+import scripts.interpreter as interpreter
+
+BUNDLED_MEMPOOL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mempool")
+P2WPKH = "000cb561188c762c81f76976f816829424e2af9e0e491c617b7bf41038df3d35"
+P2PKH = "00d12b523d8b7ad90e2269767478764c243625539dc59bcd457d14ca1aa4e38c"
+
+# BIP143 examples: unsigned transaction, input index, scriptCode, amount, sighash type, digest.
+NATIVE_P2WPKH = (
+    "0100000002fff7f7881a8099afa6940d42d1e7f6362bec38171ea3edf433541db4e4ad969f0000000000eeffffffef51e1b804cc89d182"
+    "d279655c3aa89e815b1b309fe287d9b2b55d57b90ec68a0100000000ffffffff02202cb206000000001976a9148280b37df378db99f66f"
+    "85c95a783a76ac7a6d5988ac9093510d000000001976a9143bde42dbee7e4dbe6a21b2d50ce2f0167faa815988ac11000000"
+)
+P2SH_P2WPKH = (
+    "0100000001db6b1b20aa0fd7b23880be2ecbd4a98130974cf4748fb66092ac4d3ceb1a54770100000000feffffff02b8b4eb0b00000000"
+    "1976a914a457b684d7f0d539a46a45bbc043f35b59d0d96388ac0008af2f000000001976a914fd270b1ee6abcaea97fea7ad0402e8bd8a"
+    "d6d77c88ac92040000"
+)
+NATIVE_P2WSH = (
+    "010000000136641869ca081e70f394c6948e8af409e18b619df2ed74aa106c1ca29787b96e0100000000ffffffff0200e9a43500000000"
+    "1976a914389ffce9cd9ae88dcc0631e88a821ffdbe9bfe2688acc0832f05000000001976a9147480a33f950689af511e6e84c138dbbd3c"
+    "3ee41588ac00000000"
+)
+WITNESS_SCRIPT_6_OF_6 = (
+    "56210307b8ae49ac90a048e9b53357a2354b3334e9c8bee813ecb98e99a7e07e8c3ba32103b28f0c28bfab54554ae8c658ac5c3e0ce6e7"
+    "9ad336331f78c428dd43eea8449b21034b8113d703413d57761b8b9781957b8c0ac1dfe69f492580ca4195f50376ba4a21033400f6afec"
+    "b833092a9a21cfdf1ed1376e58c5d1f47de74683123987e967a8f42103a6d48b1131e94ba04d9737d61acdaa1322008af9602b3b14862c"
+    "07a1789aac162102d8b661b0b3302ee2f162b09e07a55ad5dfbe673a9f01d9f0c19617681024306b56ae"
+)
+BIP143_VECTORS = [
+    (NATIVE_P2WPKH, 1, "76a9141d0f172a0ecb48aee1be1f2687d2963ae33f71a188ac", 600000000, 0x01,
+     "c37af31116d1b27caf68aae9e3ac82f1477929014d5b917657d0eb49478cb670"),
+    (P2SH_P2WPKH, 0, "76a91479091972186c449eb1ded22b78e40d009bdf008988ac", 1000000000, 0x01,
+     "64f3b0f4dd2bb3aa1ce8566d220cc74dda9df97d8490cc81d89d735c92e59fb6"),
+    (NATIVE_P2WSH, 0, WITNESS_SCRIPT_6_OF_6, 987654321, 0x01,
+     "185c0be5263dce5b4bb50a047973c1b6272bfbd0103a89444597dc40b248ee7c"),
+    (NATIVE_P2WSH, 0, WITNESS_SCRIPT_6_OF_6, 987654321, 0x02,
+     "e9733bc60ea13c95c6527066bb975a2ff29a925e80aa14c213f686cbae5d2f36"),
+    (NATIVE_P2WSH, 0, WITNESS_SCRIPT_6_OF_6, 987654321, 0x03,
+     "1e1f1c303dc025bd664acb72e583e933fae4cff9148bf78c157d1e8f78530aea"),
+    (NATIVE_P2WSH, 0, WITNESS_SCRIPT_6_OF_6, 987654321, 0x81,
+     "2a67f03e63a6a422125878b40b82da593be8d4efaafe88ee528af6e5a9955c6e"),
+    (NATIVE_P2WSH, 0, WITNESS_SCRIPT_6_OF_6, 987654321, 0x82,
+     "781ba15f3779d5542ce8ecb5c18716733a5ee42a6f51488ec96154934e2c890a"),
+    (NATIVE_P2WSH, 0, WITNESS_SCRIPT_6_OF_6, 987654321, 0x83,
+     "511e8e52ed574121fc1b654970395502128263f62662e076dc6baf05c2e6a99b"),
+]
+
+def unsigned_tx(raw):
+    """Transaction model of a raw transaction (inputs without prevouts)."""
+    version, inputs, outputs, locktime, _ = serializer.deserialize(bytes.fromhex(raw))
+    return txn_model.Transaction(
+        None, version, locktime,
+        [txn_model.TxIn(txid, vout, None, scriptsig, witness, sequence)
+         for txid, vout, scriptsig, sequence, witness in inputs],
+        [txn_model.TxOut(value, scriptpubkey) for value, scriptpubkey in outputs],
+    )
+
+def ecdsa_valid(signature, pubkey, digest):
+    try:
+        return secp256k1.verify_ecdsa(secp256k1.parse_pubkey(pubkey), signature, digest)
+    except ValueError:
+        return False
+
+@pytest.mark.parametrize("raw, index, script_code, amount, sighash_type, expected", BIP143_VECTORS)
+def test_bip143_vectors(raw, index, script_code, amount, sighash_type, expected):
+    hasher = sighash.Bip143Hasher(unsigned_tx(raw))
+    assert hasher.digest(index, bytes.fromhex(script_code), amount, sighash_type).hex() == expected
+
+def test_bip143_shared_hashes():
+    hasher = sighash.Bip143Hasher(unsigned_tx(NATIVE_P2WPKH))
+    assert hasher.hash_prevouts.hex() == "96b827c8483d4e9b96712b6713a7b68d6e8003a781feba36c31143470b4efd37"
+    assert hasher.hash_sequence.hex() == "52b0a642eea2fb7ae638c36f6252b6750293dbe574a806984b8e4d8548339a3b"
+    assert hasher.hash_outputs.hex() == "863ef3e1a92afbfdb97f31ad0fc7683ee943e9abcf2501590ff8f6551f47e5e5"
+
+def test_bip143_signature_of_a_mempool_transaction():
+    tx = txn_model.load(P2WPKH, BUNDLED_MEMPOOL)
+    assert tx.bip143 is tx.bip143 # one hasher per transaction
+    for index, iN in enumerate(tx.vin):
+        signature, pubkey = iN.witness
+        script_code = sighash.p2wpkh_script_code(iN.prevout.scriptpubkey[2:])
+        digest = tx.bip143.digest(index, script_code, iN.prevout.value, signature[-1])
+        assert ecdsa_valid(signature[:-1], pubkey, digest)
+        assert not ecdsa_valid(signature[:-1], pubkey, tx.bip143.digest(index, script_code, iN.prevout.value + 1,
+                                                                         signature[-1]))
+
+def legacy_reference(tx, index, script_code, sighash_type):
+    """The whole transaction copied and edited for every signature, as Bitcoin Core does."""
+    base_type = sighash_type & 0x1f
+    if base_type == sighash.SIGHASH_SINGLE and index >= len(tx.vout):
+        return b"\x01" + bytes(31)
+    inputs = []
+    for i, iN in enumerate(tx.vin):
+        script = script_code if i == index else b""
+        sequence = iN.sequence
+        if i != index and base_type in (sighash.SIGHASH_NONE, sighash.SIGHASH_SINGLE):
+            sequence = 0
+        inputs.append((iN.txid, iN.vout, script, sequence))
+    if sighash_type & sighash.SIGHASH_ANYONECANPAY:
+        inputs = [inputs[index]]
+    outputs = [(out.value, out.scriptpubkey) for out in tx.vout]
+    if base_type == sighash.SIGHASH_NONE:
+        outputs = []
+    elif base_type == sighash.SIGHASH_SINGLE:
+        outputs = [(0xffffffffffffffff, b"")] * index + [outputs[index]]
+    copy = txn_model.Transaction(
+        None, tx.version, tx.locktime,
+        [txn_model.TxIn(txid, vout, None, script, [], sequence) for txid, vout, script, sequence in inputs],
+        [txn_model.TxOut(value, script) for value, script in outputs],
+    )
+    preimage = serializer.serialize(copy).base_bytes() + sighash_type.to_bytes(4, "little")
+    return serializer.hash256(preimage)
+
+def random_tx(rng, n_in, n_out):
+    return txn_model.Transaction(
+        None, rng.choice((1, 2)), rng.randrange(1 << 32),
+        [txn_model.TxIn(rng.randbytes(32).hex(), rng.randrange(4), None, rng.randbytes(rng.randrange(120)), [],
+                        rng.choice((0xffffffff, 0xfffffffd, rng.randrange(1 << 32)))) for _ in range(n_in)],
+        [txn_model.TxOut(rng.randrange(1 << 40), rng.randbytes(rng.randrange(40))) for _ in range(n_out)],
+    )
+
+@pytest.mark.parametrize("sighash_type", [0x01, 0x02, 0x03, 0x81, 0x82, 0x83, 0x00, 0x04, 0x41, 0xc3])
+def test_legacy_matches_reference(sighash_type):
+    rng = random.Random(sighash_type)
+    for n_in, n_out in ((1, 1), (3, 2), (2, 5), (300, 3)):
+        tx = random_tx(rng, n_in, n_out)
+        hasher = sighash.LegacyHasher(tx)
+        for index in sorted({0, 1, n_in - 1, n_in // 2} & set(range(n_in))):
+            script_code = rng.randbytes(25)
+            expected = legacy_reference(tx, index, script_code, sighash_type)
+            assert hasher.digest(index, script_code, sighash_type) == expected
+            if not (sighash_type & 0x1f == sighash.SIGHASH_SINGLE and index >= n_out):
+                assert serializer.hash256(hasher.preimage(index, script_code, sighash_type)) == expected
+
+def test_legacy_inputs_in_any_order():
+    # The streamed SIGHASH_ALL digests extend a cached prefix; asking for the inputs backwards must not matter.
+    rng = random.Random(7)
+    tx = random_tx(rng, 40, 2)
+    hasher = sighash.LegacyHasher(tx)
+    script_code = rng.randbytes(25)
+    for index in reversed(range(40)):
+        assert hasher.digest(index, script_code) == legacy_reference(tx, index, script_code, sighash.SIGHASH_ALL)
+
+def test_legacy_signature_of_a_mempool_transaction():
+    tx = txn_model.load(P2PKH, BUNDLED_MEMPOOL)
+    assert tx.legacy is tx.legacy # one hasher per transaction
+    for index, iN in enumerate(tx.vin):
+        signature, pubkey = interpreter.push_data(iN.scriptsig)
+        spk = iN.prevout.scriptpubkey
+        assert ecdsa_valid(signature[:-1], pubkey, tx.legacy.digest(index, spk, signature[-1]))
+        assert not ecdsa_valid(signature[:-1], pubkey, tx.legacy.digest(index, spk[:-1], signature[-1]))
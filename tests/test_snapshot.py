@@ -0,0 +1,108 @@
+"""
+helper/snapshot.py: a packed mempool loads back to the transactions of its JSON files (plain and zlib-compressed,
+uncompressed records read in place from the mapping), validates alike through list_valid_txn, and a damaged file is
+rejected with ValueError instead of being half read.
+"""
+import os
+import struct
+import pytest
+import list_valid_txn
+import helper.snapshot as snapshot
+import helper.txn_model as txn_model
+
+P2WPKH = "000cb561188c762c81f76976f816829424e2af9e0e491c617b7bf41038df3d35"
+P2TR = "001035505afbf143e51bd667099190943a38eee20092bb691e72eaa44992b2f7"
+P2PKH = "00d12b523d8b7ad90e2269767478764c243625539dc59bcd457d14ca1aa4e38c"
+PARENT = "ca2da85e7bce75821cf44d0e25a18769891af8d01f57a7d5ced4949566b263cd"
+CHILD = "0018c221bca3da35128baabe412a14c95b6864b2e6f7f7a8ffdd8eb0923dec49"
+NAMES = sorted([P2WPKH, P2TR, P2PKH, PARENT, CHILD])
+
+def _packed(mempool, tmp_path, compress=False):
+    for name in NAMES:
+        mempool(name)
+    mempool("ff" * 32, {"version": 1}) # does not parse: left out
+    path = str(tmp_path / "mempool.pack")
+    stats = snapshot.pack(path, mempool.path, compress)
+    assert stats["records"] == len(NAMES) and stats["skipped"] == ["ff" * 32]
+    assert (stats["stored_bytes"] < stats["raw_bytes"]) == compress
+    return path
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_round_trip(mempool, tmp_path, compress):
+    packed = snapshot.Snapshot(_packed(mempool, tmp_path, compress))
+    assert packed.compressed == compress and packed.names == NAMES and len(packed) == len(NAMES)
+    assert "ff" * 32 not in packed
+    for name in NAMES:
+        tx = packed.load(name)
+        expected = txn_model.load(name, mempool.path)
+        assert tx.txn_id == name and tx.raw_full == expected.raw_full
+        assert (tx.txid, tx.wtxid, tx.weight, tx.fee) == (expected.txid, expected.wtxid, expected.weight, expected.fee)
+        for iN, other in zip(tx.vin, expected.vin):
+            assert (iN.txid, iN.vout, iN.scriptsig, iN.witness, iN.sequence) == \
+                (other.txid, other.vout, other.scriptsig, other.witness, other.sequence)
+            assert (iN.prevout.value, iN.prevout.scriptpubkey, iN.prevout.scriptpubkey_type) == \
+                (other.prevout.value, other.prevout.scriptpubkey, other.prevout.scriptpubkey_type)
+    with pytest.raises(KeyError):
+        packed.load("ff" * 32)
+    del tx
+    packed.close()
+
+def test_uncompressed_records_are_not_copied(mempool, tmp_path):
+    packed = snapshot.Snapshot(_packed(mempool, tmp_path))
+    record = packed.record(P2TR)
+    assert isinstance(record, memoryview) and record.obj is packed._mmap
+    tx = packed.load(P2TR)
+    with pytest.raises(BufferError): # the transaction still reads from the mapping
+        packed.close()
+    del record, tx
+    packed.close()
+
+def test_validates_like_the_directory(mempool, tmp_path):
+    path = _packed(mempool, tmp_path)
+    expected = list_valid_txn.list_valid_txn(workers=1)
+    packed = snapshot.Snapshot(path)
+    txn_model.use_snapshot(packed)
+    os.rename(mempool.path, str(tmp_path / "moved")) # nothing may be read from the directory any more
+    assert list_valid_txn.list_valid_txn(workers=1) == expected
+    assert sorted(expected) == NAMES
+    txn_model.use_snapshot(None)
+    packed.close()
+
+def _damaged(path, edit):
+    with open(path, "rb") as file:
+        data = bytearray(file.read())
+    edit(data)
+    with open(path, "wb") as file:
+        file.write(data)
+
+@pytest.mark.parametrize("edit", [
+    lambda data: data.__setitem__(slice(0, 8), b"MEMPACK2"), # other magic
+    lambda data: data.__delitem__(slice(12, None)), # header cut short
+    lambda data: data.__delitem__(slice(len(data) - 20, None)), # index cut short
+    lambda data: data.__setitem__(slice(12, 16), struct.pack("<I", 1000)), # more records than indexed
+    lambda data: data.__setitem__(slice(16, 24), struct.pack("<Q", 1 << 40)), # index beyond the end
+])
+def test_corrupt_header_or_index(mempool, tmp_path, edit):
+    path = _packed(mempool, tmp_path)
+    _damaged(path, edit)
+    with pytest.raises(ValueError):
+        snapshot.Snapshot(path)
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.pack"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        snapshot.Snapshot(str(path))
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_corrupt_record(mempool, tmp_path, compress):
+    path = _packed(mempool, tmp_path, compress)
+    packed = snapshot.Snapshot(path)
+    offset = packed._index[P2WPKH][0]
+    packed.close()
+    _damaged(path, lambda data: data.__setitem__(slice(offset, offset + 4), b"\xff\xff\xff\x7f"))
+    packed = snapshot.Snapshot(path)
+    with pytest.raises(ValueError):
+        packed.load(P2WPKH)
+    assert packed.load(P2TR).txn_id == P2TR
+    packed.close()
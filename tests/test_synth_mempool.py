@@ -0,0 +1,61 @@
+"""
+bench/synth_mempool.py: every generated transaction validates (legacy and BIP143 signatures, file named after its
+txid), the outputs follow the requested mix, chained inputs spend earlier generated outputs, and a seed always gives
+the same dataset.
+"""
+import os
+import sys
+import json
+import pytest
+import list_valid_txn
+import helper.txn_model as txn_model
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+try:
+    import synth_mempool
+except ImportError: # optional dependency: the generator signs with coincurve and hashes with pycryptodome
+    synth_mempool = None
+
+pytestmark = pytest.mark.skipif(synth_mempool is None, reason="the generator needs coincurve and pycryptodome")
+
+def _dataset(path):
+    mempool_dir = os.path.join(path, txn_model.MEMPOOL_DIR)
+    dataset = {}
+    for file_name in sorted(os.listdir(mempool_dir)):
+        with open(os.path.join(mempool_dir, file_name), "rb") as file:
+            dataset[file_name[:-len(".json")]] = file.read()
+    return dataset
+
+def test_every_transaction_validates(mempool, tmp_path):
+    manifest = synth_mempool.generate(120, str(tmp_path), chain=0.5, inputs=(1, 4), seed=3)
+    assert manifest["transactions"] == 120
+    with open(tmp_path / "manifest.json") as file:
+        assert json.load(file) == json.loads(json.dumps(manifest))
+    names = list_valid_txn.read_transactions()
+    assert len(names) == 120
+    assert sorted(list_valid_txn.list_valid_txn(workers=1)) == names
+
+    txids = {txn_model.get(name).txid for name in names}
+    types = {out.scriptpubkey_type for name in names for out in txn_model.get(name).vout}
+    chained = [iN for name in names for iN in txn_model.get(name).vin if iN.txid in txids]
+    assert types == set(synth_mempool.TYPES)
+    assert chained and all(iN.prevout.value >= synth_mempool.MIN_CHAINED_VALUE for iN in chained)
+    # no output is spent twice
+    outpoints = [(iN.txid, iN.vout) for name in names for iN in txn_model.get(name).vin]
+    assert len(outpoints) == len(set(outpoints))
+
+def test_mix_and_counts(tmp_path):
+    generator = synth_mempool.Generator(mix={"p2pkh": 1}, inputs=(2, 2), outputs=(3, 3), chain=0)
+    for _ in range(5):
+        _, data = generator.transaction()
+        assert len(data["vin"]) == 2 and len(data["vout"]) == 3
+        assert {entry["prevout"]["scriptpubkey_type"] for entry in data["vin"]} == {"p2pkh"}
+        assert all("witness" not in entry for entry in data["vin"])
+    with pytest.raises(ValueError):
+        synth_mempool.Generator(mix={"p2tr": 1})
+
+def test_same_seed_same_dataset(tmp_path):
+    for out_dir, seed in (("a", 5), ("b", 5), ("c", 6)):
+        synth_mempool.generate(15, str(tmp_path / out_dir), chain=0.3, seed=seed)
+    assert _dataset(tmp_path / "a") == _dataset(tmp_path / "b")
+    assert _dataset(tmp_path / "a").keys().isdisjoint(_dataset(tmp_path / "c"))
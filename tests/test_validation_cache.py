@@ -0,0 +1,126 @@
+"""
+ValidationCache: a file is validated again only when its content changed (a new mtime alone is a hash hit), and the
+whole cache is dropped for another validator version or cache format; end to end through list_valid_txn.
+"""
+import os
+import json
+import list_valid_txn
+import validate_txn
+import helper.txn_model as txn_model
+import helper.validation_cache as validation_cache
+
+P2WPKH = "000cb561188c762c81f76976f816829424e2af9e0e491c617b7bf41038df3d35"
+P2TR = "001035505afbf143e51bd667099190943a38eee20092bb691e72eaa44992b2f7"
+P2PKH = "00d12b523d8b7ad90e2269767478764c243625539dc59bcd457d14ca1aa4e38c"
+
+def _run(cache_file, monkeypatch, version=validate_txn.VALIDATOR_VERSION):
+    # One list_valid_txn run with the cache reloaded from disk; returns (valid files, files validated, cache).
+    checked = []
+    check = list_valid_txn._check
+
+    def counting(txn_id):
+        checked.append(txn_id)
+        return check(txn_id)
+
+    monkeypatch.setattr(list_valid_txn, "_check", counting)
+    txn_model.clear()
+    cache = validation_cache.ValidationCache(cache_file, version)
+    valid = list_valid_txn.list_valid_txn(workers=1, result_cache=cache)
+    return valid, sorted(checked), cache
+
+def _rewrite(path, edit):
+    with open(path) as file:
+        data = json.load(file)
+    edit(data)
+    with open(path, "w") as file:
+        json.dump(data, file)
+
+def _touch(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+def test_only_changed_files_are_validated_again(mempool, tmp_path, monkeypatch):
+    paths = {name: mempool(name) for name in (P2WPKH, P2TR, P2PKH)}
+    cache_file = str(tmp_path / "validation.json")
+    valid, checked, _ = _run(cache_file, monkeypatch)
+    assert checked == sorted(paths) and sorted(valid) == sorted(paths)
+
+    valid_again, checked, cache = _run(cache_file, monkeypatch)
+    assert checked == [] and valid_again == valid
+    assert cache.stats() == {"entries": 3, "stat_hits": 3, "hash_hits": 0, "misses": 0}
+    assert txn_model.summary(P2TR).txid == cache.entries[P2TR]["txid"] # primed from the cache
+
+    # touched: the hash says unchanged, and the new mtime is remembered
+    _touch(paths[P2TR])
+    _, checked, cache = _run(cache_file, monkeypatch)
+    assert checked == [] and cache.hash_hits == 1
+    _, checked, cache = _run(cache_file, monkeypatch)
+    assert checked == [] and cache.stat_hits == 3
+
+    # same size, other content (one hex digit of a signature): a miss, and now invalid
+    with open(paths[P2WPKH]) as file:
+        text = file.read()
+    signature = json.loads(text)["vin"][0]["witness"][0]
+    at = text.index(signature) + 20
+    with open(paths[P2WPKH], "w") as file:
+        file.write(text[:at] + ("0" if text[at] != "0" else "1") + text[at + 1:])
+    _touch(paths[P2WPKH])
+    valid, checked, cache = _run(cache_file, monkeypatch)
+    assert checked == [P2WPKH] and P2WPKH not in valid
+    assert cache.entries[P2WPKH]["size"] == len(text)
+
+    # another size
+    _rewrite(paths[P2PKH], lambda data: data.update(extra="field"))
+    _, checked, _ = _run(cache_file, monkeypatch)
+    assert checked == [P2PKH]
+
+    # removed from the mempool: pruned
+    os.remove(paths[P2TR])
+    _, checked, cache = _run(cache_file, monkeypatch)
+    assert checked == [] and set(cache.entries) == {P2WPKH, P2PKH}
+
+def test_same_size_same_mtime_other_content(mempool, tmp_path):
+    # Only the stat is compared while it is unchanged: an edit that keeps size and mtime is not noticed.
+    path = mempool(P2WPKH)
+    cache = validation_cache.ValidationCache(str(tmp_path / "validation.json"), 1)
+    fingerprint = cache.fingerprint(P2WPKH)
+    cache.store(P2WPKH, fingerprint, (True, 1))
+    with open(path, "r+b") as file:
+        head = file.read(1)
+        file.seek(0)
+        file.write(b" " if head != b" " else b"\n")
+    os.utime(path, ns=(fingerprint["mtime_ns"], fingerprint["mtime_ns"]))
+    assert cache.lookup(P2WPKH) is not None
+    os.utime(path, ns=(fingerprint["mtime_ns"], fingerprint["mtime_ns"] + 1))
+    assert cache.lookup(P2WPKH) is None
+
+def test_version_and_format(mempool, tmp_path, monkeypatch):
+    mempool(P2WPKH)
+    cache_file = str(tmp_path / "validation.json")
+    _run(cache_file, monkeypatch)
+    _, checked, _ = _run(cache_file, monkeypatch, version=validate_txn.VALIDATOR_VERSION + 1)
+    assert checked == [P2WPKH] # written by another version: dropped
+    _, checked, _ = _run(cache_file, monkeypatch, version=validate_txn.VALIDATOR_VERSION + 1)
+    assert checked == []
+
+    with open(cache_file) as file:
+        data = json.load(file)
+    data["format"] = validation_cache.CACHE_FORMAT + 1
+    with open(cache_file, "w") as file:
+        json.dump(data, file)
+    assert validation_cache.ValidationCache(cache_file, validate_txn.VALIDATOR_VERSION + 1).entries == {}
+    with open(cache_file, "w") as file:
+        file.write('{"format": 1, "entr')
+    assert validation_cache.ValidationCache(cache_file, validate_txn.VALIDATOR_VERSION + 1).entries == {}
+
+def test_verdicts_round_trip(mempool, tmp_path):
+    mempool(P2WPKH)
+    cache_file = str(tmp_path / "validation.json")
+    cache = validation_cache.ValidationCache(cache_file, 1)
+    for verdict in (None, False, (True, 1), (False, 0)):
+        cache.store(P2WPKH, cache.fingerprint(P2WPKH), verdict)
+        cache.save()
+        entry = validation_cache.ValidationCache(cache_file, 1).lookup(P2WPKH)
+        assert validation_cache.decode_verdict(entry["verdict"]) == verdict
+    cache.store("gone", cache.fingerprint("gone"), (True, 1))
+    assert "gone" not in cache.entries
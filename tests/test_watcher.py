@@ -0,0 +1,116 @@
+"""
+MempoolWatcher: files added, changed and removed between refreshes update the valid set, the graph and the
+template; a file that vanishes or is garbled while it is being validated counts as invalid instead of ending the
+watch.
+"""
+import os
+import json
+import pytest
+import list_valid_txn
+import mempool_watcher
+import helper.txn_model as txn_model
+
+P2WPKH = "000cb561188c762c81f76976f816829424e2af9e0e491c617b7bf41038df3d35"
+P2TR = "001035505afbf143e51bd667099190943a38eee20092bb691e72eaa44992b2f7"
+P2PKH = "00d12b523d8b7ad90e2269767478764c243625539dc59bcd457d14ca1aa4e38c"
+PARENT = "ca2da85e7bce75821cf44d0e25a18769891af8d01f57a7d5ced4949566b263cd"
+CHILD = "0018c221bca3da35128baabe412a14c95b6864b2e6f7f7a8ffdd8eb0923dec49"
+
+def _watcher(mempool):
+    source = mempool_watcher.PollingSource(mempool.path, interval=0)
+    return mempool_watcher.MempoolWatcher(mempool.path, workers=1, update_seconds=0.05, source=source)
+
+def _touch(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+def test_add_remove_modify(mempool):
+    for name in (P2WPKH, P2TR, PARENT):
+        mempool(name)
+    watcher = _watcher(mempool)
+    added, removed = watcher.refresh()
+    assert added == {P2WPKH, P2TR, PARENT} and not removed
+    assert set(watcher.valid) == {P2WPKH, P2TR, PARENT}
+    assert set(watcher.template[0]) == {P2WPKH, P2TR, PARENT}
+
+    # nothing changed
+    assert watcher.refresh() == (set(), set())
+
+    # a child arrives: it is validated alone and placed after its parent
+    mempool(CHILD)
+    added, removed = watcher.refresh()
+    assert added == {CHILD} and not removed
+    assert watcher.graph.parents[CHILD] == {PARENT}
+    block = watcher.template[0]
+    assert block.index(PARENT) < block.index(CHILD)
+
+    # the parent goes (mined, say): the child now spends a confirmed output
+    os.remove(os.path.join(mempool.path, f"{PARENT}.json"))
+    added, removed = watcher.refresh()
+    assert removed == {PARENT} and not added
+    assert PARENT not in watcher.verdicts and PARENT not in watcher.graph
+    assert watcher.graph.parents[CHILD] == set()
+    assert set(watcher.template[0]) == {P2WPKH, P2TR, CHILD}
+
+    # a file is rewritten with a broken signature: revalidated, now invalid
+    path = os.path.join(mempool.path, f"{P2WPKH}.json")
+    with open(path) as file:
+        data = json.load(file)
+    witness = data["vin"][0]["witness"]
+    witness[0] = witness[0][:20] + ("0" if witness[0][20] != "0" else "1") + witness[0][21:]
+    with open(path, "w") as file:
+        json.dump(data, file)
+    _touch(path)
+    added, removed = watcher.refresh({P2WPKH})
+    assert added == {P2WPKH}
+    assert not watcher.verdicts[P2WPKH][0]
+    assert P2WPKH not in watcher.template[0]
+
+def test_file_removed_while_validating(mempool, monkeypatch):
+    for name in (P2WPKH, P2TR, P2PKH):
+        mempool(name)
+    exists = txn_model.exists
+
+    def vanishing(txn_id):
+        # Listed and still there when checked, gone when it is opened.
+        found = exists(txn_id)
+        if txn_id == P2TR:
+            os.remove(os.path.join(mempool.path, f"{P2TR}.json"))
+        return found
+
+    monkeypatch.setattr(txn_model, "exists", vanishing)
+    watcher = _watcher(mempool)
+    added, _ = watcher.refresh()
+    assert added == {P2WPKH, P2TR, P2PKH}
+    assert not watcher.verdicts[P2TR]
+    assert set(watcher.valid) == {P2WPKH, P2PKH}
+
+    monkeypatch.setattr(txn_model, "exists", exists)
+    added, removed = watcher.refresh()
+    assert removed == {P2TR} and not added
+    assert P2TR not in watcher.verdicts
+
+def test_garbled_field_is_invalid(mempool):
+    path = mempool(P2WPKH)
+    with open(path) as file:
+        data = json.load(file)
+    data["vin"][0]["prevout"]["value"] = "lots"
+    with open(path, "w") as file:
+        json.dump(data, file)
+    verdict, metrics, deferred = list_valid_txn._check(P2WPKH)
+    assert not verdict and metrics is None and deferred == []
+
+def test_inotify_skips_undecodable_names(mempool):
+    try:
+        source = mempool_watcher.InotifySource(mempool.path, interval=1)
+    except (OSError, AttributeError):
+        pytest.skip("no inotify")
+    try:
+        for name in (b"\xff\xfe.json", b"notes.txt"):
+            with open(os.path.join(os.fsencode(mempool.path), name), "w") as file:
+                file.write("{}")
+        mempool(P2TR)
+        assert source.wait(1) == {P2TR}
+    finally:
+        source.close()
+    assert set(mempool_watcher.scan(mempool.path)) == {P2TR}